@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+kyoteibiyori.com 非同期取得エンジン（1レース3リクエスト並行・複数レースのパイプライン処理）
+"""
+
+import asyncio
+
+from scraper import KyoteiBiyoriScraper
+
+# fetch_race の結果のキー（mode=0・直前情報・mode=3）
+RAW_PARTS = ('basic_raw_data', 'chokuzen_raw_data', 'session_raw_data')
+
+
+class AsyncKyoteiBiyoriScraper:
+    """KyoteiBiyoriScraper の非同期版
+
+    get_race_data / get_chokuzen_data の戻り値は同期版と同じ。
+    送信間隔・同時接続数はプロセス共通のレート制限（rate_limiter）に従うため、
+    複数レースを同時に流しても kyoteibiyori.com への負荷の上限は変わらない。
+    max_concurrency は待機中のスレッド数の上限。
+    """
+
+    def __init__(self, max_concurrency=3, scraper=None):
+        self.scraper = scraper or KyoteiBiyoriScraper()
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _call(self, func, *args, **kwargs):
+        async with self._semaphore:
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+    async def get_race_data(self, place_no, race_no, hiduke, mode=0):
+        """競艇データを取得（基本・コース・モーター・今節成績用）"""
+        return await self._call(self.scraper.get_race_data, place_no, race_no, hiduke, mode=mode)
+
+    async def get_chokuzen_data(self, place_no, race_no, hiduke):
+        """直前情報を取得（新API）"""
+        return await self._call(self.scraper.get_chokuzen_data, place_no, race_no, hiduke)
+
+    async def fetch_race(self, place_no, race_no, hiduke, parts=RAW_PARTS):
+        """1レース分の mode=0・直前情報・mode=3 を並行取得
+
+        parts で取得する生データ（RAW_PARTS のキー）を絞り込める。取得しなかったものは None。
+        """
+        fetchers = {
+            'basic_raw_data': lambda: self.get_race_data(place_no, race_no, hiduke, mode=0),
+            'chokuzen_raw_data': lambda: self.get_chokuzen_data(place_no, race_no, hiduke),
+            'session_raw_data': lambda: self.get_race_data(place_no, race_no, hiduke, mode=3),
+        }
+        results = await asyncio.gather(*(fetchers[part]() for part in parts))
+        raw = {part: None for part in RAW_PARTS}
+        raw.update(zip(parts, results))
+        return raw
+
+    async def fetch_races(self, races):
+        """複数レースをまとめて取得
+
+        races は (place_no, race_no, hiduke) のタプル列。結果は同じ順序で返す。
+        """
+        return await asyncio.gather(
+            *(self.fetch_race(place_no, race_no, hiduke) for place_no, race_no, hiduke in races)
+        )
+
+
+def fetch_race_sync(place_no, race_no, hiduke, **kwargs):
+    """同期コードから1レース分を並行取得するためのヘルパー"""
+    return asyncio.run(AsyncKyoteiBiyoriScraper(**kwargs).fetch_race(place_no, race_no, hiduke))
+
+
+def fetch_races_sync(races, **kwargs):
+    """同期コードから複数レースをまとめて取得するためのヘルパー"""
+    return asyncio.run(AsyncKyoteiBiyoriScraper(**kwargs).fetch_races(races))
+
+
+if __name__ == "__main__":
+    # テスト用
+    import json
+    import sys
+
+    if len(sys.argv) > 3:
+        result = fetch_race_sync(int(sys.argv[2]), int(sys.argv[3]), sys.argv[1])
+        print(json.dumps({k: (len(v) if v else None) for k, v in result.items()}, ensure_ascii=False))
+    else:
+        print("使用方法: python async_scraper.py [日付] [会場コード] [レース番号]")
@@ -3,8 +3,13 @@
 直前情報抽出スクリプト（request_chokuzen_info_v2.php対応・展示順位計算付き・完全版）
 """
 
-def extract_before_info(json_data):
-    """直前情報を抽出（新API対応・展示順位計算付き）"""
+from normalize import normalize_records
+
+def extract_before_info(json_data, normalize=False):
+    """直前情報を抽出（新API対応・展示順位計算付き）
+
+    normalize=True の場合、数値項目を normalize の対応表に沿って変換する。
+    """
     before_info_list = []
 
     # まず展示タイムを取得して展示順位を計算
@@ -116,8 +121,32 @@ def extract_before_info(json_data):
 
         before_info_list.append(before_info)
 
+    if normalize:
+        return normalize_records('before_info', before_info_list)
     return before_info_list
 
+# 出力キー一覧（extract_before_info の抽出結果と同じ並び）
+BEFORE_INFO_KEYS = (
+    # 基本情報
+    '選手番号', '選手名', '選手名カナ', 'コース', '進入',
+    # 展示情報
+    '展示タイム', '展示順位', '展示スタートタイミング', '体重', 'チルト', '調整重量',
+    # 詳細展示データ・時間変換
+    '展示_生データ', '周回_生データ', '回り足_生データ', '直線_生データ',
+    '周回タイム', '回り足タイム', '直線タイム',
+    # 選手コメント・レース環境情報
+    'コメント', '気温', '天候', '風速', '風向きアイコン', '水温', '波高',
+    # プロペラ・交換情報・その他の情報
+    'プロペラ', '交換', '選手画像', '性別',
+    # レース詳細情報
+    '場所番号', 'レース番号', '日付',
+    # 潮汐情報
+    '満潮1_高さ', '満潮1_時間', '干潮1_時間', '干潮1_高さ',
+    '満潮2_高さ', '満潮2_時間', '干潮2_時間', '干潮2_高さ', '潮',
+    # その他のデータ
+    'スロー_ダッシュ',
+)
+
 def calculate_display_rankings(json_data):
     """展示タイムから展示順位を計算する補助関数"""
     display_times = []
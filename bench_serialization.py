@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+レースJSONの読み書きベンチマーク（JSON実装 × 整形/コンパクト）
+
+data/races 以下の保存済みJSONを読み込み、serialization の各実装で
+書き込み（race_record.write_race_file と同じ経路）・読み込みの時間とファイルサイズを比較する。
+読み込み結果が元データと一致することも確認する。
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import tempfile
+import time
+
+import serialization
+from race_record import write_race_file
+
+
+def load_races(pattern):
+    return [serialization.load_file(path) for path in sorted(glob.glob(pattern))]
+
+
+def bench_backend(races, work_dir, indent, repeat):
+    """(書き込み秒, 読み込み秒, 合計バイト数) の最速値を返す"""
+    paths = [os.path.join(work_dir, f"{i}.json") for i in range(len(races))]
+    write_times = []
+    read_times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for path, race in zip(paths, races):
+            write_race_file(path, race, indent=indent)
+        write_times.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        loaded = [serialization.load_file(path) for path in paths]
+        read_times.append(time.perf_counter() - started)
+
+    if loaded != races:
+        raise SystemExit(f"読み込み結果が一致しません: {serialization.get_backend()}")
+    size = sum(os.path.getsize(path) for path in paths)
+    return min(write_times), min(read_times), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="レースJSONの読み書きベンチマーク")
+    parser.add_argument("--pattern", default="data/races/20250912/*.json", help="対象ファイルのglobパターン")
+    parser.add_argument("--repeat", type=int, default=3, help="計測回数（最速値を採用）")
+    args = parser.parse_args()
+
+    serialization.set_backend('json')
+    races = load_races(args.pattern)
+    if not races:
+        print(f"対象ファイルがありません: {args.pattern}")
+        return
+    print(f"対象: {len(races)}レース / 利用可能な実装: {', '.join(serialization.BACKENDS)}")
+
+    work_dir = tempfile.mkdtemp(prefix="bench_serialization_")
+    try:
+        # 標準の json・整形（従来の保存方法）を基準にする
+        baseline = None
+        backends = ['json'] + [name for name in serialization.BACKENDS if name != 'json']
+        for backend in backends:
+            serialization.set_backend(backend)
+            for label, indent in (("整形", 2), ("コンパクト", None)):
+                write_time, read_time, size = bench_backend(races, work_dir, indent, args.repeat)
+                if baseline is None:
+                    baseline = (write_time, read_time, size)
+                print(
+                    f"{backend:8s} {label:6s} 書き込み {write_time * 1000:7.1f} ms "
+                    f"({baseline[0] / write_time:4.1f}倍) / 読み込み {read_time * 1000:7.1f} ms "
+                    f"({baseline[1] / read_time:4.1f}倍) / サイズ {size / 1024 / 1024:6.2f} MB "
+                    f"({size / baseline[2] * 100:.0f}%)"
+                )
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
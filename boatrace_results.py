@@ -3,7 +3,6 @@
 
 import argparse
 import requests
-import time
 import logging
 import re
 from bs4 import BeautifulSoup
@@ -11,6 +10,8 @@ from datetime import datetime
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from rate_limiter import get_rate_limiter
+
 # ── ロギング設定 ─────────────────────────────────────
 logging.basicConfig(
     level=logging.INFO,
@@ -165,10 +166,11 @@ def fetch_html(session, jcd, hd):
     url = f"https://www.boatrace.jp/owpc/pc/race/resultlist?jcd={jcd}&hd={hd}"
     headers = {'User-Agent':'Mozilla/5.0','Accept-Language':'ja-JP'}
     logging.info(f"Fetching URL: {url}")
-    resp = session.get(url, headers=headers, timeout=15)
+    with get_rate_limiter().request(url) as slot:
+        resp = session.get(url, headers=headers, timeout=15)
+        slot.observe(resp.status_code)
     resp.encoding = resp.apparent_encoding
     resp.raise_for_status()
-    time.sleep(1)
     return resp.text
 
 # ── HTML解析（同着対応版）─────────────────────────────
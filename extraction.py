@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+出走表データの一括抽出（選手レコードを1回だけ検証し、全セクションを同時に組み立てる）
+"""
+
+from raw_records import iter_valid_players
+from normalize import normalize_records
+from basic_info import basic_info_from_player
+from course_info import course_info_from_player
+from motor_info import motor_info_from_player
+from session_results import session_results_from_player, extract_session_results
+
+# mode=0 の生データから組み立てるセクションと1選手分の抽出関数
+BASIC_SECTIONS = (
+    ('basic_info', basic_info_from_player),
+    ('course_info', course_info_from_player),
+    ('motor_info', motor_info_from_player),
+)
+
+
+def extract_sections(basic_raw_data, session_raw_data=None, sections=None, normalize=False):
+    """basic_raw_data を1回走査して basic_info / course_info / motor_info を抽出
+
+    session_raw_data（mode=3）が有効なリストならそこから今節成績を抽出し、
+    そうでなければ同じ走査の中で basic_raw_data から代替抽出する。
+    sections で抽出するセクション名を絞り込める（session_results を含む）。
+    normalize=True の場合、数値項目を normalize の対応表に沿って変換する。
+    戻り値はセクション名 → 選手ごとの辞書リスト。
+    """
+    if sections is None:
+        sections = [name for name, _ in BASIC_SECTIONS] + ['session_results']
+
+    builders = [(name, builder) for name, builder in BASIC_SECTIONS if name in sections]
+    want_session = 'session_results' in sections
+    session_fallback = want_session and not (session_raw_data and isinstance(session_raw_data, list))
+    if session_fallback:
+        builders.append(('session_results', session_results_from_player))
+
+    result = {name: [] for name, _ in builders}
+    for player in iter_valid_players(basic_raw_data):
+        for name, builder in builders:
+            result[name].append(builder(player))
+
+    if want_session and not session_fallback:
+        result['session_results'] = extract_session_results(session_raw_data)
+
+    if normalize:
+        result = {name: normalize_records(name, records) for name, records in result.items()}
+    return result
+
+
+if __name__ == "__main__":
+    # テスト用
+    import json
+    import sys
+
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'r', encoding='utf-8') as f:
+            test_data = json.load(f)
+        result = extract_sections(test_data)
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print("使用方法: python extraction.py [JSONファイルパス]")
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+学習用特徴量テンソルの作成（data/races → (レース数, 6艇, 特徴量数) の float32 配列）
+
+basic_info・motor_info・session_results・before_info の数値項目を normalize の対応表で
+変換して並べる（列は "セクション.項目"、単位は feature_schema() を参照）。
+欠損・6艇未満の枠は NaN。日付ごとの結果を data/features/<日付>.npz に保存し、
+レースファイルが変わっていない日付は再計算しない。
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from normalize import field_type, normalize_records, storage_kind
+from race_frame import BOATS, DEFAULT_SCHEMA
+from race_record import iter_race_records
+
+FEATURES_DIR = "data/features"
+RACES_DIR = "data/races"
+
+# 特徴量に使うセクション（course_info は対象外）
+FEATURE_SECTIONS = ('basic_info', 'motor_info', 'session_results', 'before_info')
+
+# 特徴量にしない項目（識別子・日付など）
+EXCLUDED_FIELDS = frozenset((
+    '選手番号', '場所番号', 'レース番号', 'レース日付', '日付', 'レース年',
+    'モーター期間開始', 'モーター期間終了', 'モーター期間開始_全期間', 'モーター期間終了_全期間',
+))
+
+
+def _feature_columns(schema=DEFAULT_SCHEMA):
+    return tuple(
+        (section, field)
+        for section in FEATURE_SECTIONS
+        for field in schema.sections[section]
+        if field not in EXCLUDED_FIELDS and storage_kind(section, field) != 'text'
+    )
+
+
+FEATURE_COLUMNS = _feature_columns()
+FEATURE_NAMES = tuple(f"{section}.{field}" for section, field in FEATURE_COLUMNS)
+
+# 列構成が変わったらキャッシュを作り直すための識別子
+SCHEMA_HASH = hashlib.sha1(json.dumps(FEATURE_NAMES, ensure_ascii=False).encode('utf-8')).hexdigest()[:12]
+
+
+def feature_schema():
+    """特徴量の列定義（列番号・列名・単位）"""
+    return [
+        {"index": i, "name": f"{section}.{field}", "unit": field_type(section, field)[1]}
+        for i, (section, field) in enumerate(FEATURE_COLUMNS)
+    ]
+
+
+def race_features(record):
+    """1レース（RaceRecord）を (6, 特徴量数) の配列に変換"""
+    race_data = record.load(('race_info', *FEATURE_SECTIONS))
+    normalized = race_data['race_info'].get('normalized')
+    matrix = np.full((BOATS, len(FEATURE_COLUMNS)), np.nan, dtype=np.float32)
+    columns_by_section = {}
+    for i, (section, field) in enumerate(FEATURE_COLUMNS):
+        columns_by_section.setdefault(section, []).append((i, field))
+
+    for section, columns in columns_by_section.items():
+        records = (race_data.get(section) or [])[:BOATS]
+        if not normalized:
+            records = normalize_records(section, records)
+        for boat, entry in enumerate(records):
+            for i, field in columns:
+                value = entry.get(field)
+                if value is not None and not isinstance(value, (bool, str)):
+                    matrix[boat, i] = value
+    return matrix
+
+
+def _date_signature(date, races_dir=RACES_DIR):
+    """日付ディレクトリ内のレースファイルの (名前, サイズ, 更新時刻) から作る識別子"""
+    date_dir = os.path.join(races_dir, str(date))
+    entries = []
+    for name in sorted(os.listdir(date_dir)):
+        if name.endswith(".json"):
+            stat = os.stat(os.path.join(date_dir, name))
+            entries.append([name, stat.st_size, stat.st_mtime_ns])
+    payload = json.dumps([SCHEMA_HASH, entries], ensure_ascii=False).encode('utf-8')
+    return hashlib.sha1(payload).hexdigest()
+
+
+def cache_path(date, features_dir=FEATURES_DIR):
+    return os.path.join(features_dir, f"{date}.npz")
+
+
+def build_date(date, races_dir=RACES_DIR, features_dir=FEATURES_DIR):
+    """1日分の特徴量を計算して保存し、(特徴量, レースキー) を返す
+
+    レースキーは (日付, 会場コード, レース番号) の int64 配列。
+    """
+    features = []
+    keys = []
+    for record in iter_race_records(date, date, races_dir):
+        race_info = record.race_info
+        features.append(race_features(record))
+        keys.append((int(race_info['date']), int(race_info['stadium_code']), int(race_info['race_no'])))
+
+    features = np.stack(features) if features else np.empty((0, BOATS, len(FEATURE_COLUMNS)), np.float32)
+    keys = np.array(keys, dtype=np.int64).reshape(-1, 3)
+
+    path = cache_path(date, features_dir)
+    os.makedirs(features_dir, exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}.npz"
+    np.savez(
+        tmp_path,
+        features=features,
+        keys=keys,
+        signature=np.array(_date_signature(date, races_dir)),
+        columns=np.array(FEATURE_NAMES),
+    )
+    os.replace(tmp_path, path)
+    return features, keys
+
+
+def load_date(date, races_dir=RACES_DIR, features_dir=FEATURES_DIR, rebuild=False):
+    """1日分の特徴量を返す（キャッシュが有効ならそれを、なければ計算）
+
+    戻り値は (特徴量, レースキー, 再計算したか)。
+    """
+    path = cache_path(date, features_dir)
+    if not rebuild and os.path.exists(path):
+        with np.load(path) as cached:
+            if str(cached['signature']) == _date_signature(date, races_dir):
+                return cached['features'], cached['keys'], False
+    features, keys = build_date(date, races_dir, features_dir)
+    return features, keys, True
+
+
+def list_race_dates(start=None, end=None, races_dir=RACES_DIR):
+    if not os.path.isdir(races_dir):
+        return []
+    return [
+        date for date in sorted(os.listdir(races_dir))
+        if os.path.isdir(os.path.join(races_dir, date))
+        and not (start and date < str(start)) and not (end and date > str(end))
+    ]
+
+
+def build_dataset(start=None, end=None, races_dir=RACES_DIR, features_dir=FEATURES_DIR, out_path=None):
+    """期間内の特徴量を (レース数, 6, 特徴量数) にまとめて返す
+
+    out_path（.npy）を指定すると、日付ごとに読み込みながらメモリマップに書き込むため、
+    期間が長くても1日分を超えるメモリを使わない。戻り値は (特徴量, レースキー)。
+    """
+    dates = list_race_dates(start, end, races_dir)
+    rebuilt = 0
+    counts = []
+    for date in dates:
+        features, _keys, built = load_date(date, races_dir, features_dir)
+        counts.append(len(features))
+        rebuilt += built
+    print(f"特徴量: {len(dates)}日分（再計算 {rebuilt}日）、{sum(counts)}レース、{len(FEATURE_COLUMNS)}列")
+
+    shape = (sum(counts), BOATS, len(FEATURE_COLUMNS))
+    if out_path:
+        result = np.lib.format.open_memmap(out_path, mode='w+', dtype=np.float32, shape=shape)
+    else:
+        result = np.empty(shape, dtype=np.float32)
+    keys = np.empty((shape[0], 3), dtype=np.int64)
+
+    offset = 0
+    for date, count in zip(dates, counts):
+        with np.load(cache_path(date, features_dir)) as cached:
+            result[offset:offset + count] = cached['features']
+            keys[offset:offset + count] = cached['keys']
+        offset += count
+    if out_path:
+        result.flush()
+    return result, keys
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "schema":
+        for column in feature_schema():
+            print(f"{column['index']}\t{column['name']}\t{column['unit'] or ''}")
+    elif len(sys.argv) > 1:
+        start = sys.argv[1]
+        end = sys.argv[2] if len(sys.argv) > 2 else start
+        out_path = sys.argv[3] if len(sys.argv) > 3 else None
+        features, keys = build_dataset(start, end, out_path=out_path)
+        print(f"shape: {features.shape}")
+    else:
+        print("使用方法: python feature_builder.py [開始日] [終了日] [出力.npy]")
+        print("          python feature_builder.py schema")
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+スケジューラのジョブ記録（data/journal/<日付>.jsonl、1日1ファイル・追記のみ）
+
+ジョブの予定・開始・成功・失敗を1行ずつ追記し、書き込みのたびに fsync する。
+再起動時はファイルを先頭から読み直すだけでジョブごとの状態（試行回数・次の再試行時刻）を
+復元できるため、レース場一覧の取得や保存済みファイルの確認をせずに再開できる。
+途中で書き込みが途切れた最終行は読み飛ばす。失敗したジョブは試行回数に応じて
+間隔を延ばしながら（指数バックオフ）MAX_ATTEMPTS 回まで再試行する。
+"""
+
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+JOURNAL_DIR = "data/journal"
+
+# 再試行の間隔（秒）: RETRY_BASE_SECONDS × 2^(試行回数-1)、上限 RETRY_MAX_SECONDS
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 30 * 60
+
+# 1ジョブの試行回数の上限（超えたら abandoned）
+MAX_ATTEMPTS = 4
+
+# 終了済みの状態
+FINISHED_STATUSES = ('succeeded', 'abandoned')
+
+
+def retry_delay(attempts):
+    """attempts 回失敗した後の再試行までの秒数"""
+    return min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+
+
+def _apply(jobs, event):
+    """1行分のイベントをジョブの状態に反映"""
+    job_id = event["job"]
+    kind = event["event"]
+    if kind == "planned":
+        if job_id not in jobs:
+            jobs[job_id] = {
+                "job": job_id,
+                "status": "planned",
+                "attempts": 0,
+                "run_at": event.get("run_at"),
+                "payload": event.get("payload", {}),
+                "next_retry_at": None,
+                "last_error": None,
+            }
+        return
+    job = jobs.get(job_id)
+    if job is None:
+        return
+    job["updated_at"] = event["ts"]
+    if kind == "replanned":
+        # 新しい実行で予定し直したジョブは試行回数を数え直す
+        job["status"] = "planned"
+        job["attempts"] = 0
+        job["run_at"] = event.get("run_at")
+        job["payload"] = event.get("payload", job["payload"])
+        job["next_retry_at"] = None
+        job["last_error"] = None
+    elif kind == "started":
+        job["status"] = "running"
+        job["attempts"] = event["attempt"]
+    elif kind == "succeeded":
+        job["status"] = "succeeded"
+        job["next_retry_at"] = None
+    elif kind == "failed":
+        job["last_error"] = event.get("error")
+        job["next_retry_at"] = event.get("next_retry_at")
+        job["status"] = "failed" if job["next_retry_at"] else "abandoned"
+
+
+class JobJournal:
+    def __init__(self, root=JOURNAL_DIR):
+        self.root = root
+        self._lock = threading.RLock()
+        # 日付 → ジョブID → 状態
+        self._jobs = {}
+
+    def path(self, date):
+        return os.path.join(self.root, f"{date}.jsonl")
+
+    def load(self, date):
+        """1日分のジョブの状態（ジョブID → 状態の辞書）を返す"""
+        date = str(date)
+        with self._lock:
+            if date not in self._jobs:
+                jobs = {}
+                path = self.path(date)
+                if os.path.exists(path):
+                    with open(path, 'r', encoding='utf-8') as f:
+                        for line in f:
+                            try:
+                                event = json.loads(line)
+                            except ValueError:
+                                # 書き込み途中で止まった行
+                                continue
+                            _apply(jobs, event)
+                # 前回の実行中に止まったジョブは未実行に戻す（試行回数は残す）
+                for job in jobs.values():
+                    if job["status"] == "running":
+                        job["status"] = "interrupted"
+                self._jobs[date] = jobs
+            return self._jobs[date]
+
+    def _append(self, date, event):
+        date = str(date)
+        event = {"ts": datetime.now().isoformat(), **event}
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with self._lock:
+            jobs = self.load(date)
+            os.makedirs(self.root, exist_ok=True)
+            with open(self.path(date), 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            _apply(jobs, event)
+            return jobs.get(event["job"])
+
+    def get(self, date, job_id):
+        return self.load(date).get(job_id)
+
+    def plan(self, date, job_id, payload, run_at=None, replan=False):
+        """ジョブを予定として記録（記録済みなら何もしない）し、状態を返す
+
+        replan=True の場合、記録済みのジョブも（実行中でなければ）予定に戻して試行回数を0からにする。
+        """
+        job = self.get(date, job_id)
+        if job is not None and not (replan and job["status"] != "running"):
+            return job
+        return self._append(date, {
+            "job": job_id,
+            "event": "planned" if job is None else "replanned",
+            "run_at": run_at.isoformat() if run_at else None,
+            "payload": payload,
+        })
+
+    def started(self, date, job_id):
+        """開始を記録し、今回の試行回数を返す"""
+        job = self.get(date, job_id)
+        attempt = (job["attempts"] if job else 0) + 1
+        self._append(date, {"job": job_id, "event": "started", "attempt": attempt})
+        return attempt
+
+    def succeeded(self, date, job_id):
+        self._append(date, {"job": job_id, "event": "succeeded"})
+
+    def failed(self, date, job_id, error=None):
+        """失敗を記録し、次の再試行時刻を返す（試行回数の上限に達した場合はNone）"""
+        job = self.get(date, job_id)
+        attempts = job["attempts"] if job else 1
+        next_retry_at = None
+        if attempts < MAX_ATTEMPTS:
+            next_retry_at = datetime.now() + timedelta(seconds=retry_delay(attempts))
+        self._append(date, {
+            "job": job_id,
+            "event": "failed",
+            "error": error,
+            "next_retry_at": next_retry_at.isoformat() if next_retry_at else None,
+        })
+        return next_retry_at
+
+    def pending(self, date):
+        """未完了で実行中でないジョブ（予定・中断・再試行待ち）と実行すべき日時の組のリスト（日時順）
+
+        実行日時は再試行待ちなら次の再試行時刻、それ以外は予定時刻（なければNone）。
+        """
+        result = []
+        for job in self.load(date).values():
+            if job["status"] in FINISHED_STATUSES or job["status"] == "running":
+                continue
+            when = job["next_retry_at"] if job["status"] == "failed" else job["run_at"]
+            result.append((job, datetime.fromisoformat(when) if when else None))
+        return sorted(result, key=lambda item: (item[1] or datetime.min, item[0]["job"]))
+
+    def summary(self, date):
+        """状態ごとのジョブ数"""
+        counts = {}
+        for job in self.load(date).values():
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return counts
+
+
+_shared_journal = None
+_shared_lock = threading.Lock()
+
+
+def get_job_journal():
+    """プロセス共通の JobJournal を取得"""
+    global _shared_journal
+    with _shared_lock:
+        if _shared_journal is None:
+            _shared_journal = JobJournal()
+        return _shared_journal
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1:
+        journal = get_job_journal()
+        for date in sys.argv[1:]:
+            counts = journal.summary(date)
+            print(f"{date}: " + (", ".join(f"{status} {count}件" for status, count in sorted(counts.items())) or "記録なし"))
+            for job, when in journal.pending(date):
+                when_str = when.strftime("%H:%M:%S") if when else "--:--:--"
+                error = f" ({job['last_error']})" if job["last_error"] else ""
+                print(f"  {when_str} {job['status']:11s} {job['attempts']}回 {job['job']}{error}")
+    else:
+        print("使用方法: python job_journal.py [日付 ...]")
@@ -7,11 +7,22 @@ import re
 import subprocess
 from datetime import datetime, timedelta
 import time
-import schedule
 import logging
+import threading
 import argparse
 import os
 import random
+from concurrent.futures import ThreadPoolExecutor
+
+from main import process_race, process_race_stage, RaceDataError, EXTRA_OUTPUT_WRITERS
+from scraper import KyoteiBiyoriScraper
+from rate_limiter import get_rate_limiter
+from raw_archive import get_raw_archive
+import parquet_store
+from race_manifest import get_race_manifest
+from schedule_cache import get_schedule_cache
+from timer_scheduler import get_timer_scheduler, TimerScheduler, RESERVED_WORKERS
+from job_journal import get_job_journal, FINISHED_STATUSES
 
 # ログ設定
 logging.basicConfig(
@@ -94,12 +105,37 @@ def setup_directories(date_str):
         return False
 
 
+# boatrace.jp へのリクエストのタイムアウト（接続, 読み込み）秒
+REQUEST_TIMEOUT = (5, 15)
+
+# 待機中にキューの状態を表示する間隔（秒）
+STATUS_INTERVAL = 300
+
+# 会場ごとのスケジュールを並行取得するスレッド数
+# （実際の同時接続数は rate_limiter.RATE_LIMITS の www.boatrace.jp の設定で制限される）
+SCHEDULE_WORKERS = 4
+
+
 def get_venue_list(date_str):
-    """指定日のレース場一覧を取得（重複排除）"""
+    """指定日のレース場一覧（schedule_cache に有効な内容があればページを取得しない）"""
+    return get_schedule_cache().get_venues(date_str, lambda: fetch_venue_list(date_str))
+
+
+def get_race_schedule(venue_code, date_str):
+    """特定レース場の全レース時間（schedule_cache に有効な内容があればページを取得しない）"""
+    return get_schedule_cache().get_races(
+        date_str, venue_code, lambda: fetch_race_schedule(venue_code, date_str)
+    )
+
+
+def fetch_venue_list(date_str):
+    """指定日のレース場一覧をboatrace.jpから取得（重複排除）"""
     url = f"https://www.boatrace.jp/owpc/pc/race/index?hd={date_str}"
 
     try:
-        response = requests.get(url)
+        with get_rate_limiter().request(url) as slot:
+            response = requests.get(url, timeout=REQUEST_TIMEOUT)
+            slot.observe(response.status_code)
         soup = BeautifulSoup(response.text, "html.parser")
         venues = []
         seen_venues = set()
@@ -138,6 +174,11 @@ def get_venue_list(date_str):
         return []
 
 
+def exec_datetime(date_str, exec_time):
+    """対象日付（YYYYMMDD）と実行時刻（HH:MM）から実行日時を作る"""
+    return datetime.strptime(f"{date_str} {exec_time}", "%Y%m%d %H:%M")
+
+
 def get_venue_code_from_name(venue_name):
     """会場名からコードを取得（main.py準拠）"""
     for name, code in STADIUM_CODES.items():
@@ -156,14 +197,16 @@ def get_venue_name_from_code(venue_code):
     return venue_code
 
 
-def get_race_schedule(venue_code, date_str):
-    """特定レース場の全レース時間を取得"""
+def fetch_race_schedule(venue_code, date_str):
+    """特定レース場の全レース時間をboatrace.jpから取得"""
     url = (
         f"https://www.boatrace.jp/owpc/pc/race/raceindex?jcd={venue_code}&hd={date_str}"
     )
 
     try:
-        response = requests.get(url)
+        with get_rate_limiter().request(url) as slot:
+            response = requests.get(url, timeout=REQUEST_TIMEOUT)
+            slot.observe(response.status_code)
         soup = BeautifulSoup(response.text, "html.parser")
         races = []
 
@@ -204,17 +247,207 @@ def get_race_schedule(venue_code, date_str):
         return []
 
 
-def run_prediction(venue_code, race_no, date_str, skip_existing=True):
-    """main.pyを実行（デフォルトでファイルスキップ有効）"""
+# 常駐ワーカーで使い回すスクレイパー（requests.Session を全レースで共有）
+_shared_scraper = None
+_shared_scraper_lock = threading.Lock()
+
+# 生データを data/raw にアーカイブするか（--archive-raw）
+ARCHIVE_RAW = False
+
+# 期間バックフィルで同時に取得するレース数（--backfill-workers）
+# （実際のリクエスト数は rate_limiter の kyoteibiyori.com の設定（--rate / --concurrency）で制限される）
+BACKFILL_WORKERS = 3
+
+# 期間バックフィルの進捗を表示する間隔（秒）
+BACKFILL_STATUS_INTERVAL = 60
+
+# レースごとに段階を分けて取得するか（--timeline）
+USE_TIMELINE = False
+
+# 1レースの取得段階（main.FETCH_STAGES の段階名, 発走時刻からの分。負は発走前）
+# 出走表は早めに、直前情報は展示の公開後（10分前）と更新後（3分前）に、今節成績はレース後に取得する
+RACE_TIMELINE = (
+    ("entry", -60),
+    ("chokuzen", -10),
+    ("chokuzen", -3),
+    ("results", 15),
+)
+
+# レースごとの所要時間（in-process実行時に記録）
+race_timings = []
+
+# main.py のパイプラインに渡すオプション（コマンドライン引数から設定）
+PIPELINE_OPTIONS = {
+    "dedup_racers": False,
+    "extra_outputs": [],
+    "normalize": False,
+    "compact": False,
+}
+
+
+def get_day_schedule(date_str, venues=None, max_workers=None):
+    """指定日の全会場のレース時刻を並行取得
+
+    戻り値は (会場, レース一覧) のリスト（会場の並び順は get_venue_list と同じ）。
+    取得に失敗した会場のレース一覧は空になる。
+    """
+    if venues is None:
+        venues = get_venue_list(date_str)
+    if not venues:
+        return []
+
+    cache = get_schedule_cache()
+    fetches = cache.fetches
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers or SCHEDULE_WORKERS) as executor:
+        schedules = list(
+            executor.map(lambda venue: get_race_schedule(venue["code"], date_str), venues)
+        )
+    logging.info(
+        f"スケジュール取得: {len(venues)}会場 {sum(len(races) for races in schedules)}レース "
+        f"(ページ取得 {cache.fetches - fetches}件, {time.perf_counter() - started:.1f}s)"
+    )
+    return list(zip(venues, schedules))
+
+
+def format_fetch_rate():
+    """kyoteibiyori.com への現在の送信レート（rate_limiter の自動調整の状態）"""
+    return get_rate_limiter().format_stats("kyoteibiyori.com")
+
+
+def get_shared_scraper():
+    """常駐ワーカー用のスクレイパーを取得（初回のみ生成）"""
+    global _shared_scraper
+    with _shared_scraper_lock:
+        if _shared_scraper is None:
+            _shared_scraper = KyoteiBiyoriScraper(
+                archive=get_raw_archive() if ARCHIVE_RAW else None
+            )
+    return _shared_scraper
+
+
+def run_prediction_subprocess(venue_name, race_no, date_str, stage=None):
+    """main.pyを別プロセスで実行（分離実行用フォールバック）"""
+    cmd = ["python3", "main.py", date_str, venue_name, str(race_no)]
+    if stage:
+        cmd.extend(["--stage", stage])
+    if PIPELINE_OPTIONS["dedup_racers"]:
+        cmd.append("--dedup-racers")
+    if PIPELINE_OPTIONS["normalize"]:
+        cmd.append("--normalize")
+    if PIPELINE_OPTIONS["compact"]:
+        cmd.append("--compact")
+    if ARCHIVE_RAW:
+        cmd.append("--archive-raw")
+    for output_format in PIPELINE_OPTIONS["extra_outputs"]:
+        cmd.extend(["--output", output_format])
+
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+
+    if result.stdout:
+        logging.info(f"main.py実行結果: {result.stdout[:200]}...")
+
+
+def run_prediction_inprocess(venue_name, race_no, date_str, stage=None):
+    """main.pyのパイプラインを同一プロセス内で実行し、所要時間を記録
+
+    stage を指定するとその段階（main.FETCH_STAGES）だけを取得する。
+    """
+    if stage:
+        result = process_race_stage(
+            date_str,
+            venue_name,
+            race_no,
+            stage,
+            scraper=get_shared_scraper(),
+            verbose=False,
+            **PIPELINE_OPTIONS,
+        )
+    else:
+        result = process_race(
+            date_str,
+            venue_name,
+            race_no,
+            scraper=get_shared_scraper(),
+            verbose=False,
+            **PIPELINE_OPTIONS,
+        )
+    timings = result["timings"]
+    if result["written"]:
+        logging.info(
+            f"変更セクション: {venue_name} {race_no}R - {', '.join(result['changed_sections'])}"
+        )
+    else:
+        logging.info(f"変更なし（書き込み省略）: {venue_name} {race_no}R")
+    race_timings.append(
+        {
+            "date": date_str,
+            "venue_name": venue_name,
+            "race_no": race_no,
+            "stage": result.get("stage", "full"),
+            **timings,
+        }
+    )
+    logging.info(
+        f"所要時間: {venue_name} {race_no}R - 取得 {timings['fetch']:.2f}s / "
+        f"抽出 {timings['extract']:.2f}s / 保存 {timings['save']:.2f}s / 合計 {timings['total']:.2f}s"
+    )
+    return result
+
+
+def summarize_race_timings():
+    """記録済みの所要時間の平均を返す（記録がなければNone）"""
+    if not race_timings:
+        return None
+    keys = ("fetch", "extract", "save", "total")
+    return {
+        key: sum(t[key] for t in race_timings) / len(race_timings) for key in keys
+    }
+
+
+def compact_parquet(date_str):
+    """--output parquet 指定時、1日分のParquet断片ファイルを1ファイルにまとめる"""
+    if "parquet" not in PIPELINE_OPTIONS["extra_outputs"]:
+        return
+    try:
+        merged = parquet_store.compact_date(date_str)
+        logging.info(f"Parquetまとめ完了: {date_str} ({merged}ファイル)")
+    except Exception as e:
+        logging.error(f"Parquetまとめ中にエラー: {date_str} - {e}")
+
+
+def run_prediction(
+    venue_code, race_no, date_str, skip_existing=True, use_subprocess=False
+):
+    """main.pyのパイプラインを実行（デフォルトでファイルスキップ有効）
+
+    通常は同一プロセス内で実行し、use_subprocess=True の場合のみ
+    main.py を別プロセスで起動する。
+    """
     venue_name = get_venue_name_from_code(venue_code)
+    manifest = get_race_manifest()
 
-    # ファイル存在確認
+    # 保存済み確認（台帳を参照）
     if skip_existing:
-        output_file = f"data/races/{date_str}/{date_str}_{venue_name}_{race_no}.json"
-        if os.path.exists(output_file):
-            file_size = os.path.getsize(output_file)
+        stored = manifest.get_race(date_str, venue_code, race_no)
+        refresh_reason = stored and manifest.chokuzen_refresh_reason(date_str, venue_code, race_no)
+        if refresh_reason:
+            # 保存済みでも直前情報が古い・代替データの場合は直前情報だけを取り直す
+            logging.info(
+                f"直前情報の取り直し: {venue_name} {race_no}R - 理由: {refresh_reason}"
+            )
+            print(f"🔄 直前情報のみ取り直し: {venue_name} {race_no}R ({refresh_reason})")
+            return run_race_stage(
+                venue_code,
+                race_no,
+                date_str,
+                "chokuzen",
+                skip_existing=False,
+                use_subprocess=use_subprocess,
+            )
+        if stored:
             logging.info(
-                f"ファイルスキップ: {venue_name} {race_no}R - 既存ファイル: {output_file} ({file_size} bytes)"
+                f"ファイルスキップ: {venue_name} {race_no}R - 既存ファイル: {stored['file']} ({stored['size']} bytes)"
             )
             print(f"⏭️  スキップ: {venue_name} {race_no}R (既存ファイル)")
             return True  # スキップも成功扱い
@@ -224,22 +457,19 @@ def run_prediction(venue_code, race_no, date_str, skip_existing=True):
     try:
         setup_directories(date_str)
 
-        cmd = ["python3", "main.py", date_str, venue_name, race_no]
-
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-
-        if result.stdout:
-            logging.info(f"main.py実行結果: {result.stdout[:200]}...")
+        if use_subprocess:
+            run_prediction_subprocess(venue_name, race_no, date_str)
+        else:
+            run_prediction_inprocess(venue_name, race_no, date_str)
 
-        output_file = f"data/races/{date_str}/{date_str}_{venue_name}_{race_no}.json"
-        if os.path.exists(output_file):
-            file_size = os.path.getsize(output_file)
+        stored = manifest.get_race(date_str, venue_code, race_no)
+        if stored:
             logging.info(
-                f"予測成功: {venue_name} {race_no}R - ファイル生成: {output_file} ({file_size} bytes)"
+                f"予測成功: {venue_name} {race_no}R - ファイル生成: {stored['file']} ({stored['size']} bytes)"
             )
         else:
             logging.warning(
-                f"予測完了: {venue_name} {race_no}R - 出力ファイルが見つかりません: {output_file}"
+                f"予測完了: {venue_name} {race_no}R - 台帳に記録がありません ({date_str})"
             )
 
         return True
@@ -247,22 +477,363 @@ def run_prediction(venue_code, race_no, date_str, skip_existing=True):
     except subprocess.CalledProcessError as e:
         logging.error(f"予測失敗: {venue_name} {race_no}R - エラー: {e.stderr}")
         return False
+    except RaceDataError as e:
+        logging.error(f"予測失敗: {venue_name} {race_no}R - エラー: {e}")
+        return False
     except Exception as e:
         logging.error(f"予測実行中に予期しないエラー: {venue_name} {race_no}R - {e}")
         return False
 
 
+def is_race_up_to_date(manifest, date_str, venue_code, race_no):
+    """保存済みで、直前情報も取り直す必要がないレースなら True（skip_existing のスキップ判定）"""
+    return manifest.has_race(
+        date_str, venue_code, race_no
+    ) and not manifest.chokuzen_refresh_reason(date_str, venue_code, race_no)
+
+
+def execute_chokuzen_refresh(date_str, use_subprocess=False):
+    """保存済みレースのうち直前情報が古い・代替データのものについて、直前情報だけを取り直す
+
+    1レースにつき直前情報APIへの1リクエストのみ（間隔は rate_limiter の設定に従う）。
+    発走時刻による判定のため、予定が台帳になければ先にスケジュールを記録する。
+    """
+    print(f"\n=== 直前情報の取り直し: {date_str} ===")
+    manifest = get_race_manifest()
+    if not manifest.load(date_str).get("schedule"):
+        manifest.record_schedule(
+            date_str,
+            [
+                {
+                    "venue_code": venue["code"],
+                    "venue_name": venue["name"],
+                    "race_no": race["race_no"],
+                    "race_time": race["time"],
+                }
+                for venue, races in get_day_schedule(date_str)
+                for race in races
+            ],
+        )
+
+    races = manifest.races_needing_chokuzen(date_str)
+    if not races:
+        print("✅ 直前情報を取り直すレースはありません")
+        return True
+
+    print(f"対象: {len(races)}レース")
+    success_count = 0
+    for i, race in enumerate(races, 1):
+        print(
+            f"[{i}/{len(races)}] {race['stadium']} {race['race_no']}R "
+            f"({race['race_time'] or '--:--'}, {race['reason']})"
+        )
+        if run_race_stage(
+            str(race["stadium_code"]).zfill(2),
+            race["race_no"],
+            date_str,
+            "chokuzen",
+            skip_existing=False,
+            use_subprocess=use_subprocess,
+        ):
+            success_count += 1
+
+    print(f"\n✅ 直前情報の取り直し完了: {success_count}/{len(races)}レース")
+    notify_mac(
+        "競艇スケジューラ", f"直前情報の取り直し: {date_str} {success_count}/{len(races)}レース"
+    )
+    return success_count == len(races)
+
+
+def backlog_priority(post_at):
+    """実行時刻を過ぎたレースの優先度（timer_scheduler の submit に渡す関数）
+
+    発走前のレースは直前情報が最も価値を持つため、発走が近い順に最優先で取得する。
+    発走済みのレースは記録用として、その後に発走順で取得する。
+    """
+    def priority(now):
+        if now < post_at:
+            return (0, (post_at - now).total_seconds())
+        return (1, post_at.timestamp())
+    return priority
+
+
+def run_race_stage(
+    venue_code, race_no, date_str, stage, skip_existing=True, use_subprocess=False
+):
+    """1レースの取得段階を1つ実行（保存済みファイルがなければ全セクションを取得）
+
+    skip_existing=True の場合、保存済みのレースの出走表（entry）段階は実行しない。
+    直前情報が未公開などで段階の取得ができなかった場合は False を返す。
+    """
+    venue_name = get_venue_name_from_code(venue_code)
+
+    if (
+        skip_existing
+        and stage == "entry"
+        and get_race_manifest().has_race(date_str, venue_code, race_no)
+    ):
+        logging.info(f"段階スキップ: {venue_name} {race_no}R ({stage}) - 保存済み")
+        return True
+
+    logging.info(f"段階取得開始: {venue_name} {race_no}R ({stage}, {date_str})")
+
+    try:
+        setup_directories(date_str)
+
+        if use_subprocess:
+            run_prediction_subprocess(venue_name, race_no, date_str, stage=stage)
+        else:
+            run_prediction_inprocess(venue_name, race_no, date_str, stage=stage)
+        return True
+
+    except subprocess.CalledProcessError as e:
+        logging.error(f"段階取得失敗: {venue_name} {race_no}R ({stage}) - エラー: {e.stderr}")
+        return False
+    except RaceDataError as e:
+        logging.warning(f"段階取得失敗: {venue_name} {race_no}R ({stage}) - {e}")
+        return False
+    except Exception as e:
+        logging.error(f"段階取得中に予期しないエラー: {venue_name} {race_no}R ({stage}) - {e}")
+        return False
+
+
+# ジョブ記録（job_journal）のジョブの種類と実行する関数
+JOB_RUNNERS = {
+    "race": run_prediction,
+    "stage": run_race_stage,
+}
+
+# 1日分のジョブの予定を記録し終えたことを示すジョブ
+# SCHEDULE_JOB はリアルタイム・連続実行（実行時刻を過ぎたレースは記録しない）、
+# BATCH_PLAN_JOB はバッチ・バックフィル（保存済み以外の全レースを記録）が記録する
+SCHEDULE_JOB = "schedule"
+BATCH_PLAN_JOB = "batch_plan"
+MARKER_JOBS = (SCHEDULE_JOB, BATCH_PLAN_JOB)
+
+
+def race_job_id(venue_code, race_no, stage=None, offset=None):
+    """ジョブ記録のジョブID（1日分の記録の中で一意）"""
+    job_id = f"{str(venue_code).zfill(2)}_{race_no}R"
+    if stage:
+        job_id += f"_{stage}{offset:+d}"
+    return job_id
+
+
+def record_schedule_job(date_str, job_id=SCHEDULE_JOB):
+    """1日分のジョブを予定として記録し終えたことを記録（再開時はスケジュールを取得しない）"""
+    journal = get_job_journal()
+    journal.plan(date_str, job_id, {"kind": "schedule"})
+    journal.started(date_str, job_id)
+    journal.succeeded(date_str, job_id)
+
+
+def job_payload(kind, job_kwargs, post_at=None, name=None):
+    """ジョブ記録に残す内容（再開時はこの内容だけでジョブを登録し直す）"""
+    return {
+        "kind": kind,
+        "name": name,
+        "post_at": post_at.isoformat() if post_at else None,
+        "kwargs": job_kwargs,
+    }
+
+
+def has_journaled_schedule(date_str, job_id=SCHEDULE_JOB):
+    job = get_job_journal().get(date_str, job_id)
+    return bool(job) and job["status"] == "succeeded"
+
+
+def journaled_race_jobs(date_str):
+    """ジョブ記録のうちレース単位のジョブ（段階ごとのジョブ・記録用のジョブは除く）
+
+    同じレースのジョブは race_job_id で1つにまとめる。
+    """
+    jobs = {}
+    for job in get_job_journal().load(date_str).values():
+        payload = job["payload"]
+        if job["job"] in MARKER_JOBS or payload.get("kind") != "race":
+            continue
+        kwargs = payload["kwargs"]
+        jobs.setdefault(race_job_id(kwargs["venue_code"], kwargs["race_no"]), job)
+    return list(jobs.values())
+
+
+def run_journaled_job(
+    date_str,
+    job_id,
+    kind,
+    job_kwargs,
+    skip_existing=True,
+    use_subprocess=False,
+    reschedule=True,
+    timer=None,
+):
+    """ジョブ記録に開始・成功・失敗を残しながらジョブを実行
+
+    失敗した場合は job_journal の間隔（指数バックオフ）で再試行する。
+    reschedule=True なら再試行を timer（省略時は共通の TimerScheduler）に登録し、
+    False なら呼び出し側に任せる。
+    """
+    journal = get_job_journal()
+    attempt = journal.started(date_str, job_id)
+    try:
+        success = JOB_RUNNERS[kind](
+            date_str=date_str,
+            skip_existing=skip_existing,
+            use_subprocess=use_subprocess,
+            **job_kwargs,
+        )
+        error = None if success else "取得失敗"
+    except Exception as e:
+        success, error = False, str(e)
+
+    if success:
+        journal.succeeded(date_str, job_id)
+        return True
+
+    retry_at = journal.failed(date_str, job_id, error)
+    if retry_at is None:
+        logging.error(f"ジョブ中止: {date_str} {job_id} - {attempt}回失敗 ({error})")
+        return False
+    logging.warning(
+        f"ジョブ失敗: {date_str} {job_id} - {attempt}回目 ({error})、{retry_at:%H:%M:%S}に再試行"
+    )
+    if reschedule:
+        timer = timer or get_timer_scheduler()
+        timer.schedule_at(
+            retry_at,
+            run_journaled_job,
+            date_str,
+            job_id,
+            kind,
+            job_kwargs,
+            skip_existing=skip_existing,
+            use_subprocess=use_subprocess,
+            timer=timer,
+            name=job_id,
+            tag=date_str,
+            key=(date_str, job_id),
+        )
+    return False
+
+
+def dispatch_journaled_job(
+    timer, date_str, job, when, skip_existing=True, use_subprocess=False
+):
+    """ジョブ記録のジョブを timer に登録（実行時刻を過ぎていればバックログに入れる）"""
+    payload = job["payload"]
+    args = (run_journaled_job, date_str, job["job"], payload["kind"], payload["kwargs"])
+    options = {
+        "skip_existing": skip_existing,
+        "use_subprocess": use_subprocess,
+        "timer": timer,
+        "name": payload.get("name") or job["job"],
+        "tag": date_str,
+        "key": (date_str, job["job"]),
+    }
+    if when is not None and when > datetime.now():
+        return timer.schedule_at(when, *args, **options)
+    post_at = payload.get("post_at")
+    post_at = datetime.fromisoformat(post_at) if post_at else (when or datetime.now())
+    return timer.submit(*args, priority=backlog_priority(post_at), **options)
+
+
+def plan_job(
+    timer,
+    date_str,
+    job_id,
+    kind,
+    job_kwargs,
+    run_at=None,
+    post_at=None,
+    name=None,
+    skip_existing=True,
+    use_subprocess=False,
+    replan=False,
+):
+    """ジョブを記録してから timer に登録（run_at がなければバックログ）
+
+    成功済み・中止済み・実行中のジョブは登録せず None を返す。
+    再試行待ちのジョブは次の再試行時刻に登録する。
+    replan=True（新しい実行で対象に選んだジョブ）は記録済みでも予定に戻し、試行回数を数え直す。
+    """
+    job = get_job_journal().plan(
+        date_str,
+        job_id,
+        job_payload(kind, job_kwargs, post_at, name),
+        run_at=run_at,
+        replan=replan,
+    )
+    if job["status"] in FINISHED_STATUSES or job["status"] == "running":
+        return None
+    if job["status"] == "failed":
+        run_at = datetime.fromisoformat(job["next_retry_at"])
+    return dispatch_journaled_job(
+        timer, date_str, job, run_at, skip_existing=skip_existing, use_subprocess=use_subprocess
+    )
+
+
+def resume_journal(timer, date_str, skip_existing=True, use_subprocess=False):
+    """ジョブ記録の未完了のジョブを timer に登録し直し、件数を返す（スケジュールは取得しない）"""
+    pending = [
+        (job, when) for job, when in get_job_journal().pending(date_str) if job["job"] not in MARKER_JOBS
+    ]
+    for job, when in pending:
+        dispatch_journaled_job(
+            timer, date_str, job, when, skip_existing=skip_existing, use_subprocess=use_subprocess
+        )
+    return len(pending)
+
+
+def schedule_race_timeline(
+    timer, venue, race_no, race_time, date_str, skip_existing=True, use_subprocess=False
+):
+    """1レースの取得段階（RACE_TIMELINE）を timer に登録し、登録した (段階名, 実行日時) を返す
+
+    実行時刻を過ぎた段階は登録しない。
+    """
+    post_at = exec_datetime(date_str, race_time)
+    now = datetime.now()
+    scheduled = []
+    for stage, offset in RACE_TIMELINE:
+        run_at = post_at + timedelta(minutes=offset)
+        if run_at <= now:
+            continue
+        plan_job(
+            timer,
+            date_str,
+            race_job_id(venue["code"], race_no, stage, offset),
+            "stage",
+            {"venue_code": venue["code"], "race_no": race_no, "stage": stage},
+            run_at=run_at,
+            post_at=post_at,
+            name=f"{venue['name']} {race_no}R {stage}",
+            skip_existing=skip_existing,
+            use_subprocess=use_subprocess,
+        )
+        scheduled.append((stage, run_at))
+    return scheduled
+
+
 def execute_batch_mode(
     target_date_str,
-    min_interval=60,
-    max_interval=80,
+    min_interval=None,
+    max_interval=None,
     skip_existing=True,
     auto_yes=False,
+    use_subprocess=False,
 ):
-    """指定日の全レースを順次実行（自動実行オプション追加）"""
+    """指定日の全レースを順次実行（自動実行オプション追加）
+
+    min_interval / max_interval を指定した場合のみレースの間にランダムな待機を入れる。
+    指定がなければ待機せず、送信間隔は rate_limiter の自動調整に任せる。
+    """
+    fixed_interval = min_interval is not None
     print(f"\n=== バッチモード開始: {target_date_str} ===")
     print(f"📅 対象日付: {target_date_str} (固定)")
-    print(f"⏱️  レース間隔: {min_interval}〜{max_interval}秒（ランダム）")
+    if fixed_interval:
+        print(f"⏱️  レース間隔: {min_interval}〜{max_interval}秒（ランダム）")
+    else:
+        print(f"⏱️  レース間隔: 待機なし（送信間隔は自動調整: {format_fetch_rate()}）")
     print(f"🔒 日付変更が起きても {target_date_str} のデータを取得し続けます")
     if skip_existing:
         print(f"⏭️  既存ファイルスキップ: 有効")
@@ -273,40 +844,87 @@ def execute_batch_mode(
 
     setup_directories(target_date_str)
 
-    venues = get_venue_list(target_date_str)
-    if not venues:
-        print("レース場が見つかりませんでした")
-        notify_mac(
-            "競艇スケジューラ", f"{target_date_str}: レース場が見つかりませんでした"
-        )
-        return False
-
-    print(f"対象レース場: {len(venues)}箇所")
-
     all_races = []
     skipped_races = []
+    # 前回の実行で失敗し、再試行時刻を待っているレース（再試行の段階で実行する）
+    retry_races = []
+    manifest = get_race_manifest()
+    journal = get_job_journal()
+
+    if skip_existing and has_journaled_schedule(target_date_str, BATCH_PLAN_JOB):
+        # バッチの記録から再開（レース場一覧・レース時刻・保存済みファイルは確認しない）
+        started = time.perf_counter()
+        for job in journaled_race_jobs(target_date_str):
+            if job["status"] in FINISHED_STATUSES:
+                skipped_races.append(job)
+                continue
+            post_at = datetime.fromisoformat(job["payload"]["post_at"])
+            venue_code = job["payload"]["kwargs"]["venue_code"]
+            (retry_races if job["status"] == "failed" else all_races).append(
+                {
+                    "job_id": job["job"],
+                    "venue_code": venue_code,
+                    "venue_name": get_venue_name_from_code(venue_code),
+                    "race_no": job["payload"]["kwargs"]["race_no"],
+                    "race_time": post_at.strftime("%H:%M"),
+                    "target_date": target_date_str,
+                }
+            )
+        print(
+            f"♻️  ジョブ記録から再開: 完了済み {len(skipped_races)}レース / 未完了 {len(all_races)}レース "
+            f"/ 再試行待ち {len(retry_races)}レース "
+            f"({(time.perf_counter() - started) * 1000:.0f}ms)"
+        )
+    else:
+        venues = get_venue_list(target_date_str)
+        if not venues:
+            print("レース場が見つかりませんでした")
+            notify_mac(
+                "競艇スケジューラ", f"{target_date_str}: レース場が見つかりませんでした"
+            )
+            return False
 
-    # レース情報収集と既存ファイルチェック
-    for venue in venues:
-        races = get_race_schedule(venue["code"], target_date_str)
-        for race in races:
-            race_info = {
-                "venue_code": venue["code"],
-                "venue_name": venue["name"],
-                "race_no": race["race_no"],
-                "race_time": race["time"],
-                "target_date": target_date_str,
-            }
+        print(f"対象レース場: {len(venues)}箇所")
+
+        # レース情報収集と保存済みチェック（台帳を参照）
+        scheduled_races = []
+        for venue, races in get_day_schedule(target_date_str, venues):
+            for race in races:
+                scheduled_races.append(
+                    {
+                        "job_id": race_job_id(venue["code"], race["race_no"]),
+                        "venue_code": venue["code"],
+                        "venue_name": venue["name"],
+                        "race_no": race["race_no"],
+                        "race_time": race["time"],
+                        "target_date": target_date_str,
+                    }
+                )
+        manifest.record_schedule(target_date_str, scheduled_races)
 
-            # ファイル存在確認
-            if skip_existing:
-                output_file = f"data/races/{target_date_str}/{target_date_str}_{venue['name']}_{race['race_no']}.json"
-                if os.path.exists(output_file):
-                    skipped_races.append(race_info)
-                    continue  # 既存ファイルは処理リストに追加しない
+        for race_info in scheduled_races:
+            if skip_existing and is_race_up_to_date(
+                manifest, target_date_str, race_info["venue_code"], race_info["race_no"]
+            ):
+                skipped_races.append(race_info)
+                continue  # 保存済みレースは処理リストに追加しない
 
             all_races.append(race_info)
-        time.sleep(2)
+
+        # 処理対象のレースをジョブ記録に残す（中断しても次回はここから再開する）
+        for race in all_races:
+            journal.plan(
+                target_date_str,
+                race["job_id"],
+                job_payload(
+                    "race",
+                    {"venue_code": race["venue_code"], "race_no": race["race_no"]},
+                    post_at=exec_datetime(target_date_str, race["race_time"]),
+                    name=f"{race['venue_name']} {race['race_no']}R",
+                ),
+                replan=True,
+            )
+        record_schedule_job(target_date_str, BATCH_PLAN_JOB)
 
     # 統計情報表示
     total_original = len(all_races) + len(skipped_races)
@@ -320,7 +938,7 @@ def execute_batch_mode(
     else:
         print(f"処理対象: {len(all_races)}レース")
 
-    if not all_races:
+    if not all_races and not retry_races:
         if skip_existing and skipped_races:
             print(
                 "\n✅ 全てのファイルが既に存在します。新規実行するレースがありません。"
@@ -348,9 +966,10 @@ def execute_batch_mode(
         print(f"\n🤖 自動実行モードにより、{len(all_races)}レースを実行します")
         response = "y"
     else:
-        response = input(
-            f"\n{len(all_races)}レースを{min_interval}〜{max_interval}秒ランダム間隔で実行しますか？ (y/N): "
+        interval_text = (
+            f"{min_interval}〜{max_interval}秒ランダム間隔で" if fixed_interval else ""
         )
+        response = input(f"\n{len(all_races)}レースを{interval_text}実行しますか？ (y/N): ")
 
     if response.lower() != "y":
         print("実行をキャンセルしました")
@@ -360,6 +979,7 @@ def execute_batch_mode(
     success_count = 0
     skip_count = 0
     total_count = len(all_races)
+    interrupted = False
 
     print(f"\n=== 実行開始 ===")
     print(f"🎯 固定対象日付: {target_date_str}")
@@ -381,34 +1001,50 @@ def execute_batch_mode(
 
         if i > 1:
             remaining_races = total_count - i + 1
-            avg_interval = (min_interval + max_interval) / 2
+            if fixed_interval:
+                avg_interval = (min_interval + max_interval) / 2
+                basis = f"平均{avg_interval}秒間隔で計算"
+            else:
+                avg_interval = elapsed_time.total_seconds() / (i - 1)
+                basis = f"実測 {avg_interval:.1f}秒/レースで計算, {format_fetch_rate()}"
             estimated_remaining = remaining_races * avg_interval
             estimated_finish = current_time + timedelta(seconds=estimated_remaining)
             print(
-                f"🔮 推定完了時刻: {estimated_finish.strftime('%H:%M:%S')} (平均{avg_interval}秒間隔で計算)"
+                f"🔮 推定完了時刻: {estimated_finish.strftime('%H:%M:%S')} ({basis})"
             )
 
         # main.pyを実行（skip_existingを適切に渡す）
-        success = run_prediction(
-            race["venue_code"],
-            race["race_no"],
-            race["target_date"],
-            skip_existing=skip_existing,
+        existed = skip_existing and is_race_up_to_date(
+            manifest, race["target_date"], race["venue_code"], race["race_no"]
         )
+        try:
+            success = run_journaled_job(
+                race["target_date"],
+                race["job_id"],
+                "race",
+                {"venue_code": race["venue_code"], "race_no": race["race_no"]},
+                skip_existing=skip_existing,
+                use_subprocess=use_subprocess,
+                reschedule=False,
+            )
+        except KeyboardInterrupt:
+            print("\n\n実行を中断しました")
+            notify_mac("競艇スケジューラ", "バッチ実行を中断しました")
+            interrupted = True
+            break
 
         if success:
             success_count += 1
-            # ファイルが既に存在していた場合の判定
-            output_file = f"data/races/{race['target_date']}/{race['target_date']}_{race['venue_name']}_{race['race_no']}.json"
-            if skip_existing and os.path.exists(output_file):
+            # 実行前に保存済みだった場合の判定
+            if existed:
                 skip_count += 1
             else:
                 print(f"✓ 成功: {race['venue_name']} {race['race_no']}R")
         else:
             print(f"✗ 失敗: {race['venue_name']} {race['race_no']}R")
 
-        # 待機処理（最後のレース以外）
-        if i < total_count:
+        # 待機処理（間隔指定時のみ、最後のレース以外）
+        if fixed_interval and i < total_count:
             wait_time = random.uniform(min_interval, max_interval)
             print(
                 f"⏳ {wait_time:.1f}秒待機中... ({min_interval}〜{max_interval}秒ランダム)"
@@ -419,8 +1055,47 @@ def execute_batch_mode(
             except KeyboardInterrupt:
                 print("\n\n実行を中断しました")
                 notify_mac("競艇スケジューラ", "バッチ実行を中断しました")
+                interrupted = True
                 break
 
+    # 失敗したレースを再試行（job_journal の間隔で試行回数の上限まで。中断時は次回の起動時に再試行）
+    batch_races = {race["job_id"]: race for race in all_races + retry_races}
+    total_count += len(retry_races)
+    while not interrupted:
+        retries = [
+            (job, when)
+            for job, when in journal.pending(target_date_str)
+            if job["job"] in batch_races and job["status"] == "failed"
+        ]
+        if not retries:
+            break
+        job, retry_at = retries[0]
+        race = batch_races[job["job"]]
+        wait_time = (retry_at - datetime.now()).total_seconds()
+        print(
+            f"\n🔁 再試行: {race['venue_name']} {race['race_no']}R "
+            f"({job['attempts']}回失敗, {retry_at.strftime('%H:%M:%S')}に実行)"
+        )
+        try:
+            time.sleep(max(0.0, wait_time))
+        except KeyboardInterrupt:
+            print("\n\n実行を中断しました")
+            notify_mac("競艇スケジューラ", "バッチ実行を中断しました")
+            break
+        if run_journaled_job(
+            target_date_str,
+            job["job"],
+            "race",
+            {"venue_code": race["venue_code"], "race_no": race["race_no"]},
+            skip_existing=skip_existing,
+            use_subprocess=use_subprocess,
+            reschedule=False,
+        ):
+            success_count += 1
+            print(f"✓ 成功（再試行）: {race['venue_name']} {race['race_no']}R")
+        else:
+            print(f"✗ 失敗（再試行）: {race['venue_name']} {race['race_no']}R")
+
     end_time = datetime.now()
     total_time = end_time - start_time
 
@@ -435,6 +1110,13 @@ def execute_batch_mode(
     print(f"⏱️  実行時間: {total_time}")
     if total_count > 0:
         print(f"📈 成功率: {success_count/total_count*100:.1f}%")
+    average_timings = summarize_race_timings()
+    if average_timings:
+        print(
+            f"⏱️  平均所要時間/レース: 取得 {average_timings['fetch']:.2f}s / "
+            f"抽出 {average_timings['extract']:.2f}s / 保存 {average_timings['save']:.2f}s"
+        )
+    compact_parquet(target_date_str)
 
     # 完了通知
     notify_mac(
@@ -445,8 +1127,194 @@ def execute_batch_mode(
     return success_count > 0
 
 
-def execute_realtime_batch_mode(date_str, skip_existing=True, auto_yes=False):
-    """リアルタイムバッチモード: 過去レースをバッチ処理後、通常スケジュールへ移行（自動実行オプション追加）"""
+def date_range(start_date_str, end_date_str):
+    """開始日から終了日まで（両端を含む）の日付（YYYYMMDD）のリスト"""
+    start = datetime.strptime(start_date_str, "%Y%m%d")
+    end = datetime.strptime(end_date_str, "%Y%m%d")
+    return [
+        (start + timedelta(days=i)).strftime("%Y%m%d") for i in range((end - start).days + 1)
+    ]
+
+
+def plan_backfill_date(date_str, skip_existing=True, refresh_schedule=False):
+    """1日分の未取得レースをジョブ記録に予定として残し、未完了のジョブを返す
+
+    記録済みの日付はスケジュールを取得せずにジョブ記録から読み込む
+    （refresh_schedule=True なら記録済みでもスケジュールから一覧を作り直す）。
+    """
+    journal = get_job_journal()
+    if refresh_schedule or not (skip_existing and has_journaled_schedule(date_str, BATCH_PLAN_JOB)):
+        manifest = get_race_manifest()
+        scheduled_races = [
+            {
+                "venue_code": venue["code"],
+                "venue_name": venue["name"],
+                "race_no": race["race_no"],
+                "race_time": race["time"],
+            }
+            for venue, races in get_day_schedule(date_str)
+            for race in races
+        ]
+        if not scheduled_races:
+            return None
+        manifest.record_schedule(date_str, scheduled_races)
+        for race in scheduled_races:
+            if skip_existing and is_race_up_to_date(
+                manifest, date_str, race["venue_code"], race["race_no"]
+            ):
+                continue
+            journal.plan(
+                date_str,
+                race_job_id(race["venue_code"], race["race_no"]),
+                job_payload(
+                    "race",
+                    {"venue_code": race["venue_code"], "race_no": race["race_no"]},
+                    post_at=exec_datetime(date_str, race["race_time"]),
+                    name=f"{date_str} {race['venue_name']} {race['race_no']}R",
+                ),
+                replan=True,
+            )
+        record_schedule_job(date_str, BATCH_PLAN_JOB)
+    race_jobs = {job["job"] for job in journaled_race_jobs(date_str)}
+    return [(job, when) for job, when in journal.pending(date_str) if job["job"] in race_jobs]
+
+
+def backfill_progress(dates):
+    """期間内のジョブ数（終了済み, 全体）"""
+    done = total = 0
+    for date_str in dates:
+        for job in journaled_race_jobs(date_str):
+            total += 1
+            if job["status"] in FINISHED_STATUSES:
+                done += 1
+    return done, total
+
+
+def execute_backfill_mode(
+    start_date_str,
+    end_date_str,
+    workers=None,
+    skip_existing=True,
+    auto_yes=False,
+    use_subprocess=False,
+    refresh_schedule=False,
+):
+    """期間内の全レースを取得（保存済みのレースはスキップ、中断してもジョブ記録から再開）
+
+    レースは古い順にバックログとして workers 件ずつ並行に取得し、固定の待機時間は置かない。
+    リクエストの間隔・同時接続数は rate_limiter（--rate / --concurrency）で制限する。
+    失敗したレースは job_journal の間隔で再試行する。
+    """
+    workers = workers or BACKFILL_WORKERS
+    yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y%m%d")
+    if end_date_str > yesterday:
+        print(f"⚠️  終了日を前日（{yesterday}）までに制限します（当日以降はリアルタイムモードで取得）")
+        end_date_str = yesterday
+    dates = date_range(start_date_str, end_date_str)
+    if not dates:
+        print("対象の日付がありません")
+        return False
+
+    print(f"\n=== バックフィル: {start_date_str}〜{end_date_str}（{len(dates)}日） ===")
+    print(f"🧵 同時取得レース数: {workers}")
+    if skip_existing:
+        print(f"⏭️  既存ファイルスキップ: 有効")
+    else:
+        print(f"🔄 既存ファイル再処理: 有効")
+
+    # 日付ごとのレース一覧（記録済みの日付はジョブ記録から読み込む）
+    started = time.perf_counter()
+    pending = []
+    for i, date_str in enumerate(dates, 1):
+        setup_directories(date_str)
+        jobs = plan_backfill_date(
+            date_str, skip_existing=skip_existing, refresh_schedule=refresh_schedule
+        )
+        if jobs is None:
+            print(f"[{i}/{len(dates)}] {date_str}: レースなし")
+            continue
+        print(f"[{i}/{len(dates)}] {date_str}: 未取得 {len(jobs)}レース")
+        pending.extend((date_str, job, when) for job, when in jobs)
+    done, total = backfill_progress(dates)
+    print(
+        f"\n📊 全{total}レース: 取得済み {done}レース / 未取得 {len(pending)}レース "
+        f"（一覧作成 {time.perf_counter() - started:.1f}s）"
+    )
+
+    if not pending:
+        print("✅ 期間内のレースはすべて取得済みです")
+        return True
+
+    if not auto_yes:
+        response = input(f"\n{len(pending)}レースを取得しますか？ (y/N): ")
+        if response.lower() != "y":
+            print("実行をキャンセルしました")
+            return False
+
+    notify_mac(
+        "競艇スケジューラ",
+        f"バックフィル開始: {start_date_str}〜{end_date_str} ({len(pending)}レース)",
+    )
+
+    # 時刻指定の枠（再試行用）を除いた workers 件をバックログの取得に使う
+    timer = TimerScheduler(max_workers=workers + RESERVED_WORKERS)
+    for date_str, job, when in pending:
+        dispatch_journaled_job(
+            timer, date_str, job, when, skip_existing=skip_existing, use_subprocess=use_subprocess
+        )
+
+    start_time = datetime.now()
+    done_before = done
+    try:
+        while not timer.wait_idle(timeout=BACKFILL_STATUS_INTERVAL):
+            done, total = backfill_progress(dates)
+            elapsed = (datetime.now() - start_time).total_seconds()
+            finished = done - done_before
+            message = f"進捗: {done}/{total}レース"
+            if finished:
+                remaining = elapsed / finished * (total - done)
+                eta = datetime.now() + timedelta(seconds=remaining)
+                message += (
+                    f" / {finished / elapsed * 60:.1f}レース/分"
+                    f" / 残り約{timedelta(seconds=int(remaining))}（{eta.strftime('%m/%d %H:%M')}完了予定）"
+                )
+            print(f"🕐 {datetime.now().strftime('%H:%M')} - {message}")
+            print(f"📶 {format_fetch_rate()}")
+            logging.info(f"バックフィル{message} / {timer.format_stats()} / {format_fetch_rate()}")
+    except KeyboardInterrupt:
+        timer.shutdown(wait=False)
+        print("\n🛑 バックフィルを中断しました（同じコマンドで続きから再開できます）")
+        notify_mac("競艇スケジューラ", "バックフィルを中断しました")
+        return False
+    timer.shutdown()
+
+    failed = sum(
+        1
+        for date_str in dates
+        for job in journaled_race_jobs(date_str)
+        if job["status"] == "abandoned"
+    )
+    done, total = backfill_progress(dates)
+    print(f"\n=== バックフィル結果 ===")
+    print(f"📊 取得: {done - failed}/{total}レース")
+    print(f"❌ 失敗（再試行の上限）: {failed}レース")
+    print(f"⏱️  実行時間: {datetime.now() - start_time}")
+    for date_str in dates:
+        compact_parquet(date_str)
+    notify_mac(
+        "競艇スケジューラ",
+        f"バックフィル完了: {start_date_str}〜{end_date_str}\n取得: {done - failed}/{total}レース",
+    )
+    return failed == 0
+
+
+def execute_realtime_batch_mode(
+    date_str, skip_existing=True, auto_yes=False, use_subprocess=False
+):
+    """リアルタイムバッチモード: 過去レースはバックログとして優先度順に、未来レースは実行時刻ちょうどに実行
+
+    どちらも timer_scheduler の同じワーカープールで実行する。取得の間隔は rate_limiter の設定に従う。
+    """
     print(f"\n=== リアルタイムバッチモード: {date_str} ===")
     initial_time = datetime.now()
     initial_time_str = initial_time.strftime("%H:%M")
@@ -469,8 +1337,8 @@ def execute_realtime_batch_mode(date_str, skip_existing=True, auto_yes=False):
 
     # 全レース情報を収集
     all_races = []
-    for venue in venues:
-        races = get_race_schedule(venue["code"], date_str)
+    manifest = get_race_manifest()
+    for venue, races in get_day_schedule(date_str, venues):
         for race in races:
             # 実行予定時刻を計算（レース開始10分前）
             race_time_obj = datetime.strptime(race["time"], "%H:%M")
@@ -487,7 +1355,8 @@ def execute_realtime_batch_mode(date_str, skip_existing=True, auto_yes=False):
             }
 
             all_races.append(race_info)
-        time.sleep(1)
+
+    manifest.record_schedule(date_str, all_races)
 
     if not all_races:
         print("実行対象のレースが見つかりませんでした")
@@ -497,209 +1366,127 @@ def execute_realtime_batch_mode(date_str, skip_existing=True, auto_yes=False):
     # 開始通知
     notify_mac("競艇スケジューラ", f"リアルタイムバッチ開始: {date_str}")
 
-    # メインループ：動的に過去レースを処理
-    processed_races = set()  # 処理済みレースを追跡
-    min_interval = 60  # デフォルト値
-    max_interval = 80  # デフォルト値
-
-    while True:
-        current_time = datetime.now()
-        current_time_str = current_time.strftime("%H:%M")
-        current_time_only = datetime.strptime(current_time_str, "%H:%M")
-
-        # 未処理のレースを分類
-        past_races = []
-        future_races = []
-        skipped_races = []
-
-        for race in all_races:
-            # レースIDを生成（重複処理防止）
-            race_id = f"{race['venue_name']}_{race['race_no']}"
-
-            # 既に処理済みの場合はスキップ
-            if race_id in processed_races:
-                continue
-
-            # ファイル存在確認
-            if skip_existing:
-                output_file = f"data/races/{date_str}/{date_str}_{race['venue_name']}_{race['race_no']}.json"
-                if os.path.exists(output_file):
-                    skipped_races.append(race)
-                    processed_races.add(race_id)  # 処理済みとしてマーク
-                    continue
-
-            # 時刻による分類
-            if race["exec_time_obj"] <= current_time_only:
-                past_races.append(race)
-            else:
-                future_races.append(race)
-
-        # ソート
-        past_races.sort(key=lambda x: x["exec_time"])
-        future_races.sort(key=lambda x: x["exec_time"])
-
-        print(f"\n📊 レース分析 ({current_time_str}時点):")
-        print(f"処理済み: {len(processed_races)}件")
-        if skip_existing and skipped_races:
-            print(f"既存ファイル（スキップ）: {len(skipped_races)}件")
-        print(f"過去レース（未処理）: {len(past_races)}件")
-        print(f"未来レース: {len(future_races)}件")
-
-        # 過去レースがある場合、バッチ処理を実行
-        if past_races:
-            print(f"\n⚠️  未処理の過去レースが{len(past_races)}件見つかりました")
-
-            # 初回のみ間隔入力を求める（自動実行モードでない場合）
-            if len(processed_races) == len(skipped_races):  # 初回判定を修正
-                print("\nこれらのレースをバッチ実行します")
-                if auto_yes:
-                    print(
-                        f"🤖 自動実行モード: デフォルト値を使用 ({min_interval}〜{max_interval}秒)"
-                    )
-                else:
-                    while True:
-                        try:
-                            min_input = input("min-interval (秒) [60]: ").strip()
-                            min_interval = int(min_input) if min_input else 60
-
-                            max_input = input("max-interval (秒) [80]: ").strip()
-                            max_interval = int(max_input) if max_input else 80
-
-                            if min_interval > 0 and max_interval >= min_interval:
-                                break
-                            else:
-                                print(
-                                    "❌ 無効な値です。min > 0 かつ max >= min である必要があります。"
-                                )
-                        except ValueError:
-                            print("❌ 数値を入力してください。")
-            else:
-                # 2回目以降は前回の設定を使用
-                print(f"前回の設定を使用: {min_interval}〜{max_interval}秒")
+    # 実行時刻を過ぎたレースはバックログ、それ以外は実行時刻に登録（同じワーカープールで実行）
+    timer = get_timer_scheduler()
+    timer.clear(tag=date_str)
+    now = datetime.now()
+    past_races = []
+    future_races = []
+    skipped_races = []
+    for race in all_races:
+        # 保存済み確認（台帳を参照。直前情報の取り直しが必要なものは対象に残す）
+        if skip_existing and is_race_up_to_date(
+            manifest, date_str, race["venue_code"], race["race_no"]
+        ):
+            skipped_races.append(race)
+        elif exec_datetime(date_str, race["exec_time"]) <= now:
+            past_races.append(race)
+        else:
+            future_races.append(race)
+    future_races.sort(key=lambda x: x["exec_time"])
 
-            print(
-                f"\n✅ {min_interval}〜{max_interval}秒のランダム間隔でバッチ実行を開始します..."
+    print(f"\n📊 レース分析 ({now.strftime('%H:%M')}時点):")
+    if skip_existing and skipped_races:
+        print(f"既存ファイル（スキップ）: {len(skipped_races)}件")
+    print(f"過去レース（未処理）: {len(past_races)}件")
+    print(f"未来レース: {len(future_races)}件")
+
+    if past_races:
+        # 発走前のレースを発走が近い順に、その後に終了済みのレースを実行（優先度は実行直前に再計算）
+        for race in past_races:
+            plan_job(
+                timer,
+                date_str,
+                race_job_id(race["venue_code"], race["race_no"]),
+                "race",
+                {"venue_code": race["venue_code"], "race_no": race["race_no"]},
+                post_at=exec_datetime(date_str, race["race_time"]),
+                name=f"{race['venue_name']} {race['race_no']}R",
+                skip_existing=skip_existing,
+                use_subprocess=use_subprocess,
+                replan=True,
             )
-
-            # バッチ実行
-            for i, race in enumerate(past_races, 1):
-                print(
-                    f"\n[{i}/{len(past_races)}] {race['venue_name']} {race['race_no']}R"
-                )
-
-                # main.py実行（skip_existingを適切に渡す）
-                success = run_prediction(
-                    race["venue_code"],
-                    race["race_no"],
-                    race["target_date"],
-                    skip_existing=skip_existing,
-                )
-
-                if success:
-                    print(f"✓ 処理完了: {race['venue_name']} {race['race_no']}R")
-                else:
-                    print(f"✗ 失敗: {race['venue_name']} {race['race_no']}R")
-
-                # 処理済みとしてマーク
-                race_id = f"{race['venue_name']}_{race['race_no']}"
-                processed_races.add(race_id)
-
-                # 待機（最後以外）
-                if i < len(past_races):
-                    wait_time = random.uniform(min_interval, max_interval)
-                    print(f"⏳ {wait_time:.1f}秒待機中...")
-                    time.sleep(wait_time)
-
-            # 処理後、再度チェックを行う（ループ継続）
-            continue
-
-        # 過去レースが全て処理済みの場合、通常スケジュールモードへ移行
-        print(f"\n✅ 全ての過去レースの処理が完了しました！")
-        print(f"🔄 通常のスケジュールモードに移行します...")
-
-        # 未来のレースをスケジュール
-        schedule.clear()
-        scheduled_count = 0
-
-        for race in future_races:
-            schedule.every().day.at(race["exec_time"]).do(
-                run_prediction,
-                venue_code=race["venue_code"],
-                race_no=race["race_no"],
-                date_str=race["target_date"],
+        print(f"\n⚠️  未処理の過去レース{len(past_races)}件を優先度順に実行します")
+        for job in timer.backlog()[:5]:
+            print(f"- {job.name}")
+        if len(past_races) > 5:
+            print(f"... 他 {len(past_races) - 5}件")
+
+    for race in future_races:
+        if USE_TIMELINE:
+            schedule_race_timeline(
+                timer,
+                {"code": race["venue_code"], "name": race["venue_name"]},
+                race["race_no"],
+                race["race_time"],
+                race["target_date"],
+                skip_existing=skip_existing,
+                use_subprocess=use_subprocess,
+            )
+        else:
+            plan_job(
+                timer,
+                date_str,
+                race_job_id(race["venue_code"], race["race_no"]),
+                "race",
+                {"venue_code": race["venue_code"], "race_no": race["race_no"]},
+                run_at=exec_datetime(race["target_date"], race["exec_time"]),
+                post_at=exec_datetime(race["target_date"], race["race_time"]),
+                name=f"{race['venue_name']} {race['race_no']}R",
                 skip_existing=skip_existing,  # skip_existingを渡す
+                use_subprocess=use_subprocess,
+                replan=True,
             )
-            scheduled_count += 1
-
-        if scheduled_count > 0:
-            print(f"\n次回実行予定：")
-            # 直近5件を表示
-            for race in future_races[:5]:
-                print(
-                    f"- {race['venue_name']} {race['race_no']}R - {race['exec_time']}に実行予定"
-                )
-            if len(future_races) > 5:
-                print(f"... 他 {len(future_races) - 5}件")
 
-            print(f"\n🔄 スケジューラが開始されました。{date_str}のレースを監視中...")
-            print("Ctrl+Cで停止")
+    record_schedule_job(date_str)
 
-            # スケジューラ開始通知
-            notify_mac(
-                "競艇スケジューラ", f"スケジューラ開始: {scheduled_count}レース待機中"
+    if future_races:
+        print(f"\n次回実行予定：")
+        # 直近5件を表示
+        for race in future_races[:5]:
+            print(
+                f"- {race['venue_name']} {race['race_no']}R - {race['exec_time']}に実行予定"
             )
+        if len(future_races) > 5:
+            print(f"... 他 {len(future_races) - 5}件")
 
-            try:
-                while True:
-                    # 定期的に過去レースの再チェック（5分ごと）
-                    if datetime.now().minute % 5 == 0 and datetime.now().second < 30:
-                        current_check_time = datetime.now()
-                        current_check_str = current_check_time.strftime("%H:%M")
-                        current_check_only = datetime.strptime(
-                            current_check_str, "%H:%M"
-                        )
-
-                        # 新たに過去になったレースをチェック
-                        newly_past = []
-                        for race in future_races:
-                            race_id = f"{race['venue_name']}_{race['race_no']}"
-                            if (
-                                race_id not in processed_races
-                                and race["exec_time_obj"] <= current_check_only
-                            ):
-                                newly_past.append(race)
-
-                        if newly_past:
-                            print(
-                                f"\n⚠️  新たに過去になったレースを検出: {len(newly_past)}件"
-                            )
-                            # メインループに戻る
-                            break
-
-                    schedule.run_pending()
-                    time.sleep(30)
+    if not past_races and not future_races:
+        print("\n今後実行予定のレースはありません")
+        notify_mac("競艇スケジューラ", f"{date_str}: 実行予定レースなし")
+    else:
+        print(f"\n🔄 スケジューラが開始されました。{date_str}のレースを監視中...")
+        print("Ctrl+Cで停止")
 
-            except KeyboardInterrupt:
-                print("\n🛑 スケジューラを停止しました")
-                notify_mac("競艇スケジューラ", "スケジューラを停止しました")
-                return True
+        # スケジューラ開始通知
+        notify_mac(
+            "競艇スケジューラ",
+            f"スケジューラ開始: 過去{len(past_races)}レース・{len(future_races)}レース待機中",
+        )
 
-            # newly_pastが検出された場合、ループの最初に戻る
-            if "newly_past" in locals() and newly_past:
-                continue
-            else:
-                break
-        else:
-            print("\n今後実行予定のレースはありません")
-            notify_mac("競艇スケジューラ", f"{date_str}: 実行予定レースなし")
-            break
+        try:
+            # 登録したレースがすべて実行されるまで待機（5分ごとにキューの状態を表示）
+            while not timer.wait_idle(timeout=STATUS_INTERVAL, tag=date_str):
+                print(f"🕐 {datetime.now().strftime('%H:%M')} - {timer.format_stats()}")
+                print(f"📶 {format_fetch_rate()}")
+                logging.info(f"スケジューラ: {timer.format_stats()} / {format_fetch_rate()}")
+
+        except KeyboardInterrupt:
+            timer.clear(tag=date_str)
+            print("\n🛑 スケジューラを停止しました")
+            notify_mac("競艇スケジューラ", "スケジューラを停止しました")
+            return True
+
+        logging.info(f"スケジューラ: {timer.format_stats()}")
+        print(f"📊 {timer.format_stats()}")
 
     # 完了通知
     notify_mac("競艇スケジューラ", f"リアルタイムバッチ完了: {date_str}")
     return True
 
 
-def schedule_races_for_day(date_str=None, test_mode=False, skip_existing=True):
+def schedule_races_for_day(
+    date_str=None, test_mode=False, skip_existing=True, use_subprocess=False
+):
     """その日のレース全てをスケジュール（デフォルトでスキップ有効）"""
     if date_str is None:
         date_str = datetime.now().strftime("%Y%m%d")
@@ -710,16 +1497,16 @@ def schedule_races_for_day(date_str=None, test_mode=False, skip_existing=True):
         logging.info("テストモード: スケジュールは設定されません")
 
     setup_directories(date_str)
-    schedule.clear()
+    # 登録済みのジョブはジョブIDで置き換わるので、取り消さずに登録し直す
+    timer = get_timer_scheduler()
 
     venues = get_venue_list(date_str)
     logging.info(f"本日のレース場: {len(venues)}箇所")
 
     all_schedules = []
 
-    for venue in venues:
+    for venue, races in get_day_schedule(date_str, venues):
         try:
-            races = get_race_schedule(venue["code"], date_str)
             logging.info(f"{venue['name']}({venue['code']}): {len(races)}レース")
 
             for race in races:
@@ -741,21 +1528,44 @@ def schedule_races_for_day(date_str=None, test_mode=False, skip_existing=True):
                     }
                 )
 
-                if not test_mode:
-                    schedule.every().day.at(exec_time).do(
-                        run_prediction,
-                        venue_code=venue["code"],
-                        race_no=race_no,
-                        date_str=date_str,
+                # 実行時刻を過ぎたレースは登録しない（再確認時の二重実行を防ぐ）
+                exec_at = exec_datetime(date_str, exec_time)
+                if test_mode:
+                    action = "確認"
+                elif USE_TIMELINE:
+                    stages = schedule_race_timeline(
+                        timer,
+                        venue,
+                        race_no,
+                        race_time,
+                        date_str,
+                        skip_existing=skip_existing,
+                        use_subprocess=use_subprocess,
+                    )
+                    action = "追加（段階: " + (
+                        ", ".join(f"{stage} {run_at:%H:%M}" for stage, run_at in stages) or "なし"
+                    ) + "）"
+                elif exec_at <= datetime.now():
+                    action = "対象外（実行時刻経過）"
+                else:
+                    plan_job(
+                        timer,
+                        date_str,
+                        race_job_id(venue["code"], race_no),
+                        "race",
+                        {"venue_code": venue["code"], "race_no": race_no},
+                        run_at=exec_at,
+                        post_at=exec_datetime(date_str, race_time),
+                        name=f"{venue['name']} {race_no}R",
                         skip_existing=skip_existing,  # skip_existingを渡す
+                        use_subprocess=use_subprocess,
                     )
+                    action = "追加"
 
                 logging.info(
-                    f"スケジュール{'確認' if test_mode else '追加'}: {venue['name']} {race_no}R - {race_time}（main.py実行: {exec_time}）"
+                    f"スケジュール{action}: {venue['name']} {race_no}R - {race_time}（main.py実行: {exec_time}）"
                 )
 
-            time.sleep(1)
-
         except Exception as e:
             logging.error(
                 f"エラー: {venue['name']}のデータ取得中に問題が発生しました: {e}"
@@ -771,11 +1581,13 @@ def schedule_races_for_day(date_str=None, test_mode=False, skip_existing=True):
         total_races = len(all_schedules)
         venues_count = len(venues)
         logging.info(f"スケジュール設定完了: {venues_count}会場, {total_races}レース")
+        if not test_mode:
+            record_schedule_job(date_str)
 
     return len(all_schedules) > 0
 
 
-def run_continuous_scheduler(skip_existing=True):
+def run_continuous_scheduler(skip_existing=True, use_subprocess=False):
     """日付変更対応の連続スケジューラ（デフォルトでスキップ有効）"""
     print("🔄 連続スケジューラ開始（日付変更対応・リアルタイム専用）")
     if skip_existing:
@@ -786,6 +1598,19 @@ def run_continuous_scheduler(skip_existing=True):
 
     current_date = None
     last_schedule_check = datetime.now()
+    timer = get_timer_scheduler()
+
+    # 当日のジョブ記録があれば、スケジュールを取得せずに未完了のジョブから再開する
+    today = last_schedule_check.strftime("%Y%m%d")
+    if has_journaled_schedule(today):
+        started = time.perf_counter()
+        resumed = resume_journal(
+            timer, today, skip_existing=skip_existing, use_subprocess=use_subprocess
+        )
+        elapsed = time.perf_counter() - started
+        print(f"♻️  ジョブ記録から再開: {today} 未完了 {resumed}件 ({elapsed * 1000:.0f}ms)")
+        logging.info(f"ジョブ記録から再開: {today} 未完了 {resumed}件 ({elapsed:.3f}s)")
+        current_date = today
 
     try:
         while True:
@@ -799,7 +1624,10 @@ def run_continuous_scheduler(skip_existing=True):
 
                 # 新しい日付のスケジュールを設定
                 has_races = schedule_races_for_day(
-                    today, test_mode=False, skip_existing=skip_existing
+                    today,
+                    test_mode=False,
+                    skip_existing=skip_existing,
+                    use_subprocess=use_subprocess,
                 )
 
                 if has_races:
@@ -814,20 +1642,28 @@ def run_continuous_scheduler(skip_existing=True):
             elif (now - last_schedule_check).seconds > 3600:
                 print(f"🔍 スケジュール再確認: {today}")
                 schedule_races_for_day(
-                    today, test_mode=False, skip_existing=skip_existing
+                    today,
+                    test_mode=False,
+                    skip_existing=skip_existing,
+                    use_subprocess=use_subprocess,
                 )
                 last_schedule_check = now
 
-            # 現在時刻を表示（5分ごと）
-            if now.minute % 5 == 0 and now.second == 0:
-                job_count = len(schedule.get_jobs())
-                print(f"🕐 {now.strftime('%H:%M')} - 待機中ジョブ: {job_count}件")
-
-            # スケジュール実行
-            schedule.run_pending()
-            time.sleep(30)  # 30秒ごとにチェック
+            # レースの実行は timer_scheduler が時刻ちょうどに行うので、ここでは
+            # 日付変更・再確認・状態表示（5分ごと）のいずれか早い時刻まで待機するだけ
+            next_day = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+            wake_at = min(
+                next_day,
+                last_schedule_check + timedelta(seconds=3601),
+                now + timedelta(seconds=STATUS_INTERVAL),
+            )
+            time.sleep(max(0.0, (wake_at - datetime.now()).total_seconds()))
+            print(f"🕐 {datetime.now().strftime('%H:%M')} - {timer.format_stats()}")
+            print(f"📶 {format_fetch_rate()}")
+            logging.info(f"スケジューラ: {timer.format_stats()} / {format_fetch_rate()}")
 
     except KeyboardInterrupt:
+        timer.shutdown(wait=False)
         logging.info("連続スケジューラを手動停止しました")
         print("\n🛑 連続スケジューラを停止しました")
 
@@ -849,10 +1685,25 @@ def main():
         "--batch", action="store_true", help="バッチモード（指定日のレースを順次実行）"
     )
     parser.add_argument(
-        "--min-interval", type=int, default=60, help="バッチモードでの最小間隔（秒）"
+        "--min-interval",
+        type=int,
+        help="バッチモードでの最小間隔（秒、未指定時は待機せず送信間隔を自動調整）",
+    )
+    parser.add_argument(
+        "--max-interval",
+        type=int,
+        help="バッチモードでの最大間隔（秒、未指定時は待機せず送信間隔を自動調整）",
+    )
+    parser.add_argument(
+        "--backfill",
+        nargs=2,
+        metavar=("START", "END"),
+        help="期間バックフィル（開始日〜終了日の全レースを並行取得、保存済みはスキップ、中断後は続きから再開）",
     )
     parser.add_argument(
-        "--max-interval", type=int, default=80, help="バッチモードでの最大間隔（秒）"
+        "--backfill-workers",
+        type=int,
+        help="バックフィルで同時に取得するレース数（デフォルト 3。リクエスト数は --rate / --concurrency で制限）",
     )
     parser.add_argument(
         "--continuous",
@@ -867,8 +1718,95 @@ def main():
     parser.add_argument(
         "--yes", "-y", action="store_true", help="確認プロンプトを自動でYesとして実行"
     )
+    parser.add_argument(
+        "--subprocess",
+        action="store_true",
+        help="レースごとにmain.pyを別プロセスで実行（分離実行、デフォルトは同一プロセス）",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        help="kyoteibiyori.comへの1秒あたりのリクエスト数（rate_limiter.RATE_LIMITSを上書き）",
+    )
+    parser.add_argument(
+        "--burst", type=int, help="kyoteibiyori.comへの連続送信数の上限"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, help="kyoteibiyori.comへの同時接続数の上限"
+    )
+    parser.add_argument(
+        "--no-adaptive",
+        action="store_true",
+        help="kyoteibiyori.comへのレート・同時接続数の自動調整を無効化（--rate / --concurrency の値に固定）",
+    )
+    parser.add_argument(
+        "--refresh-chokuzen",
+        action="store_true",
+        help="保存済みレースのうち直前情報が古い・代替データのものについて、直前情報だけを取り直す",
+    )
+    parser.add_argument(
+        "--timeline",
+        action="store_true",
+        help="レースごとに段階を分けて取得（出走表は60分前、直前情報は10分前と3分前、今節成績はレース後）",
+    )
+    parser.add_argument(
+        "--refresh-schedule",
+        action="store_true",
+        help="保存済みのレース場一覧・レース時刻（schedule_cache）を使わずに取り直す",
+    )
+    parser.add_argument(
+        "--schedule-workers",
+        type=int,
+        help="会場ごとのレース時刻を並行取得するスレッド数（デフォルト 4）",
+    )
+    parser.add_argument(
+        "--dedup-racers",
+        action="store_true",
+        help="選手の経歴系データを data/racers に選手単位で保存（レースファイルは参照のみ）",
+    )
+    parser.add_argument(
+        "--archive-raw",
+        action="store_true",
+        help="APIレスポンスの生データを data/raw にアーカイブ（raw_archive.py replay で再抽出可能）",
+    )
+    parser.add_argument(
+        "--normalize",
+        action="store_true",
+        help="数値項目を単位付きの数値に変換して保存（main.py の --normalize と同じ）",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="レースJSONをインデントなしで保存（main.py の --compact と同じ）",
+    )
+    parser.add_argument(
+        "--output",
+        action="append",
+        default=[],
+        choices=sorted(EXTRA_OUTPUT_WRITERS),
+        help="JSONに加えて書き出す形式（main.py の --output と同じ）",
+    )
     args = parser.parse_args()
 
+    global ARCHIVE_RAW, SCHEDULE_WORKERS, USE_TIMELINE
+    PIPELINE_OPTIONS["dedup_racers"] = args.dedup_racers
+    PIPELINE_OPTIONS["extra_outputs"] = args.output
+    PIPELINE_OPTIONS["normalize"] = args.normalize
+    PIPELINE_OPTIONS["compact"] = args.compact
+    ARCHIVE_RAW = args.archive_raw
+    USE_TIMELINE = args.timeline
+    if args.schedule_workers:
+        SCHEDULE_WORKERS = args.schedule_workers
+
+    # レート制限の設定（指定がなければ rate_limiter.RATE_LIMITS の値）
+    get_rate_limiter().configure(
+        "kyoteibiyori.com",
+        rate=args.rate,
+        burst=args.burst,
+        concurrency=args.concurrency,
+        adaptive=False if args.no_adaptive else None,
+    )
+
     # skip_existingの設定（デフォルトTrue、--no-skipでFalse）
     skip_existing = not args.no_skip
 
@@ -878,19 +1816,47 @@ def main():
     # 日付形式を柔軟に処理
     try:
         args.date = parse_date_flexible(args.date)
+        if args.backfill:
+            args.backfill = [parse_date_flexible(d) for d in args.backfill]
     except ValueError as e:
         print(f"❌ {e}")
         notify_mac("競艇スケジューラ", f"エラー: {e}")
         return
 
+    if args.refresh_schedule:
+        # バックフィルでは期間内の全日付を取り直す
+        for date_str in date_range(*args.backfill) if args.backfill else [args.date]:
+            get_schedule_cache().invalidate(date_str)
+
     logging.info("競艇予測スケジューラ（main.py版）を開始します")
 
+    # 直前情報の取り直しモード
+    if args.refresh_chokuzen:
+        execute_chokuzen_refresh(args.date, use_subprocess=args.subprocess)
+        return
+
+    # 期間バックフィルモード
+    if args.backfill:
+        start_date, end_date = args.backfill
+        execute_backfill_mode(
+            start_date,
+            end_date,
+            workers=args.backfill_workers,
+            skip_existing=skip_existing,
+            auto_yes=auto_yes,
+            use_subprocess=args.subprocess,
+            refresh_schedule=args.refresh_schedule,
+        )
+        return
+
     # 連続実行モード（リアルタイム専用）
     if args.continuous:
         print("🔄 連続実行モード: 日付変更に対応して継続実行（リアルタイム専用）")
         if auto_yes:
             print("🤖 自動実行モード: 有効")
-        run_continuous_scheduler(skip_existing=skip_existing)
+        run_continuous_scheduler(
+            skip_existing=skip_existing, use_subprocess=args.subprocess
+        )
         return
 
     # 日付判定
@@ -900,7 +1866,14 @@ def main():
     is_today = args.date == today
 
     # バッチモード判定
-    interval_specified = args.min_interval != 60 or args.max_interval != 80
+    interval_specified = args.min_interval is not None or args.max_interval is not None
+    if interval_specified:
+        # 片方だけ指定された場合はもう片方を同じ値にする
+        if args.min_interval is None:
+            args.min_interval = args.max_interval
+        if args.max_interval is None:
+            args.max_interval = args.min_interval
+        args.max_interval = max(args.min_interval, args.max_interval)
 
     # 今日の日付で、バッチモード指定なし、間隔指定なしの場合
     if is_today and not args.batch and not interval_specified:
@@ -913,7 +1886,10 @@ def main():
         if auto_yes:
             print("🤖 自動実行モード: 有効")
         success = execute_realtime_batch_mode(
-            args.date, skip_existing=skip_existing, auto_yes=auto_yes
+            args.date,
+            skip_existing=skip_existing,
+            auto_yes=auto_yes,
+            use_subprocess=args.subprocess,
         )
         return
 
@@ -933,9 +1909,12 @@ def main():
             print(f"⏱️  間隔指定バッチモード: {args.date}")
             print(f"指定間隔: {args.min_interval}〜{args.max_interval}秒")
 
-        print(
-            f"📊 バッチモード: {args.date}の全レースを{args.min_interval}〜{args.max_interval}秒ランダム間隔で順次実行"
-        )
+        if interval_specified:
+            print(
+                f"📊 バッチモード: {args.date}の全レースを{args.min_interval}〜{args.max_interval}秒ランダム間隔で順次実行"
+            )
+        else:
+            print(f"📊 バッチモード: {args.date}の全レースを順次実行（送信間隔は自動調整）")
         if skip_existing:
             print("⏭️  既存ファイルスキップ: 有効（--no-skipで無効化可能）")
         else:
@@ -949,6 +1928,7 @@ def main():
             args.max_interval,
             skip_existing=skip_existing,
             auto_yes=auto_yes,
+            use_subprocess=args.subprocess,
         )
 
         if success:
@@ -4,20 +4,30 @@
 """
 
 import sys
-import json
-import requests
+import argparse
+import asyncio
 import time
-import random
 from datetime import datetime
 import os
 import subprocess
 
+from scraper import KyoteiBiyoriScraper
+from async_scraper import AsyncKyoteiBiyoriScraper
+
 # 各情報抽出モジュールをインポート
-from basic_info import extract_basic_info
-from course_info import extract_course_info
-from motor_info import extract_motor_info
-from session_results import extract_session_results
+from extraction import extract_sections
 from before_info import extract_before_info, calculate_display_rankings
+from session_results import extract_session_results
+from racer_store import extract_with_racer_store, resolve_racer_refs
+from race_frame import RaceFrame, frame_path
+from raw_archive import get_raw_archive
+import parquet_store
+import sqlite_store
+from race_manifest import (
+    get_race_manifest, race_entry, section_hashes, changed_sections, section_freshness
+)
+from race_record import RaceRecord, write_race_file
+from serialization import RACE_FILE_INDENT
 
 # 会場名とコードのマッピング（琵琶湖・びわこ両対応）
 STADIUM_CODES = {
@@ -39,7 +49,7 @@ def notify_mac(title, message):
         print(f"通知の送信に失敗しました: {e}")
         return False
 
-def setup_directories(date_str):
+def setup_directories(date_str, verbose=True):
     """データ保存用ディレクトリを作成"""
     try:
         os.makedirs("data/races", exist_ok=True)
@@ -51,106 +61,13 @@ def setup_directories(date_str):
         racers_date_dir = f"data/racers/{date_str}"
         os.makedirs(racers_date_dir, exist_ok=True)
         
-        print(f"ディレクトリ作成完了: {date_dir}, {racers_date_dir}")
+        if verbose:
+            print(f"ディレクトリ作成完了: {date_dir}, {racers_date_dir}")
         return date_dir, racers_date_dir
     except Exception as e:
         print(f"ディレクトリ作成エラー: {e}")
         return None, None
 
-class KyoteiBiyoriScraper:
-    def __init__(self):
-        self.base_url = "https://kyoteibiyori.com/request_race_shusso_detail_v4.php"
-        self.chokuzen_url = "https://kyoteibiyori.com/request_chokuzen_info_v2.php"
-        self.session = requests.Session()
-        
-    def get_race_data(self, place_no, race_no, hiduke, mode=0):
-        """競艇データを取得（基本・コース・モーター・今節成績用）"""
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36',
-            'Accept': 'application/json, text/javascript, */*; q=0.01',
-            'Accept-Language': 'ja,en-US;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br, zstd',
-            'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
-            'X-Requested-With': 'XMLHttpRequest',
-            'Origin': 'https://kyoteibiyori.com',
-            'Referer': f'https://kyoteibiyori.com/race_shusso.php?place_no={place_no}&race_no={race_no}&hiduke={hiduke}&slider=1',
-            'Cache-Control': 'no-cache',
-            'Pragma': 'no-cache',
-        }
-        
-        data = {
-            'data': json.dumps({
-                'place_no': place_no,
-                'race_no': race_no,
-                'hiduke': hiduke,
-                'mode': mode
-            })
-        }
-        
-        try:
-            time.sleep(random.uniform(1, 3))
-            
-            response = self.session.post(self.base_url, headers=headers, data=data)
-            response.raise_for_status()
-            
-            json_data = response.json()
-            
-            if isinstance(json_data, dict):
-                if 'race_list' in json_data:
-                    race_list = json_data['race_list']
-                    return race_list
-                else:
-                    return json_data
-            else:
-                return json_data
-                
-        except requests.exceptions.RequestException as e:
-            print(f"リクエストエラー (mode={mode}): {e}")
-            return None
-        except json.JSONDecodeError as e:
-            print(f"JSONデコードエラー (mode={mode}): {e}")
-            return None
-
-    def get_chokuzen_data(self, place_no, race_no, hiduke):
-        """直前情報を取得（新API）"""
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36',
-            'Accept': 'application/json, text/javascript, */*; q=0.01',
-            'Accept-Language': 'ja,en-US;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br, zstd',
-            'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
-            'X-Requested-With': 'XMLHttpRequest',
-            'Origin': 'https://kyoteibiyori.com',
-            'Referer': f'https://kyoteibiyori.com/race_shusso.php?place_no={place_no}&race_no={race_no}&hiduke={hiduke}&slider=1',
-            'Cache-Control': 'no-cache',
-            'Pragma': 'no-cache',
-        }
-        
-        data = {
-            'data': json.dumps({
-                'place_no': place_no,
-                'race_no': race_no,
-                'hiduke': hiduke
-            })
-        }
-        
-        try:
-            time.sleep(random.uniform(1, 3))
-            
-            response = self.session.post(self.chokuzen_url, headers=headers, data=data)
-            response.raise_for_status()
-            
-            json_data = response.json()
-            
-            return json_data
-                
-        except requests.exceptions.RequestException as e:
-            print(f"直前情報リクエストエラー: {e}")
-            return None
-        except json.JSONDecodeError as e:
-            print(f"直前情報JSONデコードエラー: {e}")
-            return None
-
 def get_stadium_code(stadium_name):
     """会場名から会場コードを取得（琵琶湖・びわこ両対応）"""
     if stadium_name in STADIUM_CODES:
@@ -160,131 +77,565 @@ def get_stadium_code(stadium_name):
         available_stadiums = list(STADIUM_CODES.keys())
         raise ValueError(f"無効な会場名: {stadium_name}\n利用可能な会場名: {', '.join(available_stadiums)}")
 
+class RaceDataError(Exception):
+    """レースデータの取得・抽出に失敗した場合の例外"""
+
+
+# 段階ごとの取得（process_race_stage）: 段階名 → (取得する生データ, 書き込むセクション)
+FETCH_STAGES = {
+    # 出走表（mode=0・mode=3）。当日中は変わらないので早めに取得
+    'entry': (
+        ('basic_raw_data', 'session_raw_data'),
+        ('basic_info', 'course_info', 'motor_info', 'session_results'),
+    ),
+    # 直前情報（展示）。発走前に公開・更新される
+    'chokuzen': (('chokuzen_raw_data',), ('before_info',)),
+    # 今節成績（mode=3）。レース後に取り直すとそのレースの結果が反映される
+    'results': (('session_raw_data',), ('session_results',)),
+}
+
+
+def fetch_raw_data(place_no, race_no, hiduke, scraper=None, parts=None):
+    """mode=0・直前情報・mode=3 の生データを並行取得
+
+    scraper を渡すと、その requests.Session を使い回す。
+    parts で取得する生データを絞り込める（取得しなかったものは None）。
+    """
+    engine = AsyncKyoteiBiyoriScraper(scraper=scraper)
+    if parts is None:
+        return asyncio.run(engine.fetch_race(place_no, race_no, hiduke))
+    return asyncio.run(engine.fetch_race(place_no, race_no, hiduke, parts=parts))
+
+
+def extract_card_sections(basic_raw_data, session_raw_data, hiduke, dedup_racers=False, normalize=False):
+    """mode=0・mode=3 から basic_info / course_info / motor_info / session_results を抽出
+
+    戻り値は (セクション名 → 選手ごとの辞書リスト, 新規保存した選手番号)。
+    dedup_racers=False の場合、新規保存した選手番号は常に空。
+    """
+    if not dedup_racers:
+        return extract_sections(basic_raw_data, session_raw_data, normalize=normalize), []
+    basic_data, course_data, saved = extract_with_racer_store(
+        basic_raw_data, hiduke, normalize=normalize
+    )
+    sections = extract_sections(
+        basic_raw_data,
+        session_raw_data,
+        sections=('motor_info', 'session_results'),
+        normalize=normalize,
+    )
+    sections['basic_info'] = basic_data
+    sections['course_info'] = course_data
+    return sections, saved
+
+
+def extract_stage_sections(stage, raw, hiduke, dedup_racers=False, normalize=False):
+    """段階ごとの生データから、その段階で書き込むセクションだけを抽出
+
+    必要な生データが取得できなかった場合（直前情報の公開前など）は RaceDataError を送出する。
+    """
+    basic_raw_data = raw.get('basic_raw_data')
+    chokuzen_raw_data = raw.get('chokuzen_raw_data')
+    session_raw_data = raw.get('session_raw_data')
+
+    if stage == 'entry':
+        if not (isinstance(basic_raw_data, list) and basic_raw_data):
+            raise RaceDataError("基本データの取得に失敗しました")
+        sections, _saved = extract_card_sections(
+            basic_raw_data, session_raw_data, hiduke, dedup_racers=dedup_racers, normalize=normalize
+        )
+    elif stage == 'chokuzen':
+        if not (isinstance(chokuzen_raw_data, list) and chokuzen_raw_data):
+            raise RaceDataError("直前情報が取得できません（未公開の可能性があります）")
+        sections = {'before_info': extract_before_info(chokuzen_raw_data, normalize=normalize)}
+    elif stage == 'results':
+        if not (isinstance(session_raw_data, list) and session_raw_data):
+            raise RaceDataError("今節成績データが取得できません")
+        sections = {'session_results': extract_session_results(session_raw_data, normalize=normalize)}
+    else:
+        raise ValueError(f"無効な取得段階: {stage}（利用可能: {', '.join(FETCH_STAGES)}）")
+
+    return {name: sections[name] for name in FETCH_STAGES[stage][1]}
+
+
+def build_race_data(
+    hiduke, stadium_name, place_no, race_no, raw, verbose=True, dedup_racers=False, normalize=False
+):
+    """生データから各種情報を抽出して保存用の辞書を組み立てる
+
+    dedup_racers=True の場合、選手の経歴系データは data/racers に選手単位で保存し、
+    basic_info / course_info には racer_ref で参照だけを残す。
+    normalize=True の場合、数値項目を normalize の対応表に沿って単位付きの数値に変換する
+    （race_info に "normalized": true を記録）。
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
+
+    basic_raw_data = raw['basic_raw_data']
+    chokuzen_raw_data = raw['chokuzen_raw_data']
+    session_raw_data = raw['session_raw_data']
+
+    log("\n=== 基本データ取得 ===")
+    if not basic_raw_data:
+        raise RaceDataError("基本データの取得に失敗しました")
+
+    log(f"✓ 基本データを取得: {len(basic_raw_data)}件")
+
+    # 直前情報を取得（新API）
+    log("\n=== 直前情報取得 ===")
+    if chokuzen_raw_data:
+        log(f"✓ 直前情報を取得: {len(chokuzen_raw_data)}件")
+
+        # 展示順位の確認表示
+        rankings = calculate_display_rankings(chokuzen_raw_data)
+        log("展示順位:")
+        for item in rankings:
+            log(f"  {item['rank']}位: {item['course']}コース - {item['display_time']}")
+    else:
+        log("⚠️  直前情報の取得に失敗しました（基本データから代替抽出します）")
+
+    # 各種情報を抽出
+    log("\n=== 情報抽出開始 ===")
+
+    final_data = {
+        "race_info": {
+            "date": hiduke,
+            "stadium": stadium_name,
+            "stadium_code": place_no,
+            "race_no": race_no,
+            "generated_at": datetime.now().isoformat()
+        }
+    }
+    if normalize:
+        final_data["race_info"]["normalized"] = True
+
+    if not (isinstance(basic_raw_data, list) and len(basic_raw_data) > 0):
+        raise RaceDataError("基本情報: データ形式が無効")
+
+    # mode=0 のデータを1回だけ走査して各セクションを抽出
+    session_available = bool(session_raw_data) and isinstance(session_raw_data, list)
+    if dedup_racers:
+        log("基本情報・枠別情報・モーター情報・今節成績を抽出中（選手データ参照形式）...")
+    else:
+        log("基本情報・枠別情報・モーター情報・今節成績を抽出中...")
+    sections, saved = extract_card_sections(
+        basic_raw_data, session_raw_data, hiduke, dedup_racers=dedup_racers, normalize=normalize
+    )
+    if dedup_racers:
+        log(f"✓ 基本情報・枠別情報: {len(sections['basic_info'])}名分を抽出（選手データ新規保存: {len(saved)}名）")
+    else:
+        log(f"✓ 基本情報: {len(sections['basic_info'])}名分を抽出")
+        log(f"✓ 枠別情報: {len(sections['course_info'])}名分を抽出")
+
+    for section_name in ('basic_info', 'course_info', 'motor_info', 'session_results'):
+        final_data[section_name] = sections[section_name]
+
+    log(f"✓ モーター情報: {len(sections['motor_info'])}名分を抽出")
+    if session_available:
+        log(f"✓ 今節成績: {len(sections['session_results'])}名分を抽出")
+    else:
+        log("⚠️  今節成績データが取得できません（基本データから代替抽出）")
+        log(f"✓ 今節成績（基本データから）: {len(sections['session_results'])}名分を抽出")
+
+    # 直前情報を抽出（新API使用）
+    log("直前情報を抽出中...")
+    if chokuzen_raw_data and isinstance(chokuzen_raw_data, list):
+        before_data = extract_before_info(chokuzen_raw_data, normalize=normalize)
+        final_data['before_info'] = before_data
+        log(f"✓ 直前情報: {len(before_data)}名分を抽出")
+    else:
+        log("⚠️  直前情報データが取得できません（基本データから代替抽出）")
+        before_data = extract_before_info(basic_raw_data, normalize=normalize)
+        final_data['before_info'] = before_data
+        log(f"✓ 直前情報（基本データから）: {len(before_data)}名分を抽出")
+
+    return final_data
+
+
+def race_filename(date_dir, hiduke, stadium_name, race_no):
+    return f"{date_dir}/{hiduke}_{stadium_name}_{race_no}.json"
+
+
+def save_race_data(final_data, date_dir, hiduke, stadium_name, race_no, compact=False):
+    """レースデータをJSONファイルに保存してファイル名を返す
+
+    セクションごとのバイト範囲の索引（data/index/<日付>/<ファイル名>.idx）も同時に書き出す。
+    compact=True の場合はインデントなしで書き出す（serialization の高速な実装を使用）。
+    """
+    filename = race_filename(date_dir, hiduke, stadium_name, race_no)
+    indent = None if compact else RACE_FILE_INDENT
+    return write_race_file(filename, final_data, indent=indent)
+
+
+def save_race_frame(final_data, date_dir, hiduke, stadium_name, race_no):
+    """レースデータを列指向形式（data/frames 以下のnpz）で保存してファイル名を返す"""
+    frame = RaceFrame.from_race_data(resolve_racer_refs(final_data))
+    return frame.save(frame_path(final_data['race_info']))
+
+
+def save_race_parquet(final_data, date_dir, hiduke, stadium_name, race_no):
+    """レースデータをParquet（data/parquet 以下のセクション別・日付パーティション）で保存"""
+    return parquet_store.write_race(final_data)
+
+
+def save_race_sqlite(final_data, date_dir, hiduke, stadium_name, race_no):
+    """レースデータをSQLite（data/races.sqlite3）に保存"""
+    return sqlite_store.write_race(final_data)
+
+
+# JSON以外に追加で書き出せる形式（--output で指定）
+EXTRA_OUTPUT_WRITERS = {
+    'columnar': save_race_frame,
+    'parquet': save_race_parquet,
+    'sqlite': save_race_sqlite,
+}
+
+
+def stored_section_hashes(stored, filename):
+    """保存済みレースのセクションごとのハッシュ（未保存ならNone）
+
+    台帳に記録がなければ保存済みファイルから計算する。
+    """
+    if not os.path.exists(filename):
+        return None
+    if stored and stored.get('section_hashes'):
+        return stored['section_hashes']
+    return section_hashes(RaceRecord(filename).load(resolve=False))
+
+
+def process_race(
+    hiduke,
+    stadium_name,
+    race_no,
+    scraper=None,
+    verbose=True,
+    dedup_racers=False,
+    extra_outputs=(),
+    normalize=False,
+    compact=False,
+):
+    """1レース分の取得→抽出→保存を実行（ライブラリ用エントリポイント）
+
+    スケジューラなど常駐プロセスから直接呼び出す。scraper を渡すと
+    requests.Session を複数レースで使い回せる。extra_outputs には
+    EXTRA_OUTPUT_WRITERS の形式名を指定し、JSONに加えて書き出す。
+    保存済みのレースはセクションごとのハッシュを比較し、変わったセクションがなければ
+    書き込みを省略する（changed_sections・written に結果を返す）。
+    戻り値は出力ファイル・サイズ・各工程の所要時間（秒）を含む辞書。
+    失敗時は ValueError（会場名不正）または RaceDataError を送出する。
+    """
+    race_no = int(race_no)
+    log = print if verbose else (lambda *args, **kwargs: None)
+    started = time.perf_counter()
+
+    # 会場コードを取得（琵琶湖・びわこ両対応）
+    place_no = get_stadium_code(stadium_name)
+
+    log(f"=== 競艇データ取得開始 ===")
+    log(f"日付: {hiduke}, 会場: {stadium_name} (コード: {place_no}), レース: {race_no}R")
+
+    # ディレクトリ構造をセットアップ
+    date_dir, racers_date_dir = setup_directories(hiduke, verbose=verbose)
+    if not date_dir:
+        raise RaceDataError("ディレクトリの作成に失敗しました")
+
+    # データ取得（mode=0・直前情報・mode=3 を並行取得）
+    log("\n=== データ取得（並行） ===")
+    raw = fetch_raw_data(place_no, race_no, hiduke, scraper=scraper)
+    fetched = time.perf_counter()
+    fetched_at = datetime.now().isoformat()
+
+    final_data = build_race_data(
+        hiduke,
+        stadium_name,
+        place_no,
+        race_no,
+        raw,
+        verbose=verbose,
+        dedup_racers=dedup_racers,
+        normalize=normalize,
+    )
+    extracted = time.perf_counter()
+
+    filename, outputs, changed, written = store_race_data(
+        final_data,
+        date_dir,
+        hiduke,
+        stadium_name,
+        place_no,
+        race_no,
+        fetched_at,
+        stage='full',
+        extra_outputs=extra_outputs,
+        compact=compact,
+        log=log,
+    )
+    saved = time.perf_counter()
+
+    return {
+        'filename': filename,
+        'file_size': os.path.getsize(filename),
+        'outputs': outputs,
+        'changed_sections': changed,
+        'written': written,
+        'final_data': final_data,
+        'timings': {
+            'fetch': fetched - started,
+            'extract': extracted - fetched,
+            'save': saved - extracted,
+            'total': saved - started,
+        },
+    }
+
+
+def store_race_data(
+    final_data,
+    date_dir,
+    hiduke,
+    stadium_name,
+    place_no,
+    race_no,
+    fetched_at,
+    stage='full',
+    extra_outputs=(),
+    compact=False,
+    log=print,
+):
+    """保存済みの内容とセクション単位で比較し、変わっていれば JSON・追加出力を書き出して台帳を更新
+
+    台帳には段階（'full' または FETCH_STAGES の段階名）ごとの取得時刻と、今回取得した
+    セクションの鮮度（取得時刻、before_info は取得元も）を記録する。
+    戻り値は (JSONファイル名, 出力ファイルの辞書, 変更セクション, 書き込んだか)。
+    """
+    manifest = get_race_manifest()
+    filename = race_filename(date_dir, hiduke, stadium_name, race_no)
+    stored = manifest.get_race(hiduke, place_no, race_no)
+    hashes = section_hashes(final_data)
+    previous_hashes = stored_section_hashes(stored, filename)
+    changed = list(hashes) if previous_hashes is None else changed_sections(hashes, previous_hashes)
+    written = bool(changed)
+
+    outputs = {'json': filename}
+    if written:
+        if previous_hashes is not None:
+            log(f"\n変更セクション: {', '.join(changed)}")
+        # JSONファイルに保存
+        save_race_data(final_data, date_dir, hiduke, stadium_name, race_no, compact=compact)
+        pending_outputs = list(extra_outputs)
+    else:
+        log("\n変更なし: 保存済みのファイルをそのまま使用します")
+        # 追加出力は前回書き出していない形式だけを書き出す
+        previous_outputs = (stored or {}).get('outputs', {})
+        outputs.update(
+            (name, path) for name, path in previous_outputs.items() if name in extra_outputs
+        )
+        pending_outputs = [name for name in extra_outputs if name not in previous_outputs]
+    for output_format in pending_outputs:
+        writer = EXTRA_OUTPUT_WRITERS[output_format]
+        outputs[output_format] = writer(final_data, date_dir, hiduke, stadium_name, race_no)
+
+    # 保存済みレースの台帳を更新（スケジューラのスキップ判定に使う）
+    entry = race_entry(final_data, filename, outputs, fetched_at, hashes=hashes)
+    entry['changed_sections'] = changed
+    entry['stages'] = {**(stored or {}).get('stages', {}), stage: fetched_at}
+    fetched_sections = None if stage == 'full' else FETCH_STAGES[stage][1]
+    entry['section_freshness'] = {
+        **(stored or {}).get('section_freshness', {}),
+        **section_freshness(final_data, fetched_at, fetched_sections, fetched=True),
+    }
+    if not written:
+        entry['saved_at'] = (stored or {}).get('saved_at')
+        entry['checked_at'] = datetime.now().isoformat()
+    manifest.record_race(hiduke, place_no, race_no, entry)
+    return filename, outputs, changed, written
+
+
+def process_race_stage(
+    hiduke,
+    stadium_name,
+    race_no,
+    stage,
+    scraper=None,
+    verbose=True,
+    dedup_racers=False,
+    extra_outputs=(),
+    normalize=False,
+    compact=False,
+):
+    """1レース分の指定段階（FETCH_STAGES）だけを取得し、そのセクションだけを保存済みファイルに反映
+
+    他のセクションは保存済みファイルの内容をそのまま使う。保存済みファイルがない場合は
+    process_race で全セクションを取得する。数値の変換（normalize）は保存済みファイルに合わせる。
+    戻り値は process_race と同じ形式（'stage' に実行した段階を追加）。
+    """
+    if stage not in FETCH_STAGES:
+        raise ValueError(f"無効な取得段階: {stage}（利用可能: {', '.join(FETCH_STAGES)}）")
+    race_no = int(race_no)
+    log = print if verbose else (lambda *args, **kwargs: None)
+    started = time.perf_counter()
+
+    place_no = get_stadium_code(stadium_name)
+    date_dir, racers_date_dir = setup_directories(hiduke, verbose=verbose)
+    if not date_dir:
+        raise RaceDataError("ディレクトリの作成に失敗しました")
+
+    filename = race_filename(date_dir, hiduke, stadium_name, race_no)
+    if not os.path.exists(filename):
+        log(f"保存済みファイルがないため全セクションを取得します: {stadium_name} {race_no}R")
+        result = process_race(
+            hiduke,
+            stadium_name,
+            race_no,
+            scraper=scraper,
+            verbose=verbose,
+            dedup_racers=dedup_racers,
+            extra_outputs=extra_outputs,
+            normalize=normalize,
+            compact=compact,
+        )
+        result['stage'] = 'full'
+        return result
+
+    parts, section_names = FETCH_STAGES[stage]
+    log(f"=== 段階取得 ({stage}: {', '.join(section_names)}) ===")
+    log(f"日付: {hiduke}, 会場: {stadium_name} (コード: {place_no}), レース: {race_no}R")
+    raw = fetch_raw_data(place_no, race_no, hiduke, scraper=scraper, parts=parts)
+    fetched = time.perf_counter()
+    fetched_at = datetime.now().isoformat()
+
+    if stage == 'chokuzen' and not raw.get('chokuzen_raw_data'):
+        # 展示データがない（中止・未公開）ことを台帳に記録し、発走後は取り直さない
+        get_race_manifest().record_freshness(
+            hiduke, place_no, race_no,
+            {'before_info': {'fetched_at': fetched_at, 'source': 'unavailable'}},
+        )
+
+    final_data = RaceRecord(filename).load(resolve=False)
+    normalized = bool(final_data['race_info'].get('normalized'))
+    final_data.update(
+        extract_stage_sections(stage, raw, hiduke, dedup_racers=dedup_racers, normalize=normalized)
+    )
+    extracted = time.perf_counter()
+
+    filename, outputs, changed, written = store_race_data(
+        final_data,
+        date_dir,
+        hiduke,
+        stadium_name,
+        place_no,
+        race_no,
+        fetched_at,
+        stage=stage,
+        extra_outputs=extra_outputs,
+        compact=compact,
+        log=log,
+    )
+    saved = time.perf_counter()
+
+    return {
+        'filename': filename,
+        'file_size': os.path.getsize(filename),
+        'outputs': outputs,
+        'changed_sections': changed,
+        'written': written,
+        'final_data': final_data,
+        'stage': stage,
+        'timings': {
+            'fetch': fetched - started,
+            'extract': extracted - fetched,
+            'save': saved - extracted,
+            'total': saved - started,
+        },
+    }
+
+
+def parse_arguments():
+    """コマンドライン引数を解析"""
+    parser = argparse.ArgumentParser(
+        description="競艇データ取得メインスクリプト",
+        epilog="例: python main.py 20250530 戸田 1 / python main.py 20250530 びわこ 1",
+    )
+    parser.add_argument("hiduke", help="日付 (YYYYMMDD)")
+    parser.add_argument("stadium_name", help="会場名（琵琶湖・びわこ両対応）")
+    parser.add_argument("race_no", type=int, help="レース番号")
+    parser.add_argument(
+        "--dedup-racers",
+        action="store_true",
+        help="選手の経歴系データを data/racers に選手単位で保存し、レースファイルからは参照のみとする",
+    )
+    parser.add_argument(
+        "--archive-raw",
+        action="store_true",
+        help="APIレスポンスの生データを data/raw にアーカイブ",
+    )
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="通信せず data/raw のアーカイブから再抽出",
+    )
+    parser.add_argument(
+        "--normalize",
+        action="store_true",
+        help="数値項目を単位付きの数値に変換して保存（\"015\"→0.15秒、\"52.0kg\"→52.0 など）",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="レースJSONをインデントなしで保存（ファイルサイズ・書き込み時間を削減）",
+    )
+    parser.add_argument(
+        "--output",
+        action="append",
+        default=[],
+        choices=sorted(EXTRA_OUTPUT_WRITERS),
+        help="JSONに加えて書き出す形式（複数指定可。columnar: data/frames 以下に列指向npz、"
+        "parquet: data/parquet 以下にセクション別Parquet、sqlite: data/races.sqlite3）",
+    )
+    parser.add_argument(
+        "--stage",
+        choices=sorted(FETCH_STAGES),
+        help="指定段階だけを取得して保存済みファイルのそのセクションを更新（entry: 出走表、"
+        "chokuzen: 直前情報、results: 今節成績）",
+    )
+    return parser.parse_args()
+
 def main():
     """メイン処理"""
-    if len(sys.argv) != 4:
-        print("使用方法: python main.py [日付] [会場名] [レース番号]")
-        print("例: python main.py 20250530 戸田 1")
-        print("例: python main.py 20250530 琵琶湖 1")
-        print("例: python main.py 20250530 びわこ 1")
-        sys.exit(1)
+    args = parse_arguments()
     
     # 引数を解析
-    hiduke = sys.argv[1]
-    stadium_name = sys.argv[2]
-    race_no = int(sys.argv[3])
+    hiduke = args.hiduke
+    stadium_name = args.stadium_name
+    race_no = args.race_no
+    
+    scraper = None
+    if args.archive_raw or args.replay:
+        scraper = KyoteiBiyoriScraper(archive=get_raw_archive(), replay=args.replay)
     
     try:
-        # 会場コードを取得（琵琶湖・びわこ両対応）
-        place_no = get_stadium_code(stadium_name)
-        
-        print(f"=== 競艇データ取得開始 ===")
-        print(f"日付: {hiduke}, 会場: {stadium_name} (コード: {place_no}), レース: {race_no}R")
-        
-        # ディレクトリ構造をセットアップ
-        date_dir, racers_date_dir = setup_directories(hiduke)
-        if not date_dir:
-            print("ディレクトリの作成に失敗しました")
-            sys.exit(1)
-        
-        # データ取得
-        scraper = KyoteiBiyoriScraper()
-        
-        print("\n=== 基本データ取得 ===")
-        basic_raw_data = scraper.get_race_data(place_no, race_no, hiduke, mode=0)
-        
-        if not basic_raw_data:
-            print("基本データの取得に失敗しました")
-            sys.exit(1)
-        
-        print(f"✓ 基本データを取得: {len(basic_raw_data)}件")
-        
-        # 直前情報を取得（新API）
-        print("\n=== 直前情報取得 ===")
-        chokuzen_raw_data = scraper.get_chokuzen_data(place_no, race_no, hiduke)
-        
-        if chokuzen_raw_data:
-            print(f"✓ 直前情報を取得: {len(chokuzen_raw_data)}件")
-            
-            # 展示順位の確認表示
-            rankings = calculate_display_rankings(chokuzen_raw_data)
-            print("展示順位:")
-            for item in rankings:
-                print(f"  {item['rank']}位: {item['course']}コース - {item['display_time']}")
+        options = dict(
+            scraper=scraper,
+            dedup_racers=args.dedup_racers,
+            extra_outputs=args.output,
+            normalize=args.normalize,
+            compact=args.compact,
+        )
+        if args.stage:
+            result = process_race_stage(hiduke, stadium_name, race_no, args.stage, **options)
         else:
-            print("⚠️  直前情報の取得に失敗しました（基本データから代替抽出します）")
-        
-        # 各種情報を抽出
-        print("\n=== 情報抽出開始 ===")
-        
-        final_data = {
-            "race_info": {
-                "date": hiduke,
-                "stadium": stadium_name,
-                "stadium_code": place_no,
-                "race_no": race_no,
-                "generated_at": datetime.now().isoformat()
-            }
-        }
-        
-        # 基本情報を抽出
-        print("基本情報を抽出中...")
-        if isinstance(basic_raw_data, list) and len(basic_raw_data) > 0:
-            basic_data = extract_basic_info(basic_raw_data)
-            final_data['basic_info'] = basic_data
-            print(f"✓ 基本情報: {len(basic_data)}名分を抽出")
-        else:
-            print("✗ 基本情報: データ形式が無効")
-            sys.exit(1)
-        
-        # 枠別情報を抽出
-        print("枠別情報を抽出中...")
-        course_data = extract_course_info(basic_raw_data)
-        final_data['course_info'] = course_data
-        print(f"✓ 枠別情報: {len(course_data)}名分を抽出")
-        
-        # モーター情報を抽出
-        print("モーター情報を抽出中...")
-        motor_data = extract_motor_info(basic_raw_data)
-        final_data['motor_info'] = motor_data
-        print(f"✓ モーター情報: {len(motor_data)}名分を抽出")
-        
-        # 今節成績を抽出（別モードのデータ使用）
-        print("今節成績を取得中...")
-        session_raw_data = scraper.get_race_data(place_no, race_no, hiduke, mode=3)
-        
-        if session_raw_data and isinstance(session_raw_data, list):
-            session_data = extract_session_results(session_raw_data)
-            final_data['session_results'] = session_data
-            print(f"✓ 今節成績: {len(session_data)}名分を抽出")
-        else:
-            print("⚠️  今節成績データが取得できません（基本データから代替抽出）")
-            session_data = extract_session_results(basic_raw_data)
-            final_data['session_results'] = session_data
-            print(f"✓ 今節成績（基本データから）: {len(session_data)}名分を抽出")
-        
-        # 直前情報を抽出（新API使用）
-        print("直前情報を抽出中...")
-        if chokuzen_raw_data and isinstance(chokuzen_raw_data, list):
-            before_data = extract_before_info(chokuzen_raw_data)
-            final_data['before_info'] = before_data
-            print(f"✓ 直前情報: {len(before_data)}名分を抽出")
-        else:
-            print("⚠️  直前情報データが取得できません（基本データから代替抽出）")
-            before_data = extract_before_info(basic_raw_data)
-            final_data['before_info'] = before_data
-            print(f"✓ 直前情報（基本データから）: {len(before_data)}名分を抽出")
-        
-        # JSONファイルに保存
-        filename = f"{date_dir}/{hiduke}_{stadium_name}_{race_no}.json"
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(final_data, f, ensure_ascii=False, indent=2)
+            result = process_race(hiduke, stadium_name, race_no, **options)
+        final_data = result['final_data']
         
         # 完了ログ
-        file_size = os.path.getsize(filename)
         print(f"\n=== 完了 ===")
-        print(f"ファイル名: {filename}")
-        print(f"ファイルサイズ: {file_size} bytes")
+        print(f"ファイル名: {result['filename']}")
+        print(f"ファイルサイズ: {result['file_size']} bytes")
+        if result['written']:
+            print(f"変更セクション: {', '.join(result['changed_sections'])}")
+        else:
+            print("変更なし（書き込み省略）")
+        for output_format, output_file in result['outputs'].items():
+            if output_format != 'json':
+                print(f"追加出力 ({output_format}): {output_file}")
         
         # 統計情報
         total_data_count = 0
@@ -294,6 +645,8 @@ def main():
                 print(f"{section_name}: {len(section_data)}名分")
         
         print(f"合計データ数: {total_data_count}件")
+        timings = result['timings']
+        print(f"所要時間: 取得 {timings['fetch']:.2f}s / 抽出 {timings['extract']:.2f}s / 保存 {timings['save']:.2f}s")
         print("データ取得が完了しました！")
         
         # Mac通知機能
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+生データ項目の型変換（文字列で届く数値を単位付きの数値に1回だけ変換する）
+
+APIの値は "015"（平均スタート）、"52.0kg"（体重）、"3m"（風速）のように
+項目ごとに書式が違うため、項目名 → (書式, 単位) の対応表で変換方法を決める。
+表にない項目は数値（number）として扱い、TEXT_FIELDS の項目は文字列のまま残す。
+変換できない値・空文字は None にする。
+"""
+
+import re
+
+# 浮動小数点の誤差（0.14000000000000004 など）を丸める桁数
+FLOAT_DIGITS = 10
+
+# 文字列のまま残す項目
+TEXT_FIELDS = frozenset((
+    '選手名', '選手名カナ', '支部', '出身', '級別',
+    'レース名', 'レースランク',
+    'コメント', '天候', '風向きアイコン', 'プロペラ', '交換', '選手画像', '潮',
+    '満潮1_時間', '干潮1_時間', '満潮2_時間', '干潮2_時間',
+))
+
+# 数値のうち整数で保存する項目（番号・日付など。Parquet・SQLite の列型に使う）
+INTEGER_FIELDS = frozenset((
+    '選手番号', '場所番号', 'レース番号', 'モーター番号', 'ボート番号',
+    '前検モーター番号', '前検ボート番号', 'レース年', '年齢', '養成期間', '性別', 'グレード',
+    'コース', '進入',
+))
+
+# 全セクション共通の特殊書式（項目名 → (書式, 単位)）
+COMMON_FIELD_TYPES = {
+    '平均スタート': ('fixed100', 's'),             # "015" → 0.15秒
+    'スタート順位': ('fixed100', 'rank'),           # "260" → 2.60位
+    '前期能力指数': ('fixed100', 'index'),          # "5100" → 51.00
+    '今期能力指数': ('fixed100', 'index'),
+    '福勝': ('fixed1000', 'ratio'),                 # "0500" → 0.500
+    '2連率_全期間': ('fixed1000', 'ratio'),
+    '波5cm1着率': ('fixed1000', 'ratio'),           # 585 → 0.585
+    '波5cm2着率': ('fixed1000', 'ratio'),
+    '波5cm3着率': ('fixed1000', 'ratio'),
+    'モーター期間開始': ('date', 'yyyymmdd'),       # "20250812" → 20250812
+    'モーター期間終了': ('date', 'yyyymmdd'),
+    'モーター期間開始_全期間': ('date', 'yyyymmdd'),
+    'モーター期間終了_全期間': ('date', 'yyyymmdd'),
+    'レース日付': ('date', 'yyyymmdd'),
+    '日付': ('date', 'yyyymmdd'),
+}
+
+# セクションごとの特殊書式（共通の定義より優先）
+SECTION_FIELD_TYPES = {
+    'basic_info': {
+        '体重': ('fixed10', 'kg'),                  # 520 → 52.0kg
+    },
+    'session_results': {
+        '2連率': ('fixed1000', 'ratio'),            # "0500" → 0.500
+    },
+    'before_info': {
+        '展示スタートタイミング': ('start_timing', 's'),  # ".08" → 0.08秒、"F.01" → -0.01秒
+        '体重': ('suffix', 'kg'),                   # "52.0kg"
+        '気温': ('suffix', '℃'),                    # "28.0℃"
+        '水温': ('suffix', '℃'),
+        '風速': ('suffix', 'm/s'),                  # "3m"
+        '波高': ('suffix', 'cm'),                   # "2cm"
+        '満潮1_高さ': ('suffix', 'm'),              # "3.60m"
+        '干潮1_高さ': ('suffix', 'm'),
+        '満潮2_高さ': ('suffix', 'm'),
+        '干潮2_高さ': ('suffix', 'm'),
+    },
+}
+
+_SUFFIX_PATTERN = re.compile(r'^\s*(-?\d+(?:\.\d+)?|-?\.\d+)\s*[^\d\s]*\s*$')
+
+
+def _round(value):
+    return round(value, FLOAT_DIGITS)
+
+
+def parse_number(value):
+    """数値文字列を int / float に変換（整数表記は int のまま）"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return _round(value)
+    text = str(value).strip()
+    if not text:
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return _round(float(text))
+    except ValueError:
+        return None
+
+
+def _fixed_point(divisor):
+    def parse(value):
+        number = parse_number(value)
+        if number is None:
+            return None
+        return _round(number / divisor)
+    return parse
+
+
+def parse_suffix(value):
+    """単位付き文字列（"52.0kg"・"3m"・"28.0℃"）から数値部分を取り出す"""
+    if value is None or isinstance(value, (int, float)):
+        return parse_number(value)
+    match = _SUFFIX_PATTERN.match(str(value))
+    if not match:
+        return None
+    return _round(float(match.group(1)))
+
+
+def parse_start_timing(value):
+    """展示スタートタイミング（".08"、フライングは "F.01" → 負の値、出遅れ "L" は None）"""
+    if value is None or isinstance(value, (int, float)):
+        return parse_number(value)
+    text = str(value).strip()
+    sign = 1
+    if text[:1] in ('F', 'Ｆ'):
+        sign = -1
+        text = text[1:]
+    number = parse_number(text)
+    if number is None:
+        return None
+    return _round(sign * number)
+
+
+def parse_date(value):
+    """YYYYMMDD 形式の日付を int にそろえる"""
+    number = parse_number(value)
+    return number if isinstance(number, int) else None
+
+
+def parse_text(value):
+    return value
+
+
+PARSERS = {
+    'number': parse_number,
+    'fixed10': _fixed_point(10),
+    'fixed100': _fixed_point(100),
+    'fixed1000': _fixed_point(1000),
+    'suffix': parse_suffix,
+    'start_timing': parse_start_timing,
+    'date': parse_date,
+    'text': parse_text,
+}
+
+
+def field_type(section, field):
+    """項目の (書式, 単位) を返す（単位が決まらない項目は None）"""
+    if field in TEXT_FIELDS:
+        return ('text', None)
+    section_types = SECTION_FIELD_TYPES.get(section, {})
+    if field in section_types:
+        return section_types[field]
+    if field in COMMON_FIELD_TYPES:
+        return COMMON_FIELD_TYPES[field]
+    return ('number', None)
+
+
+def storage_kind(section, field):
+    """保存時の列の型（'int'・'float'・'text'）"""
+    kind, _unit = field_type(section, field)
+    if kind == 'text':
+        return 'text'
+    if kind == 'date' or field in INTEGER_FIELDS:
+        return 'int'
+    return 'float'
+
+
+def field_parser(section, field):
+    return PARSERS[field_type(section, field)[0]]
+
+
+def normalize_record(section, record):
+    """1選手分の辞書を変換した新しい辞書を返す"""
+    return {field: field_parser(section, field)(value) for field, value in record.items()}
+
+
+def normalize_records(section, records):
+    """1レース分（選手ごとの辞書リスト）を項目単位でまとめて変換
+
+    項目ごとに変換関数を1回だけ決め、6艇分の値にまとめて適用する。
+    """
+    records = list(records)
+    if not records:
+        return records
+    fields = list(records[0])
+    for record in records[1:]:
+        fields.extend(field for field in record if field not in fields)
+
+    normalized = [{} for _ in records]
+    for field in fields:
+        parser = field_parser(section, field)
+        for target, record in zip(normalized, records):
+            if field in record:
+                target[field] = parser(record[field])
+    return normalized
+
+
+def normalize_race_data(race_data):
+    """保存形式（セクション → 選手ごとの辞書リスト）の全セクションを変換"""
+    normalized = dict(race_data)
+    for section, records in race_data.items():
+        if section != 'race_info' and isinstance(records, list):
+            normalized[section] = normalize_records(section, records)
+    return normalized
+
+
+if __name__ == "__main__":
+    # テスト用
+    import json
+    import sys
+
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'r', encoding='utf-8') as f:
+            race_data = json.load(f)
+        normalized = normalize_race_data(race_data)
+        for section in ('basic_info', 'before_info'):
+            if normalized.get(section):
+                for field, value in list(normalized[section][0].items())[:40]:
+                    kind, unit = field_type(section, field)
+                    print(f"{section}.{field}: {race_data[section][0][field]!r} → {value!r} ({kind}{', ' + unit if unit else ''})")
+    else:
+        print("使用方法: python normalize.py [レースJSONファイルパス]")
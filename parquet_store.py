@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+レースデータのParquet保存（セクション別・日付パーティション）
+
+data/parquet/<セクション>/date=<日付>/ 以下に保存する。レースごとの書き込みは
+<会場コード>_<レース番号>.parquet の断片ファイルとし、compact_date で1日分を
+part-0.parquet の1ファイルにまとめる。1行＝1選手（race_info は1行＝1レース）で、
+キー列 date / stadium_code / race_no / entry（並び順、1〜6）を付ける。
+
+値は normalize の対応表で変換済みの型（数値は float64・ID系は int64、文字列項目は
+string）で保存するため、JSONが未変換（--normalize なし）でも読み出し結果は数値になる。
+pyarrow が必要（未インストールの場合は RuntimeError）。
+"""
+
+import glob
+import json
+import os
+import threading
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+import serialization
+from normalize import normalize_race_data, storage_kind
+from race_frame import DEFAULT_SCHEMA
+from racer_store import resolve_racer_refs
+
+PARQUET_DIR = "data/parquet"
+
+# 1日分をまとめたファイル名
+COMPACT_FILE = "part-0.parquet"
+
+# 各行に付けるキー列
+KEY_COLUMNS = ('date', 'stadium_code', 'race_no', 'entry')
+
+# race_info の列
+RACE_INFO_COLUMNS = (
+    ('date', 'int'),
+    ('stadium', 'text'),
+    ('stadium_code', 'int'),
+    ('race_no', 'int'),
+    ('generated_at', 'text'),
+    ('normalized', 'bool'),
+)
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("Parquet保存には pyarrow が必要です（pip install pyarrow）")
+
+
+def _arrow_type(kind):
+    return {'int': pa.int64(), 'float': pa.float64(), 'text': pa.string(), 'bool': pa.bool_()}[kind]
+
+
+def _to_int(value):
+    if value is None:
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(number) if number.is_integer() else None
+
+
+def _to_float(value):
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_text(value):
+    return None if value is None else str(value)
+
+
+def _to_bool(value):
+    return None if value is None else bool(value)
+
+
+_CONVERTERS = {'int': _to_int, 'float': _to_float, 'text': _to_text, 'bool': _to_bool}
+
+
+def section_columns(section, schema=DEFAULT_SCHEMA):
+    """セクションの (列名, 種別) の並び（キー列を含む）"""
+    if section == 'race_info':
+        return RACE_INFO_COLUMNS
+    columns = [('date', 'int'), ('stadium_code', 'int'), ('race_no', 'int'), ('entry', 'int')]
+    columns.extend((field, storage_kind(section, field)) for field in schema.sections[section])
+    return tuple(columns)
+
+
+def arrow_schema(section, schema=DEFAULT_SCHEMA):
+    _require_pyarrow()
+    return pa.schema([(name, _arrow_type(kind)) for name, kind in section_columns(section, schema)])
+
+
+def _build_table(section, rows, schema=DEFAULT_SCHEMA):
+    columns = section_columns(section, schema)
+    arrays = []
+    for name, kind in columns:
+        convert = _CONVERTERS[kind]
+        arrays.append(pa.array([convert(row.get(name)) for row in rows], type=_arrow_type(kind)))
+    return pa.Table.from_arrays(arrays, schema=arrow_schema(section, schema))
+
+
+def race_tables(race_data, schema=DEFAULT_SCHEMA):
+    """保存形式のレースデータをセクション名 → pyarrow.Table に変換"""
+    _require_pyarrow()
+    race_data = resolve_racer_refs(race_data)
+    race_info = race_data['race_info']
+    if not race_info.get('normalized'):
+        race_data = normalize_race_data(race_data)
+
+    keys = {
+        'date': race_info['date'],
+        'stadium_code': race_info['stadium_code'],
+        'race_no': race_info['race_no'],
+    }
+    tables = {'race_info': _build_table('race_info', [dict(race_info, normalized=True)], schema)}
+    for section in schema.sections:
+        rows = [
+            {**record, **keys, 'entry': entry}
+            for entry, record in enumerate(race_data.get(section) or [], 1)
+        ]
+        tables[section] = _build_table(section, rows, schema)
+    return tables
+
+
+def _partition_dir(section, date, parquet_dir=PARQUET_DIR):
+    return os.path.join(parquet_dir, section, f"date={date}")
+
+
+def _write_table_atomic(table, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+    pq.write_table(table, tmp_path, compression='zstd')
+    os.replace(tmp_path, path)
+
+
+def write_race(race_data, parquet_dir=PARQUET_DIR, schema=DEFAULT_SCHEMA):
+    """1レース分を各セクションの断片ファイルとして書き込み、race_info のパスを返す"""
+    race_info = race_data['race_info']
+    fragment = f"{int(race_info['stadium_code'])}_{int(race_info['race_no'])}.parquet"
+    paths = {}
+    for section, table in race_tables(race_data, schema).items():
+        path = os.path.join(_partition_dir(section, race_info['date'], parquet_dir), fragment)
+        _write_table_atomic(table, path)
+        paths[section] = path
+    return paths['race_info']
+
+
+def _partition_files(partition_dir):
+    """(まとめ済みファイル or None, 断片ファイルのリスト)"""
+    compact_path = os.path.join(partition_dir, COMPACT_FILE)
+    fragments = sorted(
+        path for path in glob.glob(os.path.join(partition_dir, "*.parquet"))
+        if os.path.basename(path) != COMPACT_FILE
+    )
+    return (compact_path if os.path.exists(compact_path) else None), fragments
+
+
+def _race_keys(table):
+    return set(zip(table.column('stadium_code').to_pylist(), table.column('race_no').to_pylist()))
+
+
+def _read_partition(partition_dir, columns=None):
+    """1日分を読み込む（まとめ済みファイルより後から書いた断片を優先）"""
+    compact_path, fragments = _partition_files(partition_dir)
+    read_columns = None
+    if columns is not None:
+        read_columns = list(dict.fromkeys(['stadium_code', 'race_no', *columns]))
+
+    tables = [pq.read_table(path, columns=read_columns) for path in fragments]
+    if compact_path:
+        compact = pq.read_table(compact_path, columns=read_columns)
+        if tables:
+            rewritten = set()
+            for table in tables:
+                rewritten |= _race_keys(table)
+            keep = [key not in rewritten for key in zip(
+                compact.column('stadium_code').to_pylist(), compact.column('race_no').to_pylist()
+            )]
+            compact = compact.filter(pa.array(keep, type=pa.bool_()))
+        tables.insert(0, compact)
+    if not tables:
+        return None
+    table = pa.concat_tables(tables)
+    if columns is not None:
+        table = table.select(list(columns))
+    return table
+
+
+def list_dates(section='race_info', parquet_dir=PARQUET_DIR):
+    """保存済みの日付一覧（昇順）"""
+    section_dir = os.path.join(parquet_dir, section)
+    if not os.path.isdir(section_dir):
+        return []
+    return sorted(
+        name[len("date="):] for name in os.listdir(section_dir)
+        if name.startswith("date=") and os.path.isdir(os.path.join(section_dir, name))
+    )
+
+
+def read_section(section, start=None, end=None, columns=None, parquet_dir=PARQUET_DIR):
+    """セクションを日付範囲（start〜end、YYYYMMDD・両端含む）でまとめて読み込む
+
+    戻り値は pyarrow.Table（該当なしなら空のテーブル）。columns で列を絞り込める。
+    """
+    _require_pyarrow()
+    tables = []
+    for date in list_dates(section, parquet_dir):
+        if (start and date < str(start)) or (end and date > str(end)):
+            continue
+        table = _read_partition(_partition_dir(section, date, parquet_dir), columns)
+        if table is not None:
+            tables.append(table)
+    if not tables:
+        empty = arrow_schema(section)
+        if columns is not None:
+            empty = pa.schema([empty.field(name) for name in columns])
+        return empty.empty_table()
+    return pa.concat_tables(tables)
+
+
+def load_race(date, stadium_code, race_no, parquet_dir=PARQUET_DIR, schema=DEFAULT_SCHEMA):
+    """1レース分を保存形式（セクション → 選手ごとの辞書リスト）に戻す（未保存ならNone）"""
+    _require_pyarrow()
+    key = (int(stadium_code), int(race_no))
+
+    def rows(section):
+        table = _read_partition(_partition_dir(section, date, parquet_dir))
+        if table is None:
+            return []
+        return [
+            row for row in table.to_pylist()
+            if (row['stadium_code'], row['race_no']) == key
+        ]
+
+    race_info_rows = rows('race_info')
+    if not race_info_rows:
+        return None
+    race_data = {'race_info': {name: race_info_rows[-1][name] for name, _ in RACE_INFO_COLUMNS}}
+    for section in schema.sections:
+        records = sorted(rows(section), key=lambda row: row['entry'])
+        race_data[section] = [
+            {name: row[name] for name, _ in section_columns(section, schema)[len(KEY_COLUMNS):]}
+            for row in records
+        ]
+    return race_data
+
+
+def compact_date(date, parquet_dir=PARQUET_DIR, sections=None):
+    """1日分の断片ファイルを part-0.parquet にまとめる（同じレースは後から書いた方を残す）
+
+    戻り値はまとめた断片ファイル数。
+    """
+    _require_pyarrow()
+    sections = sections or ['race_info', *DEFAULT_SCHEMA.sections]
+    merged = 0
+    for section in sections:
+        partition_dir = _partition_dir(section, date, parquet_dir)
+        _compact_path, fragments = _partition_files(partition_dir)
+        if not fragments:
+            continue
+        table = _read_partition(partition_dir)
+        table = table.sort_by([('stadium_code', 'ascending'), ('race_no', 'ascending')]
+                              + ([('entry', 'ascending')] if section != 'race_info' else []))
+        _write_table_atomic(table, os.path.join(partition_dir, COMPACT_FILE))
+        for path in fragments:
+            os.remove(path)
+        merged += len(fragments)
+    return merged
+
+
+def import_json_date(date, races_dir="data/races", parquet_dir=PARQUET_DIR):
+    """既存のJSONファイル（data/races/<日付>）を取り込んで1日分をまとめる"""
+    paths = sorted(glob.glob(os.path.join(races_dir, str(date), "*.json")))
+    for path in paths:
+        write_race(serialization.load_file(path), parquet_dir)
+    compact_date(date, parquet_dir)
+    return len(paths)
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 2 and sys.argv[1] == "import":
+        for date in sys.argv[2:]:
+            print(f"{date}: {import_json_date(date)}レースを取り込み")
+    elif len(sys.argv) > 2 and sys.argv[1] == "compact":
+        for date in sys.argv[2:]:
+            print(f"{date}: {compact_date(date)}ファイルをまとめました")
+    elif len(sys.argv) > 4 and sys.argv[1] == "show":
+        race_data = load_race(sys.argv[2], sys.argv[3], sys.argv[4])
+        print(json.dumps(race_data, ensure_ascii=False, indent=2))
+    else:
+        print("使用方法: python parquet_store.py import [日付 ...]")
+        print("          python parquet_store.py compact [日付 ...]")
+        print("          python parquet_store.py show [日付] [会場コード] [レース番号]")
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+レースデータの列指向表現（1項目＝長さ6のNumPy配列）
+
+各抽出モジュールの対応表から共通スキーマ（RaceSchema）を作り、
+1レース分を RaceFrame に変換する。複数レースは stack_frames で
+(レース数, 6) の行列にまとめられる。
+"""
+
+import json
+import os
+
+import numpy as np
+
+from basic_info import BASIC_INFO_FIELDS
+from course_info import COURSE_INFO_FIELDS
+from motor_info import MOTOR_INFO_FIELDS
+from session_results import SESSION_RESULTS_FIELDS
+from before_info import BEFORE_INFO_KEYS
+
+FRAMES_DIR = "data/frames"
+
+# 1レースの艇数
+BOATS = 6
+
+
+class RaceSchema:
+    """セクション名 → 項目名の並び から作る列定義（列名は "セクション.項目"）"""
+
+    def __init__(self, sections):
+        self.sections = {name: tuple(fields) for name, fields in sections.items()}
+        self.columns = tuple(
+            f"{section}.{field}" for section, fields in self.sections.items() for field in fields
+        )
+        self._index = {column: i for i, column in enumerate(self.columns)}
+
+    def __len__(self):
+        return len(self.columns)
+
+    def index(self, column):
+        return self._index[column]
+
+    def to_dict(self):
+        return {name: list(fields) for name, fields in self.sections.items()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data)
+
+    @classmethod
+    def default(cls):
+        """抽出モジュールの対応表から作る標準スキーマ"""
+        return cls({
+            'basic_info': [output_key for output_key, _ in BASIC_INFO_FIELDS],
+            'course_info': [output_key for output_key, _ in COURSE_INFO_FIELDS],
+            'motor_info': [output_key for output_key, _ in MOTOR_INFO_FIELDS],
+            'session_results': [output_key for output_key, _ in SESSION_RESULTS_FIELDS],
+            'before_info': list(BEFORE_INFO_KEYS),
+        })
+
+
+DEFAULT_SCHEMA = RaceSchema.default()
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def to_column(values):
+    """長さ6の値リストを配列に変換
+
+    数値（と欠損）だけなら float64（欠損は NaN）、それ以外は文字列（欠損は空文字）。
+    """
+    if all(value is None or _is_number(value) for value in values):
+        return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+    return np.array(['' if value is None else str(value) for value in values], dtype=np.str_)
+
+
+class RaceFrame:
+    """1レース分の列指向データ"""
+
+    def __init__(self, race_info, columns, schema=DEFAULT_SCHEMA):
+        self.race_info = race_info
+        self.columns = columns
+        self.schema = schema
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    @classmethod
+    def from_race_data(cls, race_data, schema=DEFAULT_SCHEMA):
+        """保存形式（セクション → 選手ごとの辞書リスト）から変換
+
+        選手は並び順（枠順）で0〜5に割り当て、6艇未満のレースは欠損で埋める。
+        """
+        columns = {}
+        for section, fields in schema.sections.items():
+            entries = list(race_data.get(section) or [])[:BOATS]
+            entries += [{}] * (BOATS - len(entries))
+            for field in fields:
+                columns[f"{section}.{field}"] = to_column([entry.get(field) for entry in entries])
+        return cls(race_data.get('race_info', {}), columns, schema)
+
+    def save(self, path):
+        """npz形式で保存（列は c0000... の連番、スキーマとレース情報はJSONで同梱）"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        arrays = {f"c{i:04d}": self.columns[column] for i, column in enumerate(self.schema.columns)}
+        arrays['__schema__'] = np.array(json.dumps(self.schema.to_dict(), ensure_ascii=False))
+        arrays['__race_info__'] = np.array(json.dumps(self.race_info, ensure_ascii=False))
+        np.savez_compressed(path, **arrays)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            schema = RaceSchema.from_dict(json.loads(str(data['__schema__'])))
+            race_info = json.loads(str(data['__race_info__']))
+            columns = {column: data[f"c{i:04d}"] for i, column in enumerate(schema.columns)}
+        return cls(race_info, columns, schema)
+
+
+def frame_path(race_info, frames_dir=FRAMES_DIR):
+    date = race_info['date']
+    return os.path.join(frames_dir, str(date), f"{date}_{race_info['stadium']}_{race_info['race_no']}.npz")
+
+
+def _number_text(value):
+    """数値列の値を文字列列に合わせる（整数値は小数点なし、欠損は空文字）"""
+    if np.isnan(value):
+        return ''
+    value = float(value)
+    return str(int(value)) if value.is_integer() else str(value)
+
+
+def _stack_column(arrays):
+    # 数値のレースと文字列のレースが混在する列は文字列にそろえる
+    if any(array.dtype != np.float64 for array in arrays):
+        arrays = [
+            array if array.dtype != np.float64
+            else np.array([_number_text(value) for value in array], dtype=np.str_)
+            for array in arrays
+        ]
+    return np.stack(arrays)
+
+
+def stack_frames(frames, columns=None):
+    """複数レースを列ごとに (レース数, 6) の配列へ積み上げる"""
+    frames = list(frames)
+    if not frames:
+        return {}
+    columns = columns or frames[0].schema.columns
+    return {column: _stack_column([frame[column] for frame in frames]) for column in columns}
+
+
+if __name__ == "__main__":
+    # テスト用
+    import sys
+
+    from before_info import extract_before_info
+
+    if sys.argv[1:] == ['check']:
+        # 数値のレースと文字列のレースが混在する列の積み上げ
+        stacked = _stack_column([to_column([1.5, None, 2, 3, 4, 5]), to_column(['A', None, 'B', 'C', 'D', 'E'])])
+        expected = [['1.5', '', '2', '3', '4', '5'], ['A', '', 'B', 'C', 'D', 'E']]
+        assert stacked.tolist() == expected, stacked.tolist()
+        print("OK: 混在列の積み上げ")
+        # スキーマの直前情報の列が抽出結果のキーと一致すること
+        extracted = tuple(extract_before_info([{'player_no': 1}])[0])
+        assert extracted == BEFORE_INFO_KEYS, extracted
+        print("OK: 直前情報の列")
+    elif len(sys.argv) > 1:
+        with open(sys.argv[1], 'r', encoding='utf-8') as f:
+            frame = RaceFrame.from_race_data(json.load(f))
+        numeric = sum(1 for array in frame.columns.values() if array.dtype == np.float64)
+        print(f"列数: {len(frame.schema)} (数値列: {numeric})")
+        for column in frame.schema.columns[:10]:
+            print(f"{column}: {frame[column]}")
+    else:
+        print("使用方法: python race_frame.py [レースJSONファイルパス]")
+        print("          python race_frame.py check")
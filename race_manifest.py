@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+保存済みレースの台帳（data/manifest/<日付>.json、1日1ファイル）
+
+レースを保存するたびに会場コード・レース番号ごとの記録（ファイル・サイズ・
+セクションごとの件数・取得/保存時刻・追加出力）を更新し、一時ファイル経由で
+置き換える。読み込み〜保存は <日付>.json.lock のファイルロックで囲み、--subprocess の
+別プロセスからの同時更新でも記録が失われないようにする。
+スケジューラはファイルの存在確認の代わりにこの台帳を参照する。
+スケジュール取得時に予定レースも記録しておくと、未取得レースを台帳だけで求められる。
+"""
+
+import glob
+import hashlib
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import serialization
+from race_record import RaceRecord
+
+MANIFEST_DIR = "data/manifest"
+RACES_DIR = "data/races"
+
+# 内容の比較から外す race_info の項目（取得のたびに変わる）
+VOLATILE_RACE_INFO_KEYS = ('generated_at',)
+
+# 直前情報（展示）は発走のこの分数前以降に取得したものを最新とみなす
+CHOKUZEN_FINAL_MINUTES = 5
+
+
+def race_key(stadium_code, race_no):
+    return f"{int(stadium_code)}_{int(race_no)}"
+
+
+class RaceManifest:
+    def __init__(self, root=MANIFEST_DIR, races_dir=RACES_DIR):
+        self.root = root
+        self.races_dir = races_dir
+        self._lock = threading.RLock()
+        # 日付 → (ファイルの更新時刻, 内容)。別プロセスが更新した場合は読み直す
+        self._cache = {}
+        # このプロセスがファイルロックを持っている日付（rebuild の入れ子で再取得しない）
+        self._file_locked = set()
+
+    def path(self, date):
+        return os.path.join(self.root, f"{date}.json")
+
+    @contextmanager
+    def _locked(self, date):
+        """台帳の読み込み〜保存を排他する（スレッド間は RLock、プロセス間は flock）"""
+        date = str(date)
+        with self._lock:
+            if fcntl is None or date in self._file_locked:
+                yield
+                return
+            os.makedirs(self.root, exist_ok=True)
+            with open(f"{self.path(date)}.lock", 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._file_locked.add(date)
+                try:
+                    yield
+                finally:
+                    self._file_locked.discard(date)
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _empty(self, date):
+        return {"date": str(date), "races": {}, "schedule": {}}
+
+    def load(self, date):
+        """1日分の台帳を返す（未作成で data/races/<日付> があればそこから作り直す）"""
+        date = str(date)
+        path = self.path(date)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            if os.path.isdir(os.path.join(self.races_dir, date)):
+                return self.rebuild(date)
+            return self._empty(date)
+
+        cached = self._cache.get(date)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        manifest = serialization.load_file(path)
+        self._cache[date] = (mtime, manifest)
+        return manifest
+
+    def _save(self, date, manifest):
+        path = self.path(date)
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+        serialization.dump_file(tmp_path, manifest, compact=False)
+        os.replace(tmp_path, path)
+        self._cache[str(date)] = (os.stat(path).st_mtime_ns, manifest)
+
+    def _update(self, date, update):
+        with self._locked(date):
+            self._cache.pop(str(date), None)
+            manifest = self.load(date)
+            update(manifest)
+            self._save(date, manifest)
+            return manifest
+
+    def record_race(self, date, stadium_code, race_no, entry):
+        """保存したレースを記録（entry はファイル・サイズ・セクションなどの辞書）"""
+        def update(manifest):
+            manifest["races"][race_key(stadium_code, race_no)] = {
+                "stadium_code": int(stadium_code),
+                "race_no": int(race_no),
+                **entry,
+            }
+        self._update(date, update)
+
+    def record_schedule(self, date, races):
+        """予定レースを記録（races は venue_code / venue_name / race_no / race_time を持つ辞書の列）"""
+        def update(manifest):
+            for race in races:
+                manifest["schedule"][race_key(race["venue_code"], race["race_no"])] = {
+                    "stadium_code": int(race["venue_code"]),
+                    "stadium": race["venue_name"],
+                    "race_no": int(race["race_no"]),
+                    "race_time": race.get("race_time"),
+                }
+        self._update(date, update)
+
+    def record_freshness(self, date, stadium_code, race_no, freshness):
+        """保存済みレースのセクションごとの鮮度だけを更新（未保存のレースは何もしない）"""
+        def update(manifest):
+            entry = manifest["races"].get(race_key(stadium_code, race_no))
+            if entry is not None:
+                entry["section_freshness"] = {**entry.get("section_freshness", {}), **freshness}
+        self._update(date, update)
+
+    def get_race(self, date, stadium_code, race_no):
+        return self.load(date)["races"].get(race_key(stadium_code, race_no))
+
+    def has_race(self, date, stadium_code, race_no):
+        return self.get_race(date, stadium_code, race_no) is not None
+
+    def race_time(self, date, stadium_code, race_no):
+        """予定に記録された発走日時（記録がなければNone）"""
+        scheduled = self.load(date).get("schedule", {}).get(race_key(stadium_code, race_no))
+        if not scheduled or not scheduled.get("race_time"):
+            return None
+        return datetime.strptime(f"{date} {scheduled['race_time']}", "%Y%m%d %H:%M")
+
+    def chokuzen_refresh_reason(self, date, stadium_code, race_no, now=None):
+        """保存済みレースの直前情報を取り直すべき理由（不要・未保存ならNone）
+
+        'missing': before_info がない、'fallback': 直前情報APIではなく基本データからの代替、
+        'stale': 発走 CHOKUZEN_FINAL_MINUTES 分前より前に取得したもの（直前情報APIが展示データを
+        返さなかった 'unavailable' も含む。発走時刻が予定に記録されていて、その時刻を過ぎている場合のみ）。
+        発走後（発走時刻が予定にある場合）・今節成績（results）段階の取得後は取り直さない。
+        """
+        entry = self.get_race(date, stadium_code, race_no)
+        if entry is None or "results" in entry.get("stages", {}):
+            return None
+        race_time = self.race_time(date, stadium_code, race_no)
+        now = now or datetime.now()
+        if race_time is not None and now >= race_time:
+            return None
+
+        freshness = entry.get("section_freshness", {}).get("before_info")
+        if freshness is None:
+            # 鮮度の記録がない台帳（旧形式）はファイルの内容から判定する
+            freshness = legacy_before_info_freshness(entry)
+        if freshness["source"] not in ("chokuzen", "unavailable"):
+            return freshness["source"]
+
+        if race_time is None or not freshness.get("fetched_at"):
+            return None
+        final_from = race_time - timedelta(minutes=CHOKUZEN_FINAL_MINUTES)
+        if now >= final_from and datetime.fromisoformat(freshness["fetched_at"]) < final_from:
+            return "stale"
+        return None
+
+    def races_needing_chokuzen(self, date, now=None):
+        """直前情報を取り直すべき保存済みレース（発走時刻順、各要素に reason を付ける）"""
+        manifest = self.load(date)
+        races = []
+        for entry in manifest["races"].values():
+            reason = self.chokuzen_refresh_reason(date, entry["stadium_code"], entry["race_no"], now)
+            if reason:
+                scheduled = manifest.get("schedule", {}).get(
+                    race_key(entry["stadium_code"], entry["race_no"]), {}
+                )
+                races.append({
+                    "stadium_code": entry["stadium_code"],
+                    "stadium": entry.get("stadium"),
+                    "race_no": entry["race_no"],
+                    "race_time": scheduled.get("race_time"),
+                    "reason": reason,
+                })
+        return sorted(races, key=lambda race: (race["race_time"] or "", race["stadium_code"], race["race_no"]))
+
+    def missing_races(self, date):
+        """予定に記録されていて未保存のレース（発走時刻順）"""
+        manifest = self.load(date)
+        missing = [
+            race for key, race in manifest.get("schedule", {}).items()
+            if key not in manifest["races"]
+        ]
+        return sorted(missing, key=lambda race: (race.get("race_time") or "", race["stadium_code"]))
+
+    def missing_in_range(self, start, end):
+        """日付範囲（YYYYMMDD・両端含む）の日付 → 未保存レース一覧（未保存がない日は含めない）"""
+        current = datetime.strptime(str(start), "%Y%m%d")
+        last = datetime.strptime(str(end), "%Y%m%d")
+        result = {}
+        while current <= last:
+            date = current.strftime("%Y%m%d")
+            missing = self.missing_races(date)
+            if missing:
+                result[date] = missing
+            current += timedelta(days=1)
+        return result
+
+    def rebuild(self, date):
+        """data/races/<日付> のJSONファイルから台帳を作り直す（予定の記録は残す）"""
+        date = str(date)
+        with self._locked(date):
+            previous = self._read_existing(date)
+            manifest = self._empty(date)
+            manifest["schedule"] = previous.get("schedule", {})
+            for path in sorted(glob.glob(os.path.join(self.races_dir, date, "*.json"))):
+                try:
+                    race_data = serialization.load_file(path)
+                    race_info = race_data["race_info"]
+                except (ValueError, KeyError) as e:
+                    print(f"台帳の再作成: 読み込めないファイルをスキップ {path} ({e})")
+                    continue
+                entry = race_entry(race_data, path, hashes=section_hashes(race_data))
+                entry["section_freshness"] = section_freshness(race_data, entry["fetched_at"])
+                manifest["races"][race_key(race_info["stadium_code"], race_info["race_no"])] = {
+                    "stadium_code": int(race_info["stadium_code"]),
+                    "race_no": int(race_info["race_no"]),
+                    **entry,
+                }
+            self._save(date, manifest)
+            return manifest
+
+    def _read_existing(self, date):
+        path = self.path(date)
+        if not os.path.exists(path):
+            return {}
+        return serialization.load_file(path)
+
+
+def section_hashes(final_data):
+    """セクションごとの内容のハッシュ（race_info は取得時刻を除いて計算）"""
+    hashes = {}
+    for name, value in final_data.items():
+        if name == "race_info":
+            value = {key: item for key, item in value.items() if key not in VOLATILE_RACE_INFO_KEYS}
+        hashes[name] = hashlib.sha256(serialization.dumps(value)).hexdigest()
+    return hashes
+
+
+def before_info_source(before_info):
+    """直前情報の取得元（展示タイムがあれば 'chokuzen'、なければ基本データからの代替 'fallback'）"""
+    if not before_info:
+        return "missing"
+    if any(record.get("展示タイム") is not None for record in before_info):
+        return "chokuzen"
+    return "fallback"
+
+
+def section_freshness(final_data, fetched_at, sections=None, fetched=False):
+    """セクションごとの取得時刻（before_info は取得元も）。sections で対象を絞り込める
+
+    fetched=True は今回直前情報APIを呼んだ結果で、展示データがなければ取得元を
+    'unavailable'（中止・データなし）として記録する。
+    """
+    names = sections or [name for name in final_data if name != "race_info"]
+    freshness = {}
+    for name in names:
+        freshness[name] = {"fetched_at": fetched_at}
+        if name == "before_info":
+            source = before_info_source(final_data.get(name))
+            freshness[name]["source"] = "unavailable" if fetched and source != "chokuzen" else source
+    return freshness
+
+
+def legacy_before_info_freshness(entry):
+    """鮮度の記録がない台帳の記録について、保存済みファイルから直前情報の鮮度を求める"""
+    source = "missing"
+    if entry.get("file") and os.path.exists(entry["file"]):
+        record = RaceRecord(entry["file"])
+        source = before_info_source(record.get("before_info"))
+    return {"fetched_at": entry.get("fetched_at"), "source": source}
+
+
+def changed_sections(new_hashes, old_hashes):
+    """内容が変わった（追加・削除を含む）セクション名のリスト"""
+    names = list(new_hashes) + [name for name in old_hashes if name not in new_hashes]
+    return [name for name in names if new_hashes.get(name) != old_hashes.get(name)]
+
+
+def race_entry(final_data, filename, outputs=None, fetched_at=None, hashes=None):
+    """台帳に記録する1レース分の情報"""
+    race_info = final_data["race_info"]
+    return {
+        "stadium": race_info.get("stadium"),
+        "file": filename,
+        "size": os.path.getsize(filename),
+        "sections": {
+            name: len(records) for name, records in final_data.items()
+            if name != "race_info" and isinstance(records, list)
+        },
+        "fetched_at": fetched_at or race_info.get("generated_at"),
+        "saved_at": datetime.now().isoformat(),
+        "outputs": {
+            name: path for name, path in (outputs or {}).items() if name != "json"
+        },
+        "section_hashes": hashes or section_hashes(final_data),
+    }
+
+
+_shared_manifest = None
+_shared_lock = threading.Lock()
+
+
+def get_race_manifest():
+    """プロセス共通の RaceManifest を取得"""
+    global _shared_manifest
+    with _shared_lock:
+        if _shared_manifest is None:
+            _shared_manifest = RaceManifest()
+        return _shared_manifest
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 2 and sys.argv[1] == "rebuild":
+        for date in sys.argv[2:]:
+            manifest = get_race_manifest().rebuild(date)
+            print(f"{date}: {len(manifest['races'])}レース")
+    elif len(sys.argv) > 2 and sys.argv[1] == "chokuzen":
+        for date in sys.argv[2:]:
+            for race in get_race_manifest().races_needing_chokuzen(date):
+                print(f"{date}\t{race['stadium']}\t{race['race_no']}R\t{race['race_time'] or ''}\t{race['reason']}")
+    elif len(sys.argv) > 2 and sys.argv[1] == "missing":
+        end = sys.argv[3] if len(sys.argv) > 3 else sys.argv[2]
+        for date, races in get_race_manifest().missing_in_range(sys.argv[2], end).items():
+            for race in races:
+                print(f"{date}\t{race['stadium']}\t{race['race_no']}R\t{race.get('race_time') or ''}")
+    else:
+        print("使用方法: python race_manifest.py rebuild [日付 ...]")
+        print("          python race_manifest.py missing [開始日] [終了日]")
+        print("          python race_manifest.py chokuzen [日付 ...]")
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+レースファイルのセクション単位の遅延読み込み（RaceRecord）
+
+data/index/<日付>/<ファイル名>.idx（セクション名 → バイト範囲の索引）を置き、
+必要なセクションだけを読み込んでデコードする。main.py の保存時に索引も書き出し、
+索引がない・古い（サイズ・更新時刻が違う）ファイルは1回だけ走査して作り直す。
+索引を書き込めない場合（読み取り専用のツリーなど）は走査結果をそのまま使う。
+"""
+
+import glob
+import json
+import os
+import threading
+
+import serialization
+from racer_store import resolve_racer_refs
+
+INDEX_DIR = "data/index"
+INDEX_SUFFIX = ".idx"
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+def index_path(path, index_dir=INDEX_DIR):
+    """レースファイルの索引の場所（data/index/<日付>/<ファイル名>.idx）"""
+    date_dir = os.path.basename(os.path.dirname(os.path.abspath(path)))
+    return os.path.join(index_dir, date_dir, f"{os.path.basename(path)}{INDEX_SUFFIX}")
+
+
+def _skip_whitespace(text, pos):
+    while pos < len(text) and text[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+
+def scan_sections(data):
+    """JSONオブジェクト（bytes）の最上位キーごとの値のバイト範囲 {キー: [開始, 終了]} を求める"""
+    text = data.decode('utf-8')
+    sections = {}
+    pos = _skip_whitespace(text, 0)
+    if text[pos:pos + 1] != '{':
+        raise ValueError("レースファイルの先頭がJSONオブジェクトではありません")
+    pos = _skip_whitespace(text, pos + 1)
+
+    # 文字位置 → バイト位置は直前の位置からの差分だけを数える
+    char_pos = 0
+    byte_pos = 0
+
+    def to_bytes(index):
+        nonlocal char_pos, byte_pos
+        byte_pos += len(text[char_pos:index].encode('utf-8'))
+        char_pos = index
+        return byte_pos
+
+    while pos < len(text) and text[pos] != '}':
+        key, pos = _decoder.raw_decode(text, pos)
+        pos = _skip_whitespace(text, pos)
+        if text[pos] != ':':
+            raise ValueError(f"レースファイルの形式が不正です（位置 {pos}）")
+        start = _skip_whitespace(text, pos + 1)
+        _value, end = _decoder.raw_decode(text, start)
+        sections[key] = [to_bytes(start), to_bytes(end)]
+        pos = _skip_whitespace(text, end)
+        if text[pos:pos + 1] == ',':
+            pos = _skip_whitespace(text, pos + 1)
+    return sections
+
+
+def write_index(path, sections):
+    """索引を書き出す（書き込めない場合は何もせず、索引の内容だけを返す）"""
+    stat = os.stat(path)
+    index = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sections": sections}
+    output_path = index_path(path)
+    tmp_path = f"{output_path}.tmp{os.getpid()}.{threading.get_ident()}"
+    try:
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(tmp_path, output_path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+    return index
+
+
+def load_index(path):
+    """有効な索引を返す（なければ走査して作成）"""
+    stat = os.stat(path)
+    try:
+        with open(index_path(path), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get("size") == stat.st_size and index.get("mtime_ns") == stat.st_mtime_ns:
+            return index
+    except (OSError, ValueError):
+        pass
+    with open(path, 'rb') as f:
+        sections = scan_sections(f.read())
+    return write_index(path, sections)
+
+
+def write_race_file(path, final_data, indent=serialization.RACE_FILE_INDENT):
+    """レースデータをセクションごとに書き出し、同時に索引も保存する
+
+    indent=2 の出力は json.dump(final_data, indent=2, ensure_ascii=False) と同じ内容。
+    indent=None の場合はインデント・改行なしのコンパクト形式。
+    """
+    if indent is None:
+        newline, separator = b"", b":"
+    else:
+        newline, separator = b"\n" + b" " * indent, b": "
+    sections = {}
+    chunks = [b"{"]
+    offset = 1
+    for i, (key, value) in enumerate(final_data.items()):
+        head = (b"," if i else b"") + newline + serialization.dumps(key) + separator
+        body = serialization.dumps(value, indent)
+        if indent is not None:
+            body = body.replace(b"\n", newline)
+        offset += len(head)
+        sections[key] = [offset, offset + len(body)]
+        offset += len(body)
+        chunks.extend((head, body))
+    chunks.append(b"\n}" if indent is not None and final_data else b"}")
+
+    with open(path, 'wb') as f:
+        f.write(b"".join(chunks))
+    write_index(path, sections)
+    return path
+
+
+class RaceRecord:
+    """1レースファイルのセクション単位の読み込み
+
+    record['before_info'] のようにアクセスした時点でそのセクションだけを読み込み、
+    結果はインスタンス内に保持する。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._index = load_index(path)
+        self._cache = {}
+
+    @property
+    def sections(self):
+        return tuple(self._index["sections"])
+
+    @property
+    def race_info(self):
+        return self["race_info"]
+
+    def __contains__(self, section):
+        return section in self._index["sections"]
+
+    def __getitem__(self, section):
+        if section not in self._cache:
+            start, end = self._index["sections"][section]
+            with open(self.path, 'rb') as f:
+                f.seek(start)
+                self._cache[section] = serialization.loads(f.read(end - start))
+        return self._cache[section]
+
+    def get(self, section, default=None):
+        return self[section] if section in self else default
+
+    def load(self, sections=None, resolve=True):
+        """指定セクション（省略時は全て）を保存形式の辞書で返す
+
+        resolve=True の場合、racer_ref（--dedup-racers の参照）を展開する。
+        """
+        names = sections or self.sections
+        race_data = {name: self[name] for name in names if name in self}
+        return resolve_racer_refs(race_data) if resolve else race_data
+
+    def bytes_read(self, sections):
+        """指定セクションを読むのに必要なバイト数（ファイル全体との比較用）"""
+        return sum(end - start for name, (start, end) in self._index["sections"].items() if name in sections)
+
+
+def iter_race_records(start=None, end=None, races_dir="data/races"):
+    """日付範囲（YYYYMMDD・両端含む）のレースファイルを RaceRecord として順に返す"""
+    if not os.path.isdir(races_dir):
+        return
+    for date in sorted(os.listdir(races_dir)):
+        if (start and date < str(start)) or (end and date > str(end)):
+            continue
+        for path in sorted(glob.glob(os.path.join(races_dir, date, "*.json"))):
+            yield RaceRecord(path)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    if len(sys.argv) > 2:
+        section = sys.argv[1]
+        started = time.perf_counter()
+        count = 0
+        read = 0
+        total = 0
+        for record in iter_race_records(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else sys.argv[2]):
+            record[section]
+            count += 1
+            read += record.bytes_read((section,))
+            total += os.path.getsize(record.path)
+        elapsed = time.perf_counter() - started
+        ratio = read / total * 100 if total else 0
+        print(f"{section}: {count}レース {elapsed:.2f}s（読み込み {read}/{total} bytes, {ratio:.1f}%）")
+    else:
+        print("使用方法: python race_record.py [セクション名] [開始日] [終了日]")
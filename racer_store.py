@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+選手データ保存モジュール（data/racers/<日付>/<選手番号>.json に選手単位で1回だけ保存）
+
+同じ日の中で変わらない経歴系の項目（basic_info の一部と course_info のほぼ全て）を
+選手単位のファイルに切り出し、レースファイルからは racer_ref で参照する。
+"""
+
+import json
+import os
+import threading
+
+import serialization
+from raw_records import iter_valid_players
+from normalize import normalize_record, field_parser
+from basic_info import BASIC_INFO_FIELDS, basic_info_from_player
+from course_info import COURSE_INFO_FIELDS, course_info_from_player
+
+RACERS_DIR = "data/racers"
+
+# 選手単位で保存する basic_info の項目（同日中は全レースで同じ値）
+RACER_BASIC_FIELDS = (
+    '選手名カナ', '年齢', '支部', '出身', '級別', '養成期間', '性別',
+    '全国勝率', '全国2連率', '全国3連率',
+    '前期能力指数', '今期能力指数', '最近勝率',
+    'フライング', '事故点', '事故率', '遅れ0', '遅れ1', '欠場0', '欠場1',
+    '1着総数', '準優出回数', '優出回数', '優勝回数',
+    '決まり手_逃げ', '決まり手_差し', '決まり手_捲り', '決まり手_捲り差し',
+    '決まり手_抜き', '決まり手_恵まれ',
+    '過去福勝', '過去3連',
+)
+
+# course_info のうちレースごとに値が変わる項目（レースファイル側に残す）と元データのキー
+RACE_COURSE_FIELDS = {
+    '総進入回数_全期間': 'shinnyu',
+    '2連率_全期間': 'fukusho',
+}
+
+# 参照を展開したときに元と同じ項目順に戻すための並び
+BASIC_FIELD_ORDER = tuple(output_key for output_key, _ in BASIC_INFO_FIELDS)
+COURSE_FIELD_ORDER = tuple(output_key for output_key, _ in COURSE_INFO_FIELDS)
+
+
+def racer_ref(date_str, player_no):
+    """レースファイルに書き込む参照文字列（RACERS_DIR からの相対パス）"""
+    return f"{date_str}/{player_no}.json"
+
+
+def racer_path(date_str, player_no, racers_dir=RACERS_DIR):
+    return os.path.join(racers_dir, racer_ref(date_str, player_no))
+
+
+def load_racer(date_str, player_no, racers_dir=RACERS_DIR):
+    """選手データを読み込む（未保存ならNone）"""
+    path = racer_path(date_str, player_no, racers_dir)
+    if not os.path.exists(path):
+        return None
+    return serialization.load_file(path)
+
+
+def save_racer(date_str, player_no, record, racers_dir=RACERS_DIR, overwrite=True):
+    """選手データを保存（一時ファイル経由で置き換え）し、保存したら True を返す
+
+    overwrite=False の場合、既に保存済み（別のレースの処理が先に保存した場合を含む）なら保存しない。
+    """
+    path = racer_path(date_str, player_no, racers_dir)
+    if not overwrite and os.path.exists(path):
+        return False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # 同じ選手の2レースを別スレッドで同時に処理しても一時ファイルが重ならないようにする
+    tmp_path = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+    serialization.dump_file(tmp_path, record, indent=2)
+    if not overwrite and os.path.exists(path):
+        os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, path)
+    return True
+
+
+def build_racer_record(date_str, basic_entry, course_entry):
+    """basic_info / course_info の1選手分から選手データを組み立てる"""
+    return {
+        '選手番号': basic_entry['選手番号'],
+        '選手名': basic_entry['選手名'],
+        '日付': date_str,
+        'basic_info': {key: basic_entry.get(key) for key in RACER_BASIC_FIELDS},
+        'course_info': {
+            key: value for key, value in course_entry.items()
+            if key not in RACE_COURSE_FIELDS and key not in ('選手番号', '選手名')
+        },
+    }
+
+
+def extract_with_racer_store(basic_raw_data, date_str, racers_dir=RACERS_DIR, normalize=False):
+    """basic_info / course_info を選手データ参照形式で抽出
+
+    未保存の選手だけ course_info を抽出して選手データを書き込む。
+    normalize=True の場合、選手データ・参照の両方を normalize の対応表で変換する
+    （同じ日の中では normalize の有無をそろえること）。
+    戻り値は (basic_info, course_info, 新規保存した選手番号のリスト)。
+    """
+    basic_refs = []
+    course_refs = []
+    saved = []
+
+    for raw_player in iter_valid_players(basic_raw_data):
+        entry = basic_info_from_player(raw_player)
+        if normalize:
+            entry = normalize_record('basic_info', entry)
+        player_no = entry['選手番号']
+        ref = racer_ref(date_str, player_no)
+
+        if load_racer(date_str, player_no, racers_dir) is None:
+            course_entry = course_info_from_player(raw_player)
+            if normalize:
+                course_entry = normalize_record('course_info', course_entry)
+            record = build_racer_record(date_str, entry, course_entry)
+            if save_racer(date_str, player_no, record, racers_dir, overwrite=False):
+                saved.append(player_no)
+
+        basic_ref = {key: value for key, value in entry.items() if key not in RACER_BASIC_FIELDS}
+        basic_ref['racer_ref'] = ref
+        basic_refs.append(basic_ref)
+
+        course_ref = {'選手番号': player_no, '選手名': entry['選手名']}
+        for key, source_key in RACE_COURSE_FIELDS.items():
+            value = raw_player.get(source_key)
+            course_ref[key] = field_parser('course_info', key)(value) if normalize else value
+        course_ref['racer_ref'] = ref
+        course_refs.append(course_ref)
+
+    return basic_refs, course_refs, saved
+
+
+def resolve_racer_refs(race_data, racers_dir=RACERS_DIR):
+    """racer_ref を含むレースデータを元の埋め込み形式に戻す（参照がなければそのまま返す）"""
+    cache = {}
+
+    def expand(entries, section, field_order):
+        expanded = []
+        for entry in entries:
+            ref = entry.get('racer_ref')
+            if not ref:
+                expanded.append(entry)
+                continue
+            if ref not in cache:
+                cache[ref] = serialization.load_file(os.path.join(racers_dir, ref))
+            merged = dict(cache[ref][section])
+            merged.update((key, value) for key, value in entry.items() if key != 'racer_ref')
+            expanded.append({key: merged.get(key) for key in field_order})
+        return expanded
+
+    resolved = dict(race_data)
+    if 'basic_info' in resolved:
+        resolved['basic_info'] = expand(resolved['basic_info'], 'basic_info', BASIC_FIELD_ORDER)
+    if 'course_info' in resolved:
+        resolved['course_info'] = expand(resolved['course_info'], 'course_info', COURSE_FIELD_ORDER)
+    return resolved
+
+
+def load_race(path, racers_dir=RACERS_DIR):
+    """レースファイルを読み込み、選手データ参照を展開して返す"""
+    return resolve_racer_refs(serialization.load_file(path), racers_dir)
+
+
+if __name__ == "__main__":
+    # テスト用
+    import sys
+
+    if len(sys.argv) > 1:
+        print(json.dumps(load_race(sys.argv[1]), ensure_ascii=False, indent=2))
+    else:
+        print("使用方法: python racer_store.py [レースJSONファイルパス]")
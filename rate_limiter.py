@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+外部リクエスト共通のレート制限（ホスト単位のトークンバケット＋同時接続数制限）
+
+RATE_LIMITS に adaptive（下限・上限）を設定したホストは、応答時間とエラー（429・5xx・
+通信エラー）を観測してレート・同時接続数を自動で調整する（AIMD）。問題のない応答が
+AIMD_WINDOW 件続くたびにレートを少しずつ上げ、エラーや応答の遅れがあれば半分に下げる。
+"""
+
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+# ホストごとの設定（rate: 1秒あたりのリクエスト数, burst: 連続送信できる最大数, concurrency: 同時接続数,
+# adaptive: 自動調整するレート・同時接続数の下限と上限。rate / concurrency は開始時の値）
+RATE_LIMITS = {
+    # 1レース分の3リクエスト（mode=0・直前情報・mode=3）をまとめて送れる程度のバースト
+    "kyoteibiyori.com": {
+        "rate": 0.5,
+        "burst": 3,
+        "concurrency": 3,
+        "adaptive": {"min_rate": 0.1, "max_rate": 3.0, "min_concurrency": 1, "max_concurrency": 6},
+    },
+    "www.boatrace.jp": {"rate": 1.0, "burst": 2, "concurrency": 4},
+}
+
+# 設定のないホストに適用する値
+DEFAULT_RATE_LIMIT = {"rate": 1.0, "burst": 1, "concurrency": 2}
+
+# 自動調整: 問題のない応答がこの件数続くたびにレートを AIMD_INCREASE（件/秒）上げる
+AIMD_WINDOW = 10
+AIMD_INCREASE = 0.1
+
+# 自動調整: エラー・応答の遅れがあればレートをこの割合に下げる（続けて下げるのは AIMD_COOLDOWN 秒ごと）
+AIMD_DECREASE = 0.5
+AIMD_COOLDOWN = 10.0
+
+# 自動調整: 直近の平均応答時間がこの秒数を超えたらサーバーの負荷が高いとみなす
+LATENCY_TARGET = 2.0
+
+# 平均応答時間の平滑化係数（指数移動平均）
+LATENCY_SMOOTHING = 0.2
+
+# サーバーの負荷・制限を示すステータスコード
+THROTTLE_STATUSES = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """スレッドセーフなトークンバケット"""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self):
+        """トークンを1つ取得（不足時は補充されるまで待機）し、待機秒数を返す"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def set_rate(self, rate=None, burst=None):
+        """レート・バーストを変更（補充済みのトークンは維持）"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if rate is not None:
+                self.rate = float(rate)
+            if burst is not None:
+                self.burst = float(burst)
+                self._tokens = min(self._tokens, self.burst)
+
+
+class AdaptiveController:
+    """応答時間・エラーからホストのレートと同時接続数を調整する（AIMD）"""
+
+    def __init__(self, limiter, min_rate, max_rate, min_concurrency, max_concurrency):
+        self.limiter = limiter
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self.min_concurrency = int(min_concurrency)
+        self.max_concurrency = int(max_concurrency)
+        self._lock = threading.Lock()
+        self._good = 0
+        self._last_decrease = 0.0
+        # 平均応答時間（秒）と件数
+        self.latency = None
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+
+    def observe(self, latency, status=None, error=False):
+        """1リクエストの結果を記録し、必要ならレートを変更する"""
+        with self._lock:
+            self.requests += 1
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency += LATENCY_SMOOTHING * (latency - self.latency)
+            if error:
+                self.errors += 1
+                self._decrease("通信エラー")
+            elif status in THROTTLE_STATUSES:
+                self.throttled += 1
+                self._decrease(f"HTTP {status}")
+            elif self.latency > LATENCY_TARGET:
+                self._decrease(f"応答 {self.latency:.1f}s")
+            else:
+                self._good += 1
+                if self._good >= AIMD_WINDOW:
+                    self._increase()
+
+    def _decrease(self, reason):
+        # self._lock を保持した状態で呼ばれる
+        self._good = 0
+        now = time.monotonic()
+        if now - self._last_decrease < AIMD_COOLDOWN:
+            return
+        self._last_decrease = now
+        rate = max(self.min_rate, self.limiter.bucket.rate * AIMD_DECREASE)
+        concurrency = max(self.min_concurrency, self.limiter.concurrency // 2)
+        self._apply(rate, concurrency, f"減速（{reason}）")
+
+    def _increase(self):
+        # self._lock を保持した状態で呼ばれる
+        self._good = 0
+        rate = min(self.max_rate, self.limiter.bucket.rate + AIMD_INCREASE)
+        # 同時接続数はレート × 平均応答時間（処理中のリクエスト数）を賄える分だけ増やす
+        needed = math.ceil(rate * (self.latency or 0)) + 1
+        concurrency = min(self.max_concurrency, max(self.limiter.concurrency, needed))
+        if rate == self.limiter.bucket.rate and concurrency == self.limiter.concurrency:
+            return
+        self._apply(rate, concurrency, "加速")
+
+    def _apply(self, rate, concurrency, reason):
+        self.limiter.bucket.set_rate(rate)
+        self.limiter.set_concurrency(concurrency)
+        logging.info(f"レート調整: {self.limiter.host} {reason} → {self.limiter.format_stats()}")
+
+
+class RequestSlot:
+    """確保済みのリクエスト枠（observe(status) でステータスコードを自動調整に渡す）"""
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.status = None
+
+    def observe(self, status):
+        self.status = status
+
+
+class HostLimiter:
+    """1ホスト分のトークンバケットと同時接続数制限"""
+
+    def __init__(self, host, rate, burst, concurrency, adaptive=None):
+        self.host = host
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = int(concurrency)
+        self._active = 0
+        self._cond = threading.Condition()
+        self.controller = AdaptiveController(self, **adaptive) if adaptive else None
+
+    def format_stats(self):
+        """現在のレート・同時接続数（自動調整中なら平均応答時間・エラー件数も）"""
+        text = f"{self.bucket.rate:.2f}件/秒 同時{self.concurrency}"
+        controller = self.controller
+        if controller and controller.latency is not None:
+            text += (
+                f" 応答{controller.latency:.2f}s"
+                f"（{controller.requests}件中 エラー{controller.errors}件 制限{controller.throttled}件）"
+            )
+        return text
+
+    def set_concurrency(self, concurrency):
+        with self._cond:
+            self.concurrency = max(1, int(concurrency))
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """同時接続枠とトークンを確保してからリクエストを送る（自動調整中は応答時間・エラーを記録）"""
+        with self._cond:
+            while self._active >= self.concurrency:
+                self._cond.wait()
+            self._active += 1
+        request = RequestSlot(self)
+        error = False
+        try:
+            self.bucket.acquire()
+            started = time.monotonic()
+            try:
+                yield request
+            except Exception:
+                error = True
+                raise
+            finally:
+                if self.controller:
+                    self.controller.observe(time.monotonic() - started, request.status, error)
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify()
+
+
+class RateLimiter:
+    """ホスト単位の HostLimiter を管理"""
+
+    def __init__(self, limits=None, default=None):
+        self.limits = dict(RATE_LIMITS if limits is None else limits)
+        self.default = dict(DEFAULT_RATE_LIMIT if default is None else default)
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def configure(self, host, rate=None, burst=None, concurrency=None, adaptive=None):
+        """ホストの設定を変更（既に使用中のリミッターにも反映）
+
+        adaptive=False で自動調整を止める（rate / concurrency に固定）。
+        """
+        with self._lock:
+            config = dict(self.limits.get(host, self.default))
+            for key, value in (("rate", rate), ("burst", burst), ("concurrency", concurrency)):
+                if value is not None:
+                    config[key] = value
+            if adaptive is False:
+                config.pop("adaptive", None)
+            self.limits[host] = config
+            limiter = self._hosts.get(host)
+        if limiter:
+            limiter.bucket.set_rate(config["rate"], config["burst"])
+            limiter.set_concurrency(config["concurrency"])
+            if adaptive is False:
+                limiter.controller = None
+
+    def for_host(self, host):
+        with self._lock:
+            if host not in self._hosts:
+                config = self.limits.get(host, self.default)
+                self._hosts[host] = HostLimiter(
+                    host,
+                    config["rate"],
+                    config["burst"],
+                    config["concurrency"],
+                    adaptive=config.get("adaptive"),
+                )
+            return self._hosts[host]
+
+    def for_url(self, url):
+        return self.for_host(urlparse(url).hostname or "")
+
+    @contextmanager
+    def request(self, url):
+        """with limiter.request(url) as slot: response = session.get(url); slot.observe(response.status_code) の形で使う"""
+        with self.for_url(url).slot() as request:
+            yield request
+
+    def format_stats(self, host):
+        """ホストの現在のレート（ログ・状態表示用）"""
+        return f"{host}: {self.for_host(host).format_stats()}"
+
+
+_shared_limiter = None
+_shared_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """プロセス共通の RateLimiter を取得"""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter()
+        return _shared_limiter
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+APIレスポンス生データのアーカイブ（gzip圧縮・内容アドレス方式）
+
+data/raw/objects/<ハッシュ先頭2桁>/<sha256>.json.gz に本文をそのまま保存し、
+data/raw/index/<日付>/<会場コード>_<レース番号>_<モード>.json に取得履歴を記録する。
+モードは 0・3（出走表API）と "chokuzen"（直前情報API）。
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+from datetime import datetime
+
+import serialization
+
+RAW_DIR = "data/raw"
+
+CHOKUZEN_MODE = "chokuzen"
+
+
+class RawArchive:
+    def __init__(self, root=RAW_DIR):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.index_dir = os.path.join(root, "index")
+        self._lock = threading.Lock()
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.json.gz")
+
+    def _index_path(self, place_no, race_no, hiduke, mode):
+        return os.path.join(self.index_dir, str(hiduke), f"{int(place_no)}_{int(race_no)}_{mode}.json")
+
+    def _read_index(self, path):
+        if not os.path.exists(path):
+            return []
+        return serialization.load_file(path)
+
+    def _write_atomic(self, path, data, binary=False):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+        if binary:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+        else:
+            serialization.dump_file(tmp_path, data, compact=False)
+        os.replace(tmp_path, path)
+
+    def put(self, place_no, race_no, hiduke, mode, content):
+        """レスポンス本文（bytes）を保存してハッシュを返す（同一内容は1回だけ保存）"""
+        digest = hashlib.sha256(content).hexdigest()
+        object_path = self._object_path(digest)
+        if not os.path.exists(object_path):
+            self._write_atomic(object_path, gzip.compress(content), binary=True)
+
+        index_path = self._index_path(place_no, race_no, hiduke, mode)
+        with self._lock:
+            entries = self._read_index(index_path)
+            entries.append({
+                "sha256": digest,
+                "size": len(content),
+                "fetched_at": datetime.now().isoformat(),
+            })
+            self._write_atomic(index_path, entries)
+        return digest
+
+    def get_object(self, digest):
+        with open(self._object_path(digest), 'rb') as f:
+            return gzip.decompress(f.read())
+
+    def history(self, place_no, race_no, hiduke, mode):
+        """取得履歴（古い順）"""
+        return self._read_index(self._index_path(place_no, race_no, hiduke, mode))
+
+    def get(self, place_no, race_no, hiduke, mode):
+        """最新のレスポンス本文を返す（未保存ならNone）"""
+        entries = self.history(place_no, race_no, hiduke, mode)
+        if not entries:
+            return None
+        return self.get_object(entries[-1]["sha256"])
+
+    def list_races(self, hiduke):
+        """指定日にアーカイブ済みの (会場コード, レース番号) 一覧"""
+        date_dir = os.path.join(self.index_dir, str(hiduke))
+        if not os.path.isdir(date_dir):
+            return []
+        races = set()
+        for name in os.listdir(date_dir):
+            if not name.endswith(".json"):
+                continue
+            place_no, race_no, _mode = name[:-len(".json")].split("_", 2)
+            races.add((int(place_no), int(race_no)))
+        return sorted(races)
+
+
+_shared_archive = None
+_shared_lock = threading.Lock()
+
+
+def get_raw_archive():
+    """プロセス共通の RawArchive を取得"""
+    global _shared_archive
+    with _shared_lock:
+        if _shared_archive is None:
+            _shared_archive = RawArchive()
+        return _shared_archive
+
+
+def replay_date(hiduke, dedup_racers=False):
+    """アーカイブ済みの生データから指定日の全レースを再抽出（通信なし）"""
+    from main import STADIUM_CODES, process_race, RaceDataError
+    from scraper import KyoteiBiyoriScraper
+
+    stadium_names = {}
+    for name, code in STADIUM_CODES.items():
+        stadium_names.setdefault(code, name)
+
+    scraper = KyoteiBiyoriScraper(archive=get_raw_archive(), replay=True)
+    races = get_raw_archive().list_races(hiduke)
+    success = 0
+    for place_no, race_no in races:
+        stadium_name = stadium_names[place_no]
+        try:
+            result = process_race(
+                hiduke, stadium_name, race_no, scraper=scraper, verbose=False, dedup_racers=dedup_racers
+            )
+            success += 1
+            print(f"✓ {stadium_name} {race_no}R: {result['filename']} ({result['timings']['total']:.2f}s)")
+        except (ValueError, RaceDataError) as e:
+            print(f"✗ {stadium_name} {race_no}R: {e}")
+    print(f"再抽出完了: {success}/{len(races)}レース")
+    return success
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 2 and sys.argv[1] == "list":
+        for place_no, race_no in get_raw_archive().list_races(sys.argv[2]):
+            print(f"{place_no}\t{race_no}")
+    elif len(sys.argv) > 2 and sys.argv[1] == "replay":
+        replay_date(sys.argv[2], dedup_racers="--dedup-racers" in sys.argv[3:])
+    else:
+        print("使用方法: python raw_archive.py list [日付]")
+        print("          python raw_archive.py replay [日付] [--dedup-racers]")
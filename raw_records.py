@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+出走表APIの選手レコード検証（各抽出モジュール共通）
+"""
+
+
+def iter_valid_players(json_data):
+    """抽出対象になる選手レコードだけを順に返す（スキップ理由は1回だけ表示）"""
+    for i, player in enumerate(json_data):
+        # 各プレイヤーが辞書であることを確認
+        if not isinstance(player, dict):
+            print(f"Warning: Player {i} is {type(player)}, expected dict. Skipping...")
+            continue
+
+        # 数値キーのデータ（配列形式）をスキップ
+        if player and isinstance(next(iter(player)), int):
+            print(f"Player {i}: 数値キー形式のデータをスキップ")
+            continue
+
+        # player_noが存在しない場合もスキップ
+        if not player.get('player_no'):
+            print(f"Player {i}: player_noがないデータをスキップ")
+            continue
+
+        yield player
+
+
+def pick_fields(player, output_keys, source_keys):
+    """対応表（出力キー列・元データキー列）に沿って1選手分の辞書を作る"""
+    return dict(zip(output_keys, map(player.get, source_keys)))
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+レース場一覧・レース時刻のキャッシュ（data/schedules/<日付>.json、1日1ファイル）
+
+boatrace.jp から取得したレース場一覧と会場ごとのレース時刻を保存し、有効期限
+（SCHEDULE_TTL）が切れるか invalidate されるまではページを取り直さない。
+キャッシュがない日付は schedule_races_for_day が書き出した
+race_schedule_<日付>.csv から読み込む。取得のたびに内容のハッシュ（ページの版）を
+記録し、版が変わった時刻も残す。
+"""
+
+import csv
+import hashlib
+import logging
+import os
+import threading
+from datetime import datetime
+
+import serialization
+
+SCHEDULE_DIR = "data/schedules"
+
+# 当日以降のスケジュールを取り直すまでの秒数（過去の日付は取り直さない）
+SCHEDULE_TTL = 6 * 60 * 60
+
+VENUES_KEY = "venues"
+
+
+def page_version(items):
+    """取得内容のハッシュ（内容が同じなら同じ値）"""
+    return hashlib.sha1(serialization.dumps(items)).hexdigest()[:12]
+
+
+class ScheduleCache:
+    def __init__(self, root=SCHEDULE_DIR, ttl=SCHEDULE_TTL):
+        self.root = root
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        # 日付 → (ファイルの更新時刻, 内容)
+        self._cache = {}
+        # (日付, key) → 取得中のロック（同じページを複数のスレッドで取得しない）
+        self._fetch_locks = {}
+        # キャッシュから返した回数・ページを取得した回数
+        self.hits = 0
+        self.fetches = 0
+
+    def path(self, date):
+        return os.path.join(self.root, f"{date}.json")
+
+    def csv_path(self, date):
+        return os.path.join(self.root, f"race_schedule_{date}.csv")
+
+    def _empty(self, date):
+        return {"date": str(date), "venues": None, "races": {}}
+
+    def _from_csv(self, date):
+        """race_schedule_<日付>.csv から作る（なければ空）"""
+        cache = self._empty(date)
+        path = self.csv_path(date)
+        if not os.path.exists(path):
+            return cache
+        fetched_at = datetime.fromtimestamp(os.path.getmtime(path)).isoformat()
+        venues = {}
+        races = {}
+        with open(path, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                code = str(row["venue_code"]).zfill(2)
+                venues.setdefault(code, {"code": code, "name": row["venue_name"]})
+                races.setdefault(code, []).append(
+                    {"race_no": str(row["race_no"]), "time": row["race_time"]}
+                )
+        if venues:
+            cache["venues"] = self._entry(list(venues.values()), fetched_at, source="csv")
+            for code, items in races.items():
+                cache["races"][code] = self._entry(items, fetched_at, source="csv")
+        return cache
+
+    def _entry(self, items, fetched_at, source="page", previous=None):
+        version = page_version(items)
+        changed_at = fetched_at
+        if previous and previous.get("version") == version:
+            changed_at = previous.get("changed_at", fetched_at)
+        return {
+            "items": items,
+            "version": version,
+            "fetched_at": fetched_at,
+            "changed_at": changed_at,
+            "source": source,
+        }
+
+    def load(self, date):
+        """1日分のキャッシュを返す（別プロセスが更新した場合は読み直す）"""
+        date = str(date)
+        path = self.path(date)
+        with self._lock:
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            cached = self._cache.get(date)
+            if cached and cached[0] == mtime:
+                return cached[1]
+            cache = serialization.load_file(path) if mtime else self._from_csv(date)
+            self._cache[date] = (mtime, cache)
+            return cache
+
+    def _save(self, date, cache):
+        path = self.path(date)
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+        serialization.dump_file(tmp_path, cache, compact=False)
+        os.replace(tmp_path, path)
+        self._cache[str(date)] = (os.stat(path).st_mtime_ns, cache)
+
+    def _lookup(self, cache, key):
+        if key == VENUES_KEY:
+            return cache["venues"]
+        return cache["races"].get(key)
+
+    def is_fresh(self, date, entry):
+        if not entry or entry.get("stale"):
+            return False
+        # 過去の日付のスケジュールは変わらない
+        if str(date) < datetime.now().strftime("%Y%m%d"):
+            return True
+        age = datetime.now() - datetime.fromisoformat(entry["fetched_at"])
+        return age.total_seconds() < self.ttl
+
+    def get(self, date, key, fetch):
+        """キャッシュが有効ならその内容を、なければ fetch() で取得して保存した内容を返す
+
+        key はレース場一覧なら VENUES_KEY、レース時刻なら会場コード。
+        取得結果が空（取得失敗を含む）の場合は保存せず、古いキャッシュがあればそれを返す。
+        同じ日付・key の取得は1スレッドだけが行い、他のスレッドはその結果を待って使う。
+        """
+        date = str(date)
+        with self._lock:
+            fetch_lock = self._fetch_locks.setdefault((date, key), threading.Lock())
+        with fetch_lock:
+            return self._get_locked(date, key, fetch)
+
+    def _get_locked(self, date, key, fetch):
+        # (date, key) の取得ロックを保持した状態で呼ばれる
+        with self._lock:
+            entry = self._lookup(self.load(date), key)
+            if self.is_fresh(date, entry):
+                self.hits += 1
+                return entry["items"]
+
+        items = fetch()
+        with self._lock:
+            self.fetches += 1
+        if not items:
+            return entry["items"] if entry else items
+
+        with self._lock:
+            cache = self.load(date)
+            previous = self._lookup(cache, key)
+            new_entry = self._entry(items, datetime.now().isoformat(), previous=previous)
+            if previous and previous.get("version") != new_entry["version"]:
+                logging.info(f"スケジュールが更新されました: {date} {key}")
+            if key == VENUES_KEY:
+                cache["venues"] = new_entry
+            else:
+                cache["races"][key] = new_entry
+            self._save(date, cache)
+        return items
+
+    def get_venues(self, date, fetch):
+        return self.get(date, VENUES_KEY, fetch)
+
+    def get_races(self, date, venue_code, fetch):
+        return self.get(date, str(venue_code).zfill(2), fetch)
+
+    def invalidate(self, date, venue_code=None):
+        """次回の参照で取り直すよう印を付ける（会場コード省略時は1日分すべて）"""
+        date = str(date)
+        with self._lock:
+            cache = self.load(date)
+            if venue_code is None:
+                entries = [cache["venues"], *cache["races"].values()]
+            else:
+                entries = [cache["races"].get(str(venue_code).zfill(2))]
+            for entry in entries:
+                if entry:
+                    entry["stale"] = True
+            self._save(date, cache)
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_schedule_cache():
+    """プロセス共通の ScheduleCache を取得"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ScheduleCache()
+        return _shared_cache
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 2 and sys.argv[1] == "invalidate":
+        venue_code = sys.argv[3] if len(sys.argv) > 3 else None
+        get_schedule_cache().invalidate(sys.argv[2], venue_code)
+        print(f"{sys.argv[2]}: スケジュールを次回取り直します")
+    elif len(sys.argv) > 2 and sys.argv[1] == "show":
+        cache = get_schedule_cache()
+        data = cache.load(sys.argv[2])
+        venues = data["venues"]
+        if not venues:
+            print(f"{sys.argv[2]}: キャッシュなし")
+            sys.exit(0)
+        state = "有効" if cache.is_fresh(sys.argv[2], venues) else "期限切れ"
+        print(f"レース場一覧: {len(venues['items'])}会場 版 {venues['version']} 取得 {venues['fetched_at']}（{state}）")
+        for venue in venues["items"]:
+            entry = data["races"].get(venue["code"])
+            if entry:
+                state = "有効" if cache.is_fresh(sys.argv[2], entry) else "期限切れ"
+                print(f"  {venue['name']}({venue['code']}): {len(entry['items'])}レース 版 {entry['version']}（{state}）")
+            else:
+                print(f"  {venue['name']}({venue['code']}): キャッシュなし")
+    else:
+        print("使用方法: python schedule_cache.py show [日付]")
+        print("          python schedule_cache.py invalidate [日付] [会場コード]")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+kyoteibiyori.com APIクライアント（出走表・今節成績・直前情報）
+"""
+
+import json
+
+import requests
+
+import serialization
+from rate_limiter import get_rate_limiter
+from raw_archive import CHOKUZEN_MODE
+
+# kyoteibiyori.com へのリクエストのタイムアウト（接続, 読み込み）秒
+# （応答が止まった場合も rate_limiter の自動調整に通信エラーとして伝わる）
+REQUEST_TIMEOUT = (5, 20)
+
+class KyoteiBiyoriScraper:
+    def __init__(self, limiter=None, archive=None, replay=False):
+        self.base_url = "https://kyoteibiyori.com/request_race_shusso_detail_v4.php"
+        self.chokuzen_url = "https://kyoteibiyori.com/request_chokuzen_info_v2.php"
+        self.session = requests.Session()
+        # 送信間隔はプロセス共通のレート制限に従う
+        self.limiter = limiter or get_rate_limiter()
+        # 生データアーカイブ（raw_archive.RawArchive）。replay=True ならアーカイブのみから読み込む
+        if replay and archive is None:
+            raise ValueError("replay=True には archive の指定が必要です")
+        self.archive = archive
+        self.replay = replay
+
+    def _build_headers(self, place_no, race_no, hiduke):
+        """kyoteibiyori.com 向けの共通リクエストヘッダーを生成"""
+        return {
+            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36',
+            'Accept': 'application/json, text/javascript, */*; q=0.01',
+            'Accept-Language': 'ja,en-US;q=0.9,en;q=0.8',
+            'Accept-Encoding': 'gzip, deflate, br, zstd',
+            'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
+            'X-Requested-With': 'XMLHttpRequest',
+            'Origin': 'https://kyoteibiyori.com',
+            'Referer': f'https://kyoteibiyori.com/race_shusso.php?place_no={place_no}&race_no={race_no}&hiduke={hiduke}&slider=1',
+            'Cache-Control': 'no-cache',
+            'Pragma': 'no-cache',
+        }
+
+    def _post(self, url, headers, data):
+        """レート制限の枠を確保してPOST"""
+        with self.limiter.request(url) as slot:
+            response = self.session.post(url, headers=headers, data=data, timeout=REQUEST_TIMEOUT)
+            slot.observe(response.status_code)
+            return response
+
+    def _fetch(self, url, data, place_no, race_no, hiduke, mode):
+        """レスポンス本文（bytes）を取得
+
+        replay=True ならアーカイブから返し（未保存ならNone）、通信は行わない。
+        archive が設定されていれば取得した本文を保存する。
+        """
+        if self.replay:
+            content = self.archive.get(place_no, race_no, hiduke, mode)
+            if content is None:
+                print(f"アーカイブに生データがありません (mode={mode}): {place_no} {race_no}R {hiduke}")
+            return content
+
+        headers = self._build_headers(place_no, race_no, hiduke)
+        response = self._post(url, headers, data)
+        response.raise_for_status()
+
+        if self.archive:
+            self.archive.put(place_no, race_no, hiduke, mode, response.content)
+        return response.content
+
+    def get_race_data(self, place_no, race_no, hiduke, mode=0):
+        """競艇データを取得（基本・コース・モーター・今節成績用）"""
+        data = {
+            'data': json.dumps({
+                'place_no': place_no,
+                'race_no': race_no,
+                'hiduke': hiduke,
+                'mode': mode
+            })
+        }
+        
+        try:
+            content = self._fetch(self.base_url, data, place_no, race_no, hiduke, mode)
+            if content is None:
+                return None
+            
+            json_data = serialization.loads(content)
+            
+            if isinstance(json_data, dict):
+                if 'race_list' in json_data:
+                    race_list = json_data['race_list']
+                    return race_list
+                else:
+                    return json_data
+            else:
+                return json_data
+                
+        except requests.exceptions.RequestException as e:
+            print(f"リクエストエラー (mode={mode}): {e}")
+            return None
+        except ValueError as e:
+            print(f"JSONデコードエラー (mode={mode}): {e}")
+            return None
+
+    def get_chokuzen_data(self, place_no, race_no, hiduke):
+        """直前情報を取得（新API）"""
+        data = {
+            'data': json.dumps({
+                'place_no': place_no,
+                'race_no': race_no,
+                'hiduke': hiduke
+            })
+        }
+        
+        try:
+            content = self._fetch(self.chokuzen_url, data, place_no, race_no, hiduke, CHOKUZEN_MODE)
+            if content is None:
+                return None
+            
+            json_data = serialization.loads(content)
+            
+            return json_data
+                
+        except requests.exceptions.RequestException as e:
+            print(f"直前情報リクエストエラー: {e}")
+            return None
+        except ValueError as e:
+            print(f"直前情報JSONデコードエラー: {e}")
+            return None
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+JSONの読み書き（orjson・msgspec がインストールされていれば使い、なければ標準の json）
+
+出力は常に UTF-8 の bytes（日本語はエスケープしない）。indent=None でインデントなしの
+コンパクト形式、indent=2 で従来と同じ整形形式になる。
+使う実装は set_backend で切り替えられる（ベンチマーク用）。
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# レースファイルの標準のインデント（None でコンパクト形式）
+RACE_FILE_INDENT = 2
+
+
+def _stdlib_dumps(obj, indent=None):
+    if indent is None:
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, indent=indent).encode('utf-8')
+
+
+def _stdlib_loads(data):
+    return json.loads(data)
+
+
+def _orjson_dumps(obj, indent=None):
+    if indent is None:
+        return orjson.dumps(obj)
+    if indent == 2:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    # orjson は2スペース以外のインデントに対応していない
+    return _stdlib_dumps(obj, indent)
+
+
+def _msgspec_dumps(obj, indent=None):
+    data = _msgspec_encoder.encode(obj)
+    if indent is None:
+        return data
+    return msgspec.json.format(data, indent=indent)
+
+
+def _available_backends():
+    backends = {}
+    if orjson is not None:
+        backends['orjson'] = (_orjson_dumps, orjson.loads)
+    if msgspec is not None:
+        backends['msgspec'] = (_msgspec_dumps, msgspec.json.decode)
+    backends['json'] = (_stdlib_dumps, _stdlib_loads)
+    return backends
+
+
+_msgspec_encoder = msgspec.json.Encoder() if msgspec is not None else None
+
+BACKENDS = _available_backends()
+
+_backend = next(iter(BACKENDS))
+_dumps, _loads = BACKENDS[_backend]
+
+
+def get_backend():
+    return _backend
+
+
+def set_backend(name):
+    """使う実装を切り替える（'orjson'・'msgspec'・'json'）"""
+    global _backend, _dumps, _loads
+    if name not in BACKENDS:
+        raise ValueError(f"利用できないJSON実装: {name}（利用可能: {', '.join(BACKENDS)}）")
+    _backend = name
+    _dumps, _loads = BACKENDS[name]
+
+
+def dumps(obj, indent=None):
+    """obj を JSON の bytes に変換"""
+    return _dumps(obj, indent)
+
+
+def loads(data):
+    """JSON（bytes または str）を読み込む"""
+    return _loads(data)
+
+
+def load_file(path):
+    with open(path, 'rb') as f:
+        return _loads(f.read())
+
+
+def dump_file(path, obj, indent=RACE_FILE_INDENT, compact=False):
+    """obj を path に書き出す（compact=True でインデントなしのコンパクト形式）"""
+    if compact:
+        indent = None
+    with open(path, 'wb') as f:
+        f.write(_dumps(obj, indent))
+    return path
+
+
+if __name__ == "__main__":
+    print(f"利用可能なJSON実装: {', '.join(BACKENDS)}（使用中: {get_backend()}）")
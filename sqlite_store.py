@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+レースデータのSQLite保存（data/races.sqlite3）
+
+race_info と basic_info / motor_info / session_results / before_info をセクションごとの
+テーブルに保存する（course_info は列数が多いため対象外）。各テーブルには
+キー列 date / stadium_code / race_no（選手のテーブルは entry＝並び順 1〜6 も）を付け、
+選手番号・場所番号・レース日付・モーター番号に索引を張る。
+値は normalize の対応表で変換済みの型で保存する。
+"""
+
+import glob
+import os
+import sqlite3
+from contextlib import closing
+
+import serialization
+from normalize import normalize_race_data, storage_kind
+from race_frame import DEFAULT_SCHEMA
+from racer_store import resolve_racer_refs
+
+SQLITE_PATH = "data/races.sqlite3"
+
+# SQLiteに保存するセクション
+SQLITE_SECTIONS = ('basic_info', 'motor_info', 'session_results', 'before_info')
+
+# 索引を張る項目（その項目を持つテーブルにだけ作成）
+INDEXED_FIELDS = ('選手番号', '場所番号', 'レース日付', 'モーター番号')
+
+RACE_KEY_COLUMNS = ('date', 'stadium_code', 'race_no')
+
+RACE_INFO_COLUMNS = (
+    ('date', 'INTEGER'),
+    ('stadium', 'TEXT'),
+    ('stadium_code', 'INTEGER'),
+    ('race_no', 'INTEGER'),
+    ('generated_at', 'TEXT'),
+)
+
+_SQL_TYPES = {'int': 'INTEGER', 'float': 'REAL', 'text': 'TEXT'}
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def section_columns(section, schema=DEFAULT_SCHEMA):
+    """テーブルの (列名, SQL型) の並び（キー列を含む）"""
+    if section == 'race_info':
+        return RACE_INFO_COLUMNS
+    columns = [(key, 'INTEGER') for key in RACE_KEY_COLUMNS] + [('entry', 'INTEGER')]
+    columns.extend(
+        (field, _SQL_TYPES[storage_kind(section, field)]) for field in schema.sections[section]
+    )
+    return tuple(columns)
+
+
+def create_tables(conn, schema=DEFAULT_SCHEMA):
+    """テーブルと索引を作成（作成済みなら何もしない）"""
+    for section in ('race_info', *SQLITE_SECTIONS):
+        columns = section_columns(section, schema)
+        keys = RACE_KEY_COLUMNS if section == 'race_info' else (*RACE_KEY_COLUMNS, 'entry')
+        column_defs = ", ".join(f"{_quote(name)} {sql_type}" for name, sql_type in columns)
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {section} ({column_defs}, "
+            f"PRIMARY KEY ({', '.join(keys)}))"
+        )
+        names = {name for name, _ in columns}
+        for field in INDEXED_FIELDS:
+            if field in names:
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS {_quote(f'idx_{section}_{field}')} "
+                    f"ON {section} ({_quote(field)})"
+                )
+        if section != 'race_info':
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{section}_race "
+                f"ON {section} (stadium_code, date)"
+            )
+
+
+def connect(path=SQLITE_PATH):
+    """データベースに接続し、テーブルがなければ作成する"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    create_tables(conn)
+    return conn
+
+
+def _insert_race(conn, race_data, schema=DEFAULT_SCHEMA):
+    race_data = resolve_racer_refs(race_data)
+    race_info = race_data['race_info']
+    if not race_info.get('normalized'):
+        race_data = normalize_race_data(race_data)
+    key = (int(race_info['date']), int(race_info['stadium_code']), int(race_info['race_no']))
+
+    # 同じレースを取り直した場合は置き換える（艇数が減ることもあるので先に削除）
+    for section in ('race_info', *SQLITE_SECTIONS):
+        conn.execute(f"DELETE FROM {section} WHERE date = ? AND stadium_code = ? AND race_no = ?", key)
+
+    conn.execute(
+        "INSERT INTO race_info VALUES (?, ?, ?, ?, ?)",
+        (key[0], race_info.get('stadium'), key[1], key[2], race_info.get('generated_at')),
+    )
+    for section in SQLITE_SECTIONS:
+        fields = [name for name, _ in section_columns(section, schema)][len(RACE_KEY_COLUMNS) + 1:]
+        placeholders = ", ".join("?" * (len(fields) + len(RACE_KEY_COLUMNS) + 1))
+        conn.executemany(
+            f"INSERT INTO {section} VALUES ({placeholders})",
+            [
+                (*key, entry, *(record.get(field) for field in fields))
+                for entry, record in enumerate(race_data.get(section) or [], 1)
+            ],
+        )
+
+
+def write_race(race_data, path=SQLITE_PATH):
+    """1レース分を保存（1トランザクション）"""
+    with closing(connect(path)) as conn:
+        with conn:
+            _insert_race(conn, race_data)
+    return path
+
+
+def import_json_tree(races_dir="data/races", path=SQLITE_PATH, dates=None):
+    """既存のJSONファイル（data/races/<日付>/*.json）をまとめて取り込む
+
+    dates を指定するとその日付のディレクトリだけを対象にする。日付ごとに1トランザクション。
+    戻り値は取り込んだレース数。
+    """
+    if dates is None:
+        dates = sorted(
+            name for name in os.listdir(races_dir) if os.path.isdir(os.path.join(races_dir, name))
+        )
+    imported = 0
+    with closing(connect(path)) as conn:
+        for date in dates:
+            files = sorted(glob.glob(os.path.join(races_dir, str(date), "*.json")))
+            with conn:
+                for file_path in files:
+                    _insert_race(conn, serialization.load_file(file_path))
+            imported += len(files)
+            print(f"{date}: {len(files)}レースを取り込み")
+    return imported
+
+
+def races_for_player(player_no, stadium_code=None, start=None, end=None, path=SQLITE_PATH):
+    """選手の出走レース一覧（会場・日付範囲で絞り込み可、日付は YYYYMMDD・両端含む）"""
+    conditions = ['b."選手番号" = ?']
+    params = [int(player_no)]
+    if stadium_code is not None:
+        conditions.append('b."場所番号" = ?')
+        params.append(int(stadium_code))
+    if start is not None:
+        conditions.append('b."レース日付" >= ?')
+        params.append(int(start))
+    if end is not None:
+        conditions.append('b."レース日付" <= ?')
+        params.append(int(end))
+    query = (
+        "SELECT r.date, r.stadium, r.stadium_code, r.race_no, b.entry "
+        "FROM basic_info b JOIN race_info r "
+        "ON r.date = b.date AND r.stadium_code = b.stadium_code AND r.race_no = b.race_no "
+        f"WHERE {' AND '.join(conditions)} ORDER BY r.date, r.stadium_code, r.race_no"
+    )
+    with closing(connect(path)) as conn:
+        return [dict(row) for row in conn.execute(query, params)]
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    if len(sys.argv) > 1 and sys.argv[1] == "import":
+        started = time.perf_counter()
+        total = import_json_tree(dates=sys.argv[2:] or None)
+        print(f"取り込み完了: {total}レース ({time.perf_counter() - started:.1f}s)")
+    elif len(sys.argv) > 2 and sys.argv[1] == "player":
+        stadium_code = int(sys.argv[3]) if len(sys.argv) > 3 else None
+        started = time.perf_counter()
+        races = races_for_player(sys.argv[2], stadium_code=stadium_code)
+        for race in races:
+            print(f"{race['date']} {race['stadium']} {race['race_no']}R ({race['entry']}枠)")
+        print(f"{len(races)}件 ({(time.perf_counter() - started) * 1000:.1f}ms)")
+    else:
+        print("使用方法: python sqlite_store.py import [日付 ...]")
+        print("          python sqlite_store.py player [選手番号] [会場コード]")
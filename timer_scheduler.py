@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+時刻指定ジョブのスケジューラ（単調時計の優先度付きキュー＋ワーカープール）
+
+登録されたジョブを実行時刻順のヒープに入れ、専用スレッドが次の実行時刻まで
+待機して、時刻になったジョブをワーカープールに渡す。待機中に新しいジョブが
+登録されると待ち直すため、ポーリングによる遅れは発生しない。
+時刻は登録時に time.monotonic() 基準に変換するので、途中で時計が補正されても
+待ち時間はずれない。キューの件数・実行の遅れ（予定時刻からの差）は stats() で確認できる。
+
+実行時刻を持たないジョブ（バックログ）は submit() で登録する。時刻指定のジョブが
+ない間、空いているワーカーに優先度の高い順に渡す。優先度は渡す直前にその時点の
+時刻で計算し直すため、時間の経過で順位が入れ替わってもよい。
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# 同時に実行するジョブ数の既定値（kyoteibiyori.com の同時接続数に合わせる）
+DEFAULT_WORKERS = 3
+
+# stats() の遅れの集計に使う直近のジョブ数
+LATENESS_WINDOW = 200
+
+# バックログのジョブに使わせないワーカー数（時刻指定のジョブを遅らせないため）
+RESERVED_WORKERS = 1
+
+
+class TimerJob:
+    """登録済みのジョブ（cancel() で取り消し可）"""
+
+    def __init__(self, deadline, when, func, args, kwargs, name, tag, priority=None, key=None):
+        self.deadline = deadline
+        self.when = when
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.name = name or getattr(func, "__name__", "job")
+        self.tag = tag
+        self.key = key
+        # バックログのジョブの優先度（現在時刻を受け取り、小さいほど先に実行する値を返す関数）
+        self.priority = priority
+        self.cancelled = False
+        # 実行開始時の遅れ（秒、バックログのジョブは None）と結果
+        self.lateness = None
+        self.future = None
+
+    def cancel(self):
+        self.cancelled = True
+
+    def __repr__(self):
+        if self.when is None:
+            return f"TimerJob({self.name}, backlog)"
+        return f"TimerJob({self.name}, {self.when:%H:%M:%S})"
+
+
+class TimerScheduler:
+    def __init__(self, max_workers=DEFAULT_WORKERS):
+        self.max_workers = max_workers
+        self.backlog_workers = max(1, max_workers - RESERVED_WORKERS)
+        self._heap = []
+        self._backlog = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._executor = None
+        self._thread = None
+        self._stopped = False
+        self._running = 0
+        self._running_backlog = 0
+        # タグ → 実行中のジョブ数（wait_idle(tag=...) で使う）
+        self._running_tags = Counter()
+        self._dispatched = 0
+        self._completed = 0
+        self._failed = 0
+        self._lateness = deque(maxlen=LATENESS_WINDOW)
+        self._max_lateness = 0.0
+
+    def schedule_at(self, when, func, *args, name=None, tag=None, key=None, **kwargs):
+        """when（datetime）に func(*args, **kwargs) を実行する（過去の時刻ならすぐ実行）
+
+        key を指定すると、同じ key の未実行のジョブを取り消して置き換える。
+        """
+        delay = (when - datetime.now()).total_seconds()
+        return self._push(time.monotonic() + delay, when, func, args, kwargs, name, tag, key)
+
+    def schedule_in(self, seconds, func, *args, name=None, tag=None, key=None, **kwargs):
+        """seconds 秒後に func(*args, **kwargs) を実行する"""
+        when = datetime.fromtimestamp(time.time() + seconds)
+        return self._push(time.monotonic() + seconds, when, func, args, kwargs, name, tag, key)
+
+    def submit(self, func, *args, priority, name=None, tag=None, key=None, **kwargs):
+        """実行時刻を持たないジョブ（バックログ）を登録する
+
+        priority は現在時刻（datetime）を受け取って優先度を返す関数で、値の小さいものから実行する。
+        key は schedule_at と同じ（同じ key の未実行のジョブを置き換える）。
+        """
+        job = TimerJob(None, None, func, args, kwargs, name, tag, priority=priority, key=key)
+        with self._cond:
+            self._cancel_key(key)
+            self._backlog.append(job)
+            self._cond.notify()
+        self.start()
+        return job
+
+    def _push(self, deadline, when, func, args, kwargs, name, tag, key=None):
+        job = TimerJob(deadline, when, func, args, kwargs, name, tag, key=key)
+        with self._cond:
+            self._cancel_key(key)
+            heapq.heappush(self._heap, (deadline, next(self._seq), job))
+            self._cond.notify()
+        self.start()
+        return job
+
+    def _cancel_key(self, key):
+        # self._cond を保持した状態で呼ばれる
+        if key is None:
+            return
+        for job in itertools.chain((item[2] for item in self._heap), self._backlog):
+            if job.key == key:
+                job.cancel()
+
+    def clear(self, tag=None):
+        """未実行のジョブを取り消す（tag を指定するとそのタグのジョブだけ）。取り消した件数を返す"""
+        with self._cond:
+            cancelled = 0
+            kept = []
+            for item in self._heap:
+                job = item[2]
+                if job.cancelled:
+                    continue
+                if tag is None or job.tag == tag:
+                    job.cancel()
+                    cancelled += 1
+                else:
+                    kept.append(item)
+            heapq.heapify(kept)
+            self._heap = kept
+            for job in self._backlog:
+                if tag is None or job.tag == tag:
+                    job.cancel()
+                    cancelled += 1
+            self._backlog = [job for job in self._backlog if not job.cancelled]
+            self._cond.notify_all()
+        return cancelled
+
+    def pending(self):
+        """未実行の時刻指定のジョブ（実行時刻順）"""
+        with self._cond:
+            return [item[2] for item in sorted(self._heap) if not item[2].cancelled]
+
+    def backlog(self, now=None):
+        """未実行のバックログのジョブ（現時点の優先度順）"""
+        now = now or datetime.now()
+        with self._cond:
+            return sorted(
+                (job for job in self._backlog if not job.cancelled),
+                key=lambda job: job.priority(now),
+            )
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopped = False
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="timer-worker"
+            )
+            self._thread = threading.Thread(target=self._run, name="timer-scheduler", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        with self._cond:
+            while not self._stopped:
+                while self._heap and self._heap[0][2].cancelled:
+                    heapq.heappop(self._heap)
+                wait = self._heap[0][0] - time.monotonic() if self._heap else None
+                if wait is not None and wait <= 0:
+                    _deadline, _seq, job = heapq.heappop(self._heap)
+                    self._dispatch(job)
+                    continue
+                # 時刻指定のジョブがない間はバックログを優先度順に渡す
+                self._backlog = [job for job in self._backlog if not job.cancelled]
+                if self._backlog and self._running_backlog < self.backlog_workers:
+                    self._dispatch(self._pop_backlog())
+                    continue
+                self._cond.wait(wait)
+
+    def _pop_backlog(self):
+        # self._cond を保持した状態で呼ばれる（優先度はこの時点の時刻で計算する）
+        now = datetime.now()
+        job = min(self._backlog, key=lambda job: job.priority(now))
+        self._backlog.remove(job)
+        return job
+
+    def _dispatch(self, job):
+        # self._cond を保持した状態で呼ばれる
+        self._running += 1
+        if job.deadline is None:
+            self._running_backlog += 1
+        self._running_tags[job.tag] += 1
+        self._dispatched += 1
+        job.future = self._executor.submit(self._execute, job)
+
+    def _execute(self, job):
+        if job.deadline is not None:
+            job.lateness = max(0.0, time.monotonic() - job.deadline)
+            with self._cond:
+                self._lateness.append(job.lateness)
+                self._max_lateness = max(self._max_lateness, job.lateness)
+        try:
+            return job.func(*job.args, **job.kwargs)
+        except Exception as e:
+            logging.error(f"ジョブの実行中にエラー: {job.name}: {e}")
+            with self._cond:
+                self._failed += 1
+        finally:
+            with self._cond:
+                self._running -= 1
+                if job.deadline is None:
+                    self._running_backlog -= 1
+                self._running_tags[job.tag] -= 1
+                if not self._running_tags[job.tag]:
+                    del self._running_tags[job.tag]
+                self._completed += 1
+                self._cond.notify_all()
+
+    def stats(self):
+        """キューの状態（待機中・バックログ・実行中の件数、直近の遅れの平均・最大（秒）、次の実行までの秒数）"""
+        with self._cond:
+            queued = [item for item in self._heap if not item[2].cancelled]
+            lateness = list(self._lateness)
+            next_in = min(item[0] for item in queued) - time.monotonic() if queued else None
+            return {
+                "queued": len(queued),
+                "backlog": sum(1 for job in self._backlog if not job.cancelled),
+                "running": self._running,
+                "dispatched": self._dispatched,
+                "completed": self._completed,
+                "failed": self._failed,
+                "lateness_avg": sum(lateness) / len(lateness) if lateness else 0.0,
+                "lateness_max": self._max_lateness,
+                "next_in": max(0.0, next_in) if next_in is not None else None,
+            }
+
+    def format_stats(self):
+        stats = self.stats()
+        next_in = f"{stats['next_in']:.0f}s後" if stats["next_in"] is not None else "なし"
+        return (
+            f"待機 {stats['queued']}件 / バックログ {stats['backlog']}件 / 実行中 {stats['running']}件"
+            f" / 完了 {stats['completed']}件"
+            f"（失敗 {stats['failed']}件）/ 遅れ 平均 {stats['lateness_avg'] * 1000:.0f}ms"
+            f" 最大 {stats['lateness_max'] * 1000:.0f}ms / 次の実行 {next_in}"
+        )
+
+    def wait_idle(self, timeout=None, tag=None):
+        """待機中・バックログ・実行中のジョブがなくなるまで待つ（時間切れなら False）
+
+        tag を指定すると、そのタグのジョブだけを待つ（他のタグの実行中のジョブは待たない）。
+        """
+        end = time.monotonic() + timeout if timeout is not None else None
+        with self._cond:
+            while True:
+                jobs = itertools.chain((item[2] for item in self._heap), self._backlog)
+                queued = any(
+                    not job.cancelled and (tag is None or job.tag == tag) for job in jobs
+                )
+                running = self._running if tag is None else self._running_tags[tag]
+                if not queued and running == 0:
+                    return True
+                remaining = end - time.monotonic() if end is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+
+    def shutdown(self, wait=True):
+        """スケジューラを止める（未実行のジョブは破棄、wait=True なら実行中のジョブの完了を待つ）"""
+        with self._cond:
+            self._stopped = True
+            self._heap = []
+            self._backlog = []
+            self._cond.notify_all()
+            thread, executor = self._thread, self._executor
+            self._thread = None
+            self._executor = None
+        if thread is not None:
+            thread.join()
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+_shared_scheduler = None
+_shared_lock = threading.Lock()
+
+
+def get_timer_scheduler():
+    """プロセス共通の TimerScheduler を取得"""
+    global _shared_scheduler
+    with _shared_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = TimerScheduler()
+        return _shared_scheduler
+
+
+if __name__ == "__main__":
+    import sys
+
+    # 動作確認: 指定件数のジョブを短い間隔で登録し、遅れを表示する
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    scheduler = TimerScheduler()
+    for i in range(count):
+        scheduler.schedule_in(0.05 * (i % 5), time.sleep, 0.01, name=f"job{i}")
+        scheduler.submit(time.sleep, 0.01, priority=lambda now, i=i: -i, name=f"backlog{i}")
+    scheduler.wait_idle()
+    print(scheduler.format_stats())
+    scheduler.shutdown()